@@ -1,18 +1,32 @@
 # agents/activities_agent/__main__.py
+# Lo primero: cargar el archivo .env, porque los módulos de common/ y de los agentes leen su
+# configuración (os.getenv) al importarse; después, medir el coste de las importaciones para
+# el informe de arranque (ver common/startup.py).
+from dotenv import load_dotenv
+load_dotenv()
+
+from common import startup
+startup.start_import_profiling()
+
 import uvicorn
-from dotenv import load_dotenv # Importar load_dotenv
 import os
 from common.a2a_server import create_app # Desde nuestra utilidad común
+from common.log import get_logger
 from .task_manager import run as agent_run_function # La función 'run' de nuestro task_manager
+from .task_manager import run_stream as agent_run_stream_function # Versión progresiva para /run/stream
+from .agent import session_manager, response_cache, runner # Para publicar sus estadísticas en /stats
+from .agent import warm_up # Hook de arranque: construye el Runner antes de recibir tráfico
+from common.session_store import close_session_services, session_store_stats # Sesiones en SQLite (SESSION_BACKEND)
+from shared.schemas import TravelRequest # Modelo de las solicitudes de /run
 
-load_dotenv() # Cargar variables desde .env al entorno
+logger = get_logger("activities_agent")
 
 # ---- Inicio: Líneas de depuración ----
 loaded_api_key = os.getenv("GOOGLE_API_KEY")
 if loaded_api_key:
-    print(f"DEBUG: GOOGLE_API_KEY cargada en __main__.py: ...{loaded_api_key[-4:]}") # Muestra solo los últimos 4 caracteres
+    logger.debug("GOOGLE_API_KEY cargada en __main__.py: ...%s", loaded_api_key[-4:]) # Muestra solo los últimos 4 caracteres
 else:
-    print("DEBUG: GOOGLE_API_KEY NO encontrada en el entorno después de load_dotenv()")
+    logger.debug("GOOGLE_API_KEY NO encontrada en el entorno después de load_dotenv()")
 # ---- Fin: Líneas de depuración ----
 
 # Para que create_app funcione, necesita un objeto que tenga un método 'execute'.
@@ -24,12 +38,30 @@ class AgentExecutor:
     async def execute(self, payload: dict) -> dict:
         return await agent_run_function(payload)
 
+    async def execute_stream(self, payload: dict):
+        # Usado por /run/stream: emite cada resultado en cuanto el modelo lo completa.
+        async for event in agent_run_stream_function(payload):
+            yield event
+
 agent_executor_instance = AgentExecutor()
 
 # Crear la aplicación FastAPI usando nuestra utilidad y el ejecutor del agente
-app = create_app(agent_executor=agent_executor_instance)
+app = create_app(
+    agent_executor=agent_executor_instance,
+    stats_providers={
+        "sessions": session_manager.stats, "cache": response_cache.stats, "runner": runner.stats,
+        "session_store": session_store_stats,
+    },
+    startup_hooks=[warm_up],
+    shutdown_hooks=[close_session_services], # Escribe las sesiones pendientes antes de salir
+    service_name="activities_agent",
+    request_model=TravelRequest, # /run valida la solicitud una vez; el agente reutiliza el modelo
+)
 
 if __name__ == "__main__":
     # Iniciar el servidor FastAPI con Uvicorn. [cite: 81]
     # El puerto 8003 se usa para el activities_agent según el documento.
-    uvicorn.run(app, host="0.0.0.0", port=8003)
\ No newline at end of file
+    # AGENT_PORT permite arrancar varias réplicas en la misma máquina (ver common/registry.py).
+    port = int(os.getenv("AGENT_PORT", "8003"))
+    logger.info("Iniciando servidor para Activities Agent en el puerto %s...", port)
+    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
@@ -1,62 +1,116 @@
 # agents/activities_agent/agent.py
 import os
-import json
+from typing import AsyncIterator
 from google.adk.agents import Agent
+from google.adk.agents.run_config import RunConfig, StreamingMode
 # from google.adk.models.lite_llm import LiteLlm # Corregido para usar LiteLlm
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.genai import types # Para construir el mensaje a Gemini
 # Importar nuestro esquema compartido
-from shared.schemas import TravelRequest, ActivitiesResponse  # Asegúrate que la ruta sea correcta según tu estructura
+from shared.schemas import TravelRequest, ActivitiesResponse, Activity  # Asegúrate que la ruta sea correcta según tu estructura
+from common.session_store import create_session_service
+from common.session_manager import SessionManager
+from common.model_backend import get_model
+from common.response_cache import ResponseCache
+from common.structured_generator import INVALID_REQUEST, StructuredGenerator
+from common.lazy import Lazy, warm_up_runner
+from common.log import get_logger
+from common.prompts import (
+    OUTCOME_EMPTY, OUTCOME_JSON_INVALID, OUTCOME_SCHEMA_MISMATCH, measure_llm_request, select_instruction,
+)
+
+logger = get_logger(__name__)
 
 # --- Configuración del Agente de Actividades ---
-# 1. Servicio de Sesión en Memoria
-# Para producción, considera alternativas más persistentes si el historial de conversación es largo o crítico.
-session_service = InMemorySessionService()
+# 1. Servicio de Sesión
+# En memoria por defecto; con SESSION_BACKEND=sqlite, persistido en un fichero SQLite local
+# que sobrevive a los reinicios (ver common/session_store.py).
+session_service = create_session_service()
 
-# 2. Identificadores de Usuario y Sesión
-# Estos podrían ser dinámicos o específicos del usuario en una aplicación real.
+# 2. Identificador de Usuario
+# El identificador de sesión lo genera el SessionManager para cada solicitud (ver paso 7).
 USER_ID = "user_activities_agent"
-SESSION_ID = "session_activities_agent"
 
 # 3. Configuración del Modelo LLM (Gemini)
 # Asegúrate que tu GOOGLE_API_KEY está configurada en el entorno.
 # LiteLlm usará "gemini/gemini-pro" o el modelo que especifiques.
 GEMINI_MODEL_NAME = "gemini-2.0-flash" # Puedes cambiarlo a gemini-1.5-flash, etc.
 
-# 4. Instrucción del Sistema para el LLM
-# Guía el comportamiento del LLM. [cite: 63]
-# Ajustamos el prompt para solicitar JSON y mejorar la robustez.
-SYSTEM_INSTRUCTION = (
-    "Eres un asistente de planificación de viajes altamente especializado en sugerir actividades turísticas. "
-    "Tu tarea es generar una lista de exactamente 2 a 3 actividades basadas en el destino, las fechas y el presupuesto que se te proporcionen. "
-    "Para cada actividad, debes incluir obligatoriamente: 'name' (el nombre de la actividad), 'description' (una breve descripción concisa), y 'price_estimate' (una estimación del precio en la moneda local aproximada). "
-    "Tu respuesta DEBE ser un único objeto JSON válido que se adhiera estrictamente al esquema proporcionado. "
-    "El objeto JSON debe tener una sola clave raíz llamada 'activities'. El valor de esta clave 'activities' DEBE ser una lista de objetos, donde cada objeto representa una actividad. "
-    "NO incluyas NINGÚN texto, explicación, comentario, o cualquier carácter ANTES o DESPUÉS del objeto JSON. "
-    "NO utilices vallas de bloque de código Markdown. "
-    "La respuesta debe ser únicamente el texto del objeto JSON, comenzando estrictamente con un carácter '{' y terminando estrictamente con un carácter '}'. "
-    "Todas las claves y los valores de tipo cadena de texto dentro del JSON DEBEN usar comillas dobles. "
-    "Si no puedes encontrar actividades adecuadas o la solicitud no es lo suficientemente clara, DEBES responder con el siguiente JSON exacto: {\"activities\": []}."
-)
+# 4. Instrucciones del Sistema para el LLM
+# Guían el comportamiento del LLM. [cite: 63]
+# Hay una por perfil (AGENT_PROMPT_PROFILE, ver common/prompts.py): "full" pide JSON y repite
+# sus reglas; "compact" describe sólo la tarea y deja el formato a output_schema (ActivitiesResponse).
+SYSTEM_INSTRUCTIONS = {
+    "full": (
+        "Eres un asistente de planificación de viajes altamente especializado en sugerir actividades turísticas. "
+        "Tu tarea es generar una lista de exactamente 2 a 3 actividades basadas en el destino, las fechas y el presupuesto que se te proporcionen. "
+        "Para cada actividad, debes incluir obligatoriamente: 'name' (el nombre de la actividad), 'description' (una breve descripción concisa), y 'price_estimate' (una estimación del precio en la moneda local aproximada). "
+        "Tu respuesta DEBE ser un único objeto JSON válido que se adhiera estrictamente al esquema proporcionado. "
+        "El objeto JSON debe tener una sola clave raíz llamada 'activities'. El valor de esta clave 'activities' DEBE ser una lista de objetos, donde cada objeto representa una actividad. "
+        "NO incluyas NINGÚN texto, explicación, comentario, o cualquier carácter ANTES o DESPUÉS del objeto JSON. "
+        "NO utilices vallas de bloque de código Markdown. "
+        "La respuesta debe ser únicamente el texto del objeto JSON, comenzando estrictamente con un carácter '{' y terminando estrictamente con un carácter '}'. "
+        "Todas las claves y los valores de tipo cadena de texto dentro del JSON DEBEN usar comillas dobles. "
+        "Si no puedes encontrar actividades adecuadas o la solicitud no es lo suficientemente clara, DEBES responder con el siguiente JSON exacto: {\"activities\": []}."
+    ),
+    "compact": (
+        "Sugiere 2-3 actividades turísticas para el destino, fechas y presupuesto indicados, "
+        "con una descripción breve y 'price_estimate' en la moneda local aproximada. "
+        "Si no hay actividades adecuadas, devuelve una lista 'activities' vacía."
+    ),
+}
+PROMPT_PROFILE, SYSTEM_INSTRUCTION = select_instruction("activities_agent", SYSTEM_INSTRUCTIONS)
 
-# 5. Creación del Agente ADK
-activities_agent = Agent(
-    name="activities_agent",
-    model=GEMINI_MODEL_NAME,
-    description="Sugiere actividades interesantes para el usuario en un destino.",
-    instruction=SYSTEM_INSTRUCTION, # Instrucción general para el agente
-    output_schema=ActivitiesResponse,
-)
+def _build_runner(instruction: str = SYSTEM_INSTRUCTION) -> Runner:
+    # Se llama una sola vez, al calentar el agente o en la primera solicitud (ver common/lazy.py).
+    # benchmarks/prompt_profiles.py la llama con la instrucción de cada perfil.
+    # 5. Creación del Agente ADK
+    activities_agent = Agent(
+        name="activities_agent",
+        model=get_model(GEMINI_MODEL_NAME), # Nombre del modelo, o FakeLlm si AGENT_MODEL_BACKEND=fake
+        description="Sugiere actividades interesantes para el usuario en un destino.",
+        instruction=instruction, # Instrucción general para el agente
+        output_schema=ActivitiesResponse,
+        before_model_callback=measure_llm_request, # Tamaño real de cada solicitud al modelo
+    )
 
-# 6. Creación del Runner del Agente
-# El Runner maneja la ejecución del agente para una sesión de aplicación concreta.
-runner = Runner(
-    agent=activities_agent,
-    session_service=session_service,
-    app_name="activities_app" # Nombre de la aplicación para la sesión
-)
+    # 6. Creación del Runner del Agente
+    # El Runner maneja la ejecución del agente para una sesión de aplicación concreta.
+    runner = Runner(
+        agent=activities_agent,
+        session_service=session_service,
+        app_name="activities_app" # Nombre de la aplicación para la sesión
+    )
+    return runner
+
+# El Agent y el Runner se construyen de forma perezosa: importar el módulo no crea el
+# cliente del modelo, y el arranque del servidor lo hace en segundo plano (warm_up).
+runner = Lazy("activities_agent.runner", _build_runner)
+
+# 7. Gestor de Sesiones
+# Cada solicitud recibe una sesión propia que se elimina al terminar, de modo que el
+# historial no se acumula ni se comparte entre solicitudes concurrentes.
+session_manager = SessionManager(session_service, app_name="activities_app", user_id=USER_ID)
+
+# 8. Caché de Respuestas
+# Las actividades no dependen del origen ni de las fechas exactas, así que la clave usa
+# destino, estación de la fecha de inicio (ej. "2025-JJA") y tramo de presupuesto: los
+# viajes al mismo destino en la misma estación (ej. un barrido de fechas) las reutilizan.
+response_cache = ResponseCache("activities_agent")
+CACHE_KEY_FIELDS = ("destination", "season", "budget")
+
+# 9. Configuración de Ejecución
+# La respuesta del modelo llega en fragmentos (SSE), de modo que cada actividad se
+# puede emitir en cuanto el modelo termina de escribirla.
+run_config = RunConfig(streaming_mode=StreamingMode.SSE)
 
+async def warm_up() -> None:
+    """
+    Hook de arranque del servidor: construye el Runner y prepara el modelo y las sesiones
+    antes de recibir tráfico (ver create_app).
+    """
+    await warm_up_runner(runner, session_manager)
+
+@response_cache.cached(key_fields=CACHE_KEY_FIELDS)
 async def execute(request: dict) -> dict:
     """
     Ejecuta la lógica principal del agente de actividades.
@@ -69,76 +123,58 @@ async def execute(request: dict) -> dict:
         dict: Un diccionario con la clave "activities" y una lista de actividades,
               o un texto de fallback si el parseo JSON falla.
     """
-    try:
-        # Validar con Pydantic (opcional aquí si FastAPI ya lo hace, pero bueno para lógica interna)
-        travel_request_data = TravelRequest(**request)
-    except Exception as e: # pydantic.ValidationError
-        print(f"Error de validación de la solicitud: {e}")
-        return {"activities": "Error: Solicitud inválida."}
+    result = {"activities": "No se recibió respuesta del modelo."}
+    async for event in generator.generate(request):
+        if event["type"] == "result":
+            result = event["data"]
+    return result
 
-    # Asegurar que la sesión ADK exista antes de enviar consultas.
-    # Esto es importante para que ADK maneje el contexto si fuera necesario.
-    session_service.create_session(
-        app_name="activities_app",
-        user_id=USER_ID,
-        session_id=SESSION_ID
-    )
+@response_cache.cached_stream(key_fields=CACHE_KEY_FIELDS)
+async def execute_stream(request: dict) -> AsyncIterator[dict]:
+    """
+    Versión progresiva de execute: emite {"type": "item", "item": <Activity>} por cada
+    actividad completada y, al final, {"type": "result", "data": ...}.
+    """
+    async for event in generator.generate(request):
+        yield event
 
+def build_user_prompt(travel_request_data: TravelRequest, profile: str = PROMPT_PROFILE) -> str:
     # Construir el prompt específico para el usuario usando los datos de la solicitud. [cite: 67, 68]
     user_prompt = (
         f"Estoy planeando un viaje a {travel_request_data.destination} "
         f"desde {travel_request_data.start_date} hasta {travel_request_data.end_date} "
         f"con un presupuesto aproximado de {travel_request_data.budget} USD. "
-        f"Por favor, dame sugerencias de actividades en formato JSON como se te indicó previamente."
     )
+    if profile == "full": # El perfil compacto no describe el formato en las instrucciones
+        return user_prompt + "Por favor, dame sugerencias de actividades en formato JSON como se te indicó previamente."
+    return user_prompt + "Por favor, dame sugerencias de actividades."
+
 
-    # Crear el mensaje en el formato esperado por el runner de ADK (similar a la API de Gemini)
-    # El runner.run_async espera 'message' como un string o un objeto google.generativeai.types.Content
-    # Para enviar un mensaje de usuario simple, un string es suficiente.
-    # Si necesitaras roles o partes múltiples (ej. imágenes), usarías Content.
-    # Aquí, como el system_instruction ya está en el agente, solo pasamos el user_prompt.
-    # No obstante, para más control y para ser explícitos con el rol 'user':
-    message_content = types.Content(parts=[types.Part(text=user_prompt)], role="user")
-
-    response_text = ""
-    try:
-        # Invocar el LLM a través del runner de ADK.
-        # run_async devuelve un generador asíncrono para el streaming.
-        async for event in runner.run_async(
-            user_id=USER_ID,
-            session_id=SESSION_ID,
-            new_message=message_content # Cambiado 'message' por 'new_message'
-        ):
-            if event.is_final_response():
-                # Extraer el texto de la respuesta final. [cite: 73]
-                # El contenido puede estar en event.message.parts[0].text o event.content.parts[0].text
-                # dependiendo de la versión y configuración. El PDF usa event.content.parts[0].text.
-                if event.content and event.content.parts:
-                    response_text = event.content.parts[0].text
-                break # Salimos del bucle una vez que tenemos la respuesta final
-        
-        if not response_text:
-            return {"activities": "No se recibió respuesta del modelo."}
-        
-        print(f"Respuesta: {response_text}")
-
-        # Intentar parsear la respuesta como JSON.
-        # El prompt pide explícitamente JSON.
-        parsed_json = json.loads(response_text)
-        if "activities" in parsed_json and isinstance(parsed_json["activities"], list):
-            return {"activities": parsed_json["activities"]} # Respuesta estructurada esperada [cite: 74]
-        else:
-            # Si el JSON no tiene la clave 'activities' o no es una lista. [cite: 75]
-            print(f"'activities' key missing or not a list in JSON response: {response_text}")
-            # Como fallback, devolvemos el texto crudo si el LLM no siguió el formato JSON.
-            # En un caso real, podrías intentar "reparar" el JSON o registrar un error más severo.
-            return {"activities": f"Respuesta inesperada del modelo (se esperaba JSON): {response_text}"}
-
-    except json.JSONDecodeError as e:
-        # Si el LLM no devuelve un JSON válido. [cite: 75]
-        print(f"Fallo al parsear JSON: {e}. Respuesta recibida:\n{response_text}")
-        # Devolver el texto crudo como fallback. [cite: 75]
+def _error_result(outcome: str, message: str, response_text: str) -> dict:
+    # Las actividades informan los fallos con un texto en la clave "activities" (la UI lo
+    # muestra tal cual) y, si el modelo no devolvió JSON, con su texto crudo como fallback.
+    if outcome == INVALID_REQUEST:
+        return {"activities": "Error: Solicitud inválida."}
+    if outcome == OUTCOME_EMPTY:
+        return {"activities": "No se recibió respuesta del modelo."}
+    if outcome == OUTCOME_JSON_INVALID:
         return {"activities": response_text}
-    except Exception as e:
-        print(f"Ocurrió un error inesperado durante la ejecución del agente: {e}")
-        return {"activities": f"Error interno del servidor: {str(e)}"}
\ No newline at end of file
+    if outcome == OUTCOME_SCHEMA_MISMATCH: # El JSON no tiene la clave 'activities' o no es una lista de actividades
+        return {"activities": f"Respuesta inesperada del modelo (se esperaba JSON): {response_text}"}
+    return {"activities": f"Error interno del servidor: {message}"}
+
+# 10. Llamada al Modelo
+# Validación de la solicitud, streaming de cada actividad, validación con ActivitiesResponse
+# (que añade price_amount, price_currency y price_usd a partir de price_estimate),
+# métricas y trazas (ver common/structured_generator.py).
+generator = StructuredGenerator(
+    "activities_agent", runner, session_manager, USER_ID,
+    request_model=TravelRequest,
+    response_model=ActivitiesResponse,
+    lists=(("activities", Activity),),
+    build_user_prompt=build_user_prompt,
+    profile=PROMPT_PROFILE,
+    system_instruction=SYSTEM_INSTRUCTION,
+    run_config=run_config,
+    error_result=_error_result,
+)
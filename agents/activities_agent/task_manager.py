@@ -1,5 +1,6 @@
 # agents/activities_agent/task_manager.py
-from .agent import execute # Importación relativa desde el mismo directorio
+from typing import AsyncIterator
+from .agent import execute, execute_stream # Importación relativa desde el mismo directorio
 
 async def run(payload: dict) -> dict:
     """
@@ -12,4 +13,12 @@ async def run(payload: dict) -> dict:
     Returns:
         dict: La respuesta generada por la función execute del agente.
     """
-    return await execute(payload)
\ No newline at end of file
+    return await execute(payload)
+
+async def run_stream(payload: dict) -> AsyncIterator[dict]:
+    """
+    Versión progresiva de run: emite cada resultado en cuanto el modelo lo completa
+    y, al final, la respuesta completa (ver execute_stream en agent.py).
+    """
+    async for event in execute_stream(payload):
+        yield event
@@ -1,14 +1,26 @@
 # agents/flight_agent/__main__.py
+# Lo primero: cargar el archivo .env, porque los módulos de common/ y de los agentes leen su
+# configuración (os.getenv) al importarse; después, medir el coste de las importaciones para
+# el informe de arranque (ver common/startup.py).
+from dotenv import load_dotenv
+load_dotenv()
+
+from common import startup
+startup.start_import_profiling()
+
 import uvicorn
-from dotenv import load_dotenv # Para cargar variables de entorno desde .env
 import os # Opcional, para depuración de variables de entorno
 
 from common.a2a_server import create_app # Utilidad para crear la app FastAPI
+from common.log import get_logger
 from .task_manager import run as flight_agent_run_function # Función 'run' del task_manager
+from .task_manager import run_stream as flight_agent_run_stream_function # Versión progresiva para /run/stream
+from .agent import session_manager, response_cache, runner # Para publicar sus estadísticas en /stats
+from .agent import warm_up # Hook de arranque: construye el Runner antes de recibir tráfico
+from common.session_store import close_session_services, session_store_stats # Sesiones en SQLite (SESSION_BACKEND)
+from shared.schemas import TravelRequest # Modelo de las solicitudes de /run
 
-# Cargar variables de entorno del archivo .env ubicado en la raíz del proyecto.
-# Es importante que esto se ejecute antes de que cualquier parte del código intente acceder a ellas.
-load_dotenv()
+logger = get_logger("flight_agent")
 
 # Opcional: Depuración para verificar si la clave API se cargó.
 # GOOGLE_API_KEY_LOADED = os.getenv("GOOGLE_API_KEY")
@@ -24,14 +36,31 @@ class AgentExecutor:
         """Ejecuta la función principal del agente de vuelos."""
         return await flight_agent_run_function(payload)
 
+    async def execute_stream(self, payload: dict):
+        # Usado por /run/stream: emite cada resultado en cuanto el modelo lo completa.
+        async for event in flight_agent_run_stream_function(payload):
+            yield event
+
 # Crear una instancia del ejecutor.
 agent_executor_instance = AgentExecutor()
 
 # Crear la aplicación FastAPI usando la utilidad compartida.
-app = create_app(agent_executor=agent_executor_instance)
+app = create_app(
+    agent_executor=agent_executor_instance,
+    stats_providers={
+        "sessions": session_manager.stats, "cache": response_cache.stats, "runner": runner.stats,
+        "session_store": session_store_stats,
+    },
+    startup_hooks=[warm_up],
+    shutdown_hooks=[close_session_services], # Escribe las sesiones pendientes antes de salir
+    service_name="flight_agent",
+    request_model=TravelRequest, # /run valida la solicitud una vez; el agente reutiliza el modelo
+)
 
 # Punto de entrada para ejecutar el servidor Uvicorn.
 if __name__ == "__main__":
-    print("Iniciando servidor para Flight Agent en el puerto 8001...")
+    port = int(os.getenv("AGENT_PORT", "8001"))
+    logger.info("Iniciando servidor para Flight Agent en el puerto %s...", port)
     # El puerto 8001 se usa para el flight_agent según la estructura del proyecto del PDF. [cite: 104]
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    # AGENT_PORT permite arrancar varias réplicas en la misma máquina (ver common/registry.py).
+    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
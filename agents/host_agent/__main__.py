@@ -1,14 +1,37 @@
 # agents/host_agent/__main__.py
-import uvicorn
+# Lo primero: cargar el archivo .env, porque los módulos de common/ y de los agentes leen su
+# configuración (os.getenv) al importarse; después, medir el coste de las importaciones para
+# el informe de arranque (ver common/startup.py).
 from dotenv import load_dotenv
+load_dotenv()
+
+from common import startup
+startup.start_import_profiling()
+
+import uvicorn
 import os
+from fastapi import Request
+from fastapi.responses import JSONResponse
 
+from common.a2a_client import A2A_DISPATCH_MODE, register_local_agent
 from common.a2a_server import create_app
+from common.log import get_logger
+from common.registry import registry
+from common.resilience import breaker_states
+from common.session_store import close_session_services, session_store_stats
 # La función 'run' que queremos usar es la del task_manager,
 # que orquesta las llamadas a otros agentes.
 from .task_manager import run as host_agent_orchestration_run
+from .task_manager import run_stream as host_agent_orchestration_run_stream
+from .task_manager import trip_single_flight # Para publicar sus estadísticas en /stats
+from .task_manager import FLIGHT_AGENT_URL, STAY_AGENT_URL, ACTIVITIES_AGENT_URL
+from .task_manager import HOST_PLANNING_MODE
+from . import agent as host_agent # host_plan_agent (modo de planificación "single")
+from .sweep import run_sweep
+from .warmer import cache_warmer, close_request_log, record_request, request_log
+from shared.schemas import FlexibleDatesRequest, TravelRequest
 
-load_dotenv()
+logger = get_logger("host_agent")
 # Opcional: Depuración para la clave API (aunque el host_agent.task_manager no la usa directamente,
 # es bueno para consistencia si el agent.py del host sí la usara).
 # GOOGLE_API_KEY_LOADED = os.getenv("GOOGLE_API_KEY")
@@ -21,12 +44,93 @@ class AgentExecutor:
     async def execute(self, payload: dict) -> dict:
         # Esta función 'execute' será llamada por el a2a_server.
         # Debe llamar a la lógica de orquestación de nuestro task_manager.
+        record_request(payload) # Historial para el precalentador de cachés (HOST_REQUEST_LOG_FILE)
         return await host_agent_orchestration_run(payload)
 
+    async def execute_stream(self, payload: dict):
+        # Versión progresiva usada por /run/stream: emite cada resultado parcial y cada agente al terminar.
+        record_request(payload)
+        async for event in host_agent_orchestration_run_stream(payload):
+            yield event
+
 agent_executor_instance = AgentExecutor()
-app = create_app(agent_executor=agent_executor_instance)
+
+stats_providers = {
+    "single_flight": trip_single_flight.stats, "circuit_breakers": breaker_states, "registry": registry.stats,
+    "session_store": session_store_stats, # También las de los subagentes en el modo en proceso
+    "plan_sessions": host_agent.plan_session_manager.stats,
+    "plan_cache": host_agent.plan_cache.stats,
+    "plan_runner": host_agent.host_plan_runner.stats,
+    "cache_warmer": cache_warmer.stats,
+}
+if request_log is not None:
+    stats_providers["request_log"] = request_log.stats
+# El host no usa su LLM para orquestar: sólo se calienta el host_plan_agent si el modo por
+# defecto es "single" (si no, se construye en la primera solicitud con planning_mode="single")
+# y los subagentes en el modo en proceso.
+startup_hooks = [host_agent.warm_up_plan] if HOST_PLANNING_MODE == "single" else []
+# Precalentador periódico de cachés (CACHE_WARMER_INTERVAL_SECONDS > 0, ver warmer.py). Se
+# ejecuta en segundo plano: /readyz no lo espera.
+startup_hooks.append(cache_warmer.start)
+shutdown_hooks = [
+    cache_warmer.stop,
+    close_session_services, # Escribe las sesiones pendientes (SESSION_BACKEND=sqlite)
+    close_request_log,
+]
+
+# Modo de un solo proceso (A2A_DISPATCH_MODE=inprocess): los agentes de vuelos, alojamiento
+# y actividades se importan aquí y call_agent/stream_agent ejecutan directamente sus
+# funciones 'run' y 'run_stream', sin HTTP ni JSON. No hace falta arrancar los puertos 8001-8003.
+if A2A_DISPATCH_MODE == "inprocess":
+    from agents.flight_agent import agent as flight_agent, task_manager as flight_task_manager
+    from agents.stay_agent import agent as stay_agent, task_manager as stay_task_manager
+    from agents.activities_agent import agent as activities_agent, task_manager as activities_task_manager
+
+    for name, url, task_manager, agent_module in (
+        ("flight_agent", FLIGHT_AGENT_URL, flight_task_manager, flight_agent),
+        ("stay_agent", STAY_AGENT_URL, stay_task_manager, stay_agent),
+        ("activities_agent", ACTIVITIES_AGENT_URL, activities_task_manager, activities_agent),
+    ):
+        register_local_agent(url, task_manager.run, task_manager.run_stream)
+        # Las estadísticas de los subagentes se publican en el /stats del host.
+        stats_providers[f"{name}_sessions"] = agent_module.session_manager.stats
+        stats_providers[f"{name}_cache"] = agent_module.response_cache.stats
+        stats_providers[f"{name}_runner"] = agent_module.runner.stats
+        startup_hooks.append(agent_module.warm_up) # /readyz espera a los tres subagentes
+    logger.info("Host Agent: modo en proceso, los subagentes se ejecutan en este mismo proceso.")
+else:
+    # Comprobaciones de salud de las réplicas de los subagentes (GET /readyz) en segundo plano.
+    startup_hooks.append(registry.start_health_checks)
+    shutdown_hooks.append(registry.stop_health_checks)
+
+async def run_flexible_dates(sweep_request: FlexibleDatesRequest, request: Request):
+    """
+    Barrido de fechas flexibles: consulta todas las fechas de inicio de la ventana con
+    concurrencia limitada y devuelve una matriz de precios por fecha (ver sweep.py).
+    create_app le aplica el plazo (cabecera X-Request-Timeout-Ms, el mismo para todo el
+    barrido) y el limitador de concurrencia de /run.
+    """
+    try:
+        return await run_sweep(sweep_request)
+    except ValueError as e: # Ventana inválida o demasiado larga
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+# El host llama a los demás agentes en cada solicitud, así que abre el pool HTTP
+# compartido al arrancar y lo cierra al apagarse.
+app = create_app(
+    agent_executor=agent_executor_instance,
+    use_client_pool=True,
+    stats_providers=stats_providers,
+    service_name="host_agent",
+    request_model=TravelRequest, # /run valida la solicitud una vez; el agente reutiliza el modelo
+    startup_hooks=startup_hooks,
+    shutdown_hooks=shutdown_hooks,
+    limited_routes={"/run/sweep": run_flexible_dates},
+)
 
 if __name__ == "__main__":
-    print("Iniciando servidor para Host Agent en el puerto 8000...")
+    port = int(os.getenv("AGENT_PORT", "8000"))
+    logger.info("Iniciando servidor para Host Agent en el puerto %s...", port)
     # El puerto 8000 se usa para el host_agent según el PDF. [cite: 110]
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # AGENT_PORT permite arrancar varias réplicas en la misma máquina (ver common/registry.py).
+    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
@@ -1,16 +1,28 @@
 # agents/host_agent/agent.py
+from typing import AsyncIterator
 from google.adk.agents import Agent
+from google.adk.agents.run_config import RunConfig, StreamingMode
 # No necesitamos LiteLlm aquí si seguimos el patrón de pasar el nombre del modelo como string
 # from google.adk.models.lite_llm import LiteLlm 
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.genai import types # Para construir el mensaje al LLM si es necesario
 from shared.schemas import TravelRequest # Para validación si este agente procesara el request directamente
+from shared.schemas import TripPlanResponse, FlightOption, StayOption, Activity # Modo de planificación "single"
+from common.session_store import create_session_service
+from common.session_manager import SessionManager
+from common.model_backend import get_model
+from common.lazy import Lazy, warm_up_runner
+from common.log import get_logger
+from common.serialization import as_model
+from common.response_cache import ResponseCache
+from common.structured_generator import StructuredGenerator
+from common.prompts import measure_llm_request, select_instruction
+
+logger = get_logger(__name__)
 
 # --- Configuración del Host Agent (como Agente LLM) ---
-session_service = InMemorySessionService()
+session_service = create_session_service() # Ver common/session_store.py (SESSION_BACKEND)
 USER_ID = "user_host_agent"
-SESSION_ID = "session_host_agent"
 GEMINI_MODEL_NAME = "gemini-2.0-flash" # Modelo para el host_agent si realiza tareas LLM
 
 # Instrucción del sistema para el LLM del host_agent.
@@ -25,23 +37,33 @@ SYSTEM_INSTRUCTION = (
     "Por ahora, si se te llama directamente con una solicitud de viaje, puedes ofrecer un resumen general de la tarea de planificación."
 )
 
-# Creación del Agente ADK para el host_agent.
-# No especificamos output_schema aquí a menos que su función 'execute'
-# deba devolver una estructura JSON específica y compleja generada por el LLM.
-# Para la función de orquestación del task_manager, esto no es directamente relevante.
-host_llm_agent = Agent( # Renombrado para diferenciar del concepto general de "host_agent"
-    name="host_llm_agent", # Nombre del agente LLM interno del host
-    model=GEMINI_MODEL_NAME,
-    description="Agente LLM coordinador para la planificación de viajes. Puede resumir información.",
-    instruction=SYSTEM_INSTRUCTION
-)
+def _build_runner() -> Runner:
+    # Se llama una sola vez, en la primera tarea LLM del host (ver common/lazy.py).
+    # Creación del Agente ADK para el host_agent.
+    # No especificamos output_schema aquí a menos que su función 'execute'
+    # deba devolver una estructura JSON específica y compleja generada por el LLM.
+    # Para la función de orquestación del task_manager, esto no es directamente relevante.
+    host_llm_agent = Agent( # Renombrado para diferenciar del concepto general de "host_agent"
+        name="host_llm_agent", # Nombre del agente LLM interno del host
+        model=get_model(GEMINI_MODEL_NAME), # Nombre del modelo, o FakeLlm si AGENT_MODEL_BACKEND=fake
+        description="Agente LLM coordinador para la planificación de viajes. Puede resumir información.",
+        instruction=SYSTEM_INSTRUCTION
+    )
 
-# Runner para el host_llm_agent (si se usa su capacidad LLM)
-host_llm_runner = Runner(
-    agent=host_llm_agent,
-    session_service=session_service,
-    app_name="host_llm_app"
-)
+    # Runner para el host_llm_agent (si se usa su capacidad LLM)
+    host_llm_runner = Runner(
+        agent=host_llm_agent,
+        session_service=session_service,
+        app_name="host_llm_app"
+    )
+    return host_llm_runner
+
+# Construcción perezosa: la orquestación (task_manager.py) no usa el LLM del host, así que
+# el arranque del host no crea el cliente del modelo.
+host_llm_runner = Lazy("host_agent.runner", _build_runner)
+
+# Sesiones ADK por solicitud para el host_llm_agent (ver common/session_manager.py).
+session_manager = SessionManager(session_service, app_name="host_llm_app", user_id=USER_ID)
 
 async def execute_llm_task(request: dict) -> dict:
     """
@@ -58,15 +80,11 @@ async def execute_llm_task(request: dict) -> dict:
         dict: Un diccionario con un resumen o mensaje.
     """
     try:
-        TravelRequest(**request) # Validar que la solicitud sea la esperada
+        as_model(request, TravelRequest) # Validar que la solicitud sea la esperada (si /run no lo hizo ya)
     except Exception as e:
-        print(f"Error de validación en host_agent.execute_llm_task: {e}")
+        logger.warning("Error de validación en host_agent.execute_llm_task: %s", e)
         return {"summary": "La solicitud de viaje no es válida."}
 
-    session_service.create_session(
-        app_name="host_llm_app", user_id=USER_ID, session_id=SESSION_ID
-    )
-
     # Prompt para una tarea de resumen/confirmación por el LLM del host
     prompt_text = (
         f"He recibido una solicitud para planificar un viaje a {request.get('destination')} "
@@ -77,16 +95,135 @@ async def execute_llm_task(request: dict) -> dict:
     message = types.Content(parts=[types.Part(text=prompt_text)], role="user")
     summary_text = "No se pudo generar un resumen."
 
-    async for event in host_llm_runner.run_async(
-        user_id=USER_ID, session_id=SESSION_ID, new_message=message
-    ):
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                summary_text = event.content.parts[0].text
-            break
+    async with session_manager.session() as session_id:
+        async for event in host_llm_runner.get().run_async(
+            user_id=USER_ID, session_id=session_id, new_message=message
+        ):
+            if event.is_final_response():
+                if event.content and event.content.parts:
+                    summary_text = event.content.parts[0].text
+                break
     
     return {"summary": summary_text, "details_received": request}
 
+# --- Modo de planificación "single": el plan completo en una sola llamada al LLM ---
+# En lugar de tres llamadas (una por subagente, cada una con su instrucción), un agente
+# del host con output_schema=TripPlanResponse devuelve vuelos, alojamiento y actividades
+# a la vez. task_manager.py lo usa cuando la solicitud indica planning_mode="single" (o
+# HOST_PLANNING_MODE=single) y traduce el plan a la misma respuesta que el modo "fanout".
+
+# Instrucciones por perfil (AGENT_PROMPT_PROFILE, ver common/prompts.py).
+PLAN_INSTRUCTIONS = {
+    "full": (
+        "Eres un asistente de planificación de viajes. Dado un origen, destino, fechas de viaje y un presupuesto, "
+        "propón en una sola respuesta un plan con tres listas: "
+        "'flights' (2-3 opciones de vuelo con 'airline', 'price' incluyendo la moneda, ej. '$1500 USD', "
+        "'departure_time', ej. '04:30 PM on April 13, 2025', y 'flight_details': directo o número de paradas y servicios), "
+        "'stays' (2-3 hoteles con 'hotel_name', 'price_per_night' incluyendo la moneda, ej. 'Approx 150 USD per night', "
+        "'location' y 'details') y "
+        "'activities' (2-3 actividades con 'name', 'description' breve y 'price_estimate' en la moneda local aproximada). "
+        "Ajusta vuelos y hoteles al presupuesto total si es posible. "
+        "Tu respuesta DEBE ser un único objeto JSON válido que se adhiera estrictamente al esquema proporcionado, "
+        "con exactamente las claves raíz 'flights', 'stays' y 'activities', cada una con una lista de objetos. "
+        "NO incluyas texto antes o después del objeto JSON ni vallas de bloque de código Markdown. "
+        "Si no encuentras opciones para alguna de las listas, devuélvela vacía."
+    ),
+    "compact": (
+        "Planifica el viaje indicado: 2-3 vuelos, 2-3 hoteles y 2-3 actividades, "
+        "ajustados al presupuesto total si es posible. Los precios incluyen la moneda. "
+        "Si no hay opciones para una lista, devuélvela vacía."
+    ),
+}
+PLAN_PROMPT_PROFILE, PLAN_INSTRUCTION = select_instruction("host_plan_agent", PLAN_INSTRUCTIONS)
+
+def _build_plan_runner(instruction: str = PLAN_INSTRUCTION) -> Runner:
+    # Se llama una sola vez, en la primera solicitud en modo "single" (ver common/lazy.py).
+    # Es un Agent distinto de host_llm_agent porque output_schema cambia su respuesta
+    # (JSON en lugar de texto libre) y execute_llm_task necesita texto.
+    host_plan_agent = Agent(
+        name="host_plan_agent",
+        model=get_model(GEMINI_MODEL_NAME), # Nombre del modelo, o FakeLlm si AGENT_MODEL_BACKEND=fake
+        description="Planifica vuelos, alojamiento y actividades de un viaje en una sola respuesta.",
+        instruction=instruction,
+        output_schema=TripPlanResponse,
+        before_model_callback=measure_llm_request, # Tamaño real de cada solicitud al modelo
+    )
+    return Runner(agent=host_plan_agent, session_service=session_service, app_name="host_plan_app")
+
+host_plan_runner = Lazy("host_agent.plan_runner", _build_plan_runner)
+
+# Sesiones ADK por solicitud del host_plan_agent.
+plan_session_manager = SessionManager(session_service, app_name="host_plan_app", user_id=USER_ID)
+
+# Caché de planes: la clave incluye el origen (vuelos) y las fechas exactas (alojamiento),
+# como las de los agentes de vuelos y alojamiento.
+plan_cache = ResponseCache("host_plan_agent")
+PLAN_CACHE_KEY_FIELDS = ("origin", "destination", "start_date", "end_date", "budget")
+
+# Respuesta en fragmentos (SSE) para emitir cada resultado en cuanto el modelo lo completa.
+plan_run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+
+# Listas del plan: (clave en TripPlanResponse, modelo de cada elemento).
+PLAN_LISTS = (("flights", FlightOption), ("stays", StayOption), ("activities", Activity))
+
+async def warm_up_plan() -> None:
+    """
+    Hook de arranque del host cuando el modo por defecto es "single": construye el Runner
+    del host_plan_agent antes de recibir tráfico.
+    """
+    await warm_up_runner(host_plan_runner, plan_session_manager)
+
+@plan_cache.cached(key_fields=PLAN_CACHE_KEY_FIELDS)
+async def execute_plan(request: dict) -> dict:
+    """
+    Planifica el viaje completo con una sola llamada al LLM.
+
+    Args:
+        request (dict): La solicitud de viaje (TravelRequest).
+
+    Returns:
+        dict: {"flights": [...], "stays": [...], "activities": [...]} (TripPlanResponse); si
+              la solicitud no es válida o la respuesta del modelo no se pudo interpretar,
+              las listas vacías y la clave "error".
+    """
+    result = {key: [] for key, _ in PLAN_LISTS}
+    async for event in plan_generator.generate(request):
+        if event["type"] == "result":
+            result = event["data"]
+    return result
+
+@plan_cache.cached_stream(key_fields=PLAN_CACHE_KEY_FIELDS)
+async def execute_plan_stream(request: dict) -> AsyncIterator[dict]:
+    """
+    Versión progresiva de execute_plan: emite {"type": "item", "list": <clave>, "item": ...}
+    por cada vuelo, alojamiento o actividad completado y, al final, {"type": "result", "data": ...}.
+    """
+    async for event in plan_generator.generate(request):
+        yield event
+
+def build_plan_prompt(travel_request_data: TravelRequest, profile: str = PLAN_PROMPT_PROFILE) -> str:
+    user_prompt = (
+        f"Necesito planificar un viaje desde {travel_request_data.origin} hacia {travel_request_data.destination}, "
+        f"desde el {travel_request_data.start_date} hasta el {travel_request_data.end_date}, "
+        f"con un presupuesto total aproximado de {travel_request_data.budget} USD."
+    )
+    if profile == "full": # El perfil compacto no describe el formato en las instrucciones
+        user_prompt += " Por favor, proporciona el plan en el formato JSON especificado en mis instrucciones."
+    return user_prompt
+
+# Llamada al modelo (ver common/structured_generator.py): un parser por lista, de modo que
+# cada vuelo, alojamiento o actividad se emite con su clave ("list") en cuanto se completa.
+plan_generator = StructuredGenerator(
+    "host_plan_agent", host_plan_runner, plan_session_manager, USER_ID,
+    request_model=TravelRequest,
+    response_model=TripPlanResponse,
+    lists=PLAN_LISTS,
+    build_user_prompt=build_plan_prompt,
+    profile=PLAN_PROMPT_PROFILE,
+    system_instruction=PLAN_INSTRUCTION,
+    run_config=plan_run_config,
+)
+
 # NOTA: La función que realmente se conectará al endpoint /run del host_agent
 # y que orquestará las llamadas a otros agentes será la función 'run'
 # en 'task_manager.py'. Esta 'execute_llm_task' es para el caso de que el
@@ -0,0 +1,166 @@
+# agents/host_agent/optimizer.py
+import os
+from datetime import date
+from typing import Optional
+
+import numpy as np
+
+from shared.pricing import prices_to_usd
+
+# Configuración del optimizador, ajustable con variables de entorno.
+OPTIMIZER_TOP_K = int(os.getenv("OPTIMIZER_TOP_K", "5")) # Paquetes devueltos
+# Actividades consideradas para los subconjuntos (las más baratas): 2^N subconjuntos.
+OPTIMIZER_MAX_ACTIVITIES = int(os.getenv("OPTIMIZER_MAX_ACTIVITIES", "12"))
+
+
+def trip_nights(start_date, end_date) -> int:
+    """
+    Noches del viaje a partir de las fechas ISO del TravelRequest. Un viaje de un día
+    o con fechas no interpretables cuenta como una noche, para no abaratar el alojamiento.
+    """
+    try:
+        nights = (date.fromisoformat(str(end_date)[:10]) - date.fromisoformat(str(start_date)[:10])).days
+    except ValueError:
+        return 1
+    return max(nights, 1)
+
+
+def option_prices_usd(options: list, price_field: str) -> np.ndarray:
+    """
+    Precio en USD de cada opción: usa price_usd (calculado por los esquemas de
+    shared/schemas.py) y, si falta, interpreta el texto de 'price_field'.
+
+    Returns:
+        np.ndarray: Un precio por opción, NaN si no se pudo interpretar.
+    """
+    prices = np.array(
+        [np.nan if option.get("price_usd") is None else option["price_usd"] for option in options],
+        dtype=np.float64,
+    )
+    missing = np.isnan(prices)
+    if missing.any():
+        prices[missing] = prices_to_usd([options[index].get(price_field) for index in np.flatnonzero(missing)])
+    return prices
+
+
+def optimize_bundles(
+    flights: list,
+    stays: list,
+    activities: list,
+    budget: float,
+    nights: int,
+    top_k: int = OPTIMIZER_TOP_K,
+    max_activities: int = OPTIMIZER_MAX_ACTIVITIES,
+) -> list:
+    """
+    Busca las mejores combinaciones vuelo + alojamiento + subconjunto de actividades
+    cuyo coste total (vuelo + noches × precio por noche + actividades) cabe en el presupuesto.
+
+    Un paquete es mejor cuantas más actividades incluye y, a igualdad, cuanto más barato
+    es (puntuación = nº de actividades - coste / presupuesto). Como el coste es aditivo,
+    los k mejores paquetes sólo pueden usar los k pares vuelo + alojamiento más baratos,
+    y éstos salen de los k vuelos y los k alojamientos más baratos; así la evaluación
+    completa (pares × 2^N subconjuntos) es una sola operación vectorizada de tamaño
+    k × 2^N aunque cada lista tenga cientos de opciones.
+
+    Las opciones sin precio interpretable se descartan.
+
+    Args:
+        flights (list): Vuelos (dicts de FlightOption).
+        stays (list): Alojamientos (dicts de StayOption, precio por noche).
+        activities (list): Actividades (dicts de Activity).
+        budget (float): Presupuesto total en USD.
+        nights (int): Noches del viaje.
+        top_k (int): Número máximo de paquetes devueltos.
+        max_activities (int): Actividades (las más baratas) que entran en los subconjuntos.
+
+    Returns:
+        list: Paquetes ordenados de mejor a peor: {"flight", "stay", "activities", "nights",
+              "total_usd", "breakdown_usd", "remaining_budget_usd", "score"}.
+    """
+    if not flights or not stays or top_k <= 0 or budget <= 0:
+        return []
+
+    flight_prices = option_prices_usd(flights, "price")
+    stay_prices = option_prices_usd(stays, "price_per_night") * nights
+    activity_prices = option_prices_usd(activities, "price_estimate") if activities else np.empty(0)
+
+    flight_ids = _cheapest(flight_prices, top_k)
+    stay_ids = _cheapest(stay_prices, top_k)
+    activity_ids = _cheapest(activity_prices, max_activities)
+    if not flight_ids.size or not stay_ids.size:
+        return []
+
+    # Los k pares vuelo + alojamiento más baratos.
+    pair_costs = (flight_prices[flight_ids][:, None] + stay_prices[stay_ids][None, :]).ravel()
+    pair_ids = _cheapest(pair_costs, top_k)
+    pair_flights = flight_ids[pair_ids // stay_ids.size]
+    pair_stays = stay_ids[pair_ids % stay_ids.size]
+    pair_costs = pair_costs[pair_ids]
+
+    # Todos los subconjuntos de actividades como máscaras de bits (2^N × N).
+    subset_count = 1 << activity_ids.size
+    masks = (np.arange(subset_count)[:, None] >> np.arange(activity_ids.size)[None, :]) & 1
+    subset_costs = masks @ activity_prices[activity_ids] if activity_ids.size else np.zeros(1)
+    subset_sizes = masks.sum(axis=1)
+
+    # Coste y puntuación de cada (par, subconjunto); los que superan el presupuesto quedan fuera.
+    totals = pair_costs[:, None] + subset_costs[None, :]
+    scores = np.where(totals <= budget, subset_sizes[None, :] - totals / budget, -np.inf).ravel()
+    feasible = np.count_nonzero(np.isfinite(scores))
+    if not feasible:
+        return []
+    best = np.argsort(-scores, kind="stable")[: min(top_k, feasible)]
+
+    bundles = []
+    for index in best:
+        pair, subset = divmod(int(index), subset_count)
+        chosen = activity_ids[masks[subset].astype(bool)]
+        flight_cost = float(flight_prices[pair_flights[pair]])
+        stay_cost = float(stay_prices[pair_stays[pair]])
+        activities_cost = float(activity_prices[chosen].sum()) if chosen.size else 0.0
+        total = flight_cost + stay_cost + activities_cost
+        bundles.append({
+            "flight": flights[pair_flights[pair]],
+            "stay": stays[pair_stays[pair]],
+            "activities": [activities[activity] for activity in chosen],
+            "nights": nights,
+            "total_usd": round(total, 2),
+            "breakdown_usd": {
+                "flight": round(flight_cost, 2),
+                "stay": round(stay_cost, 2),
+                "activities": round(activities_cost, 2),
+            },
+            "remaining_budget_usd": round(budget - total, 2),
+            "score": round(float(scores[index]), 4),
+        })
+    return bundles
+
+
+def build_bundles(payload: dict, response: dict, top_k: int = OPTIMIZER_TOP_K) -> Optional[list]:
+    """
+    Calcula los paquetes a partir de la respuesta consolidada del host_agent.
+
+    Returns:
+        Optional[list]: Los paquetes (posiblemente vacíos si nada cabe en el presupuesto),
+                        o None si faltan los vuelos o los alojamientos, o el payload no trae
+                        un presupuesto válido.
+    """
+    flights, stays, activities = response.get("flights"), response.get("stay"), response.get("activities")
+    if not isinstance(flights, list) or not isinstance(stays, list):
+        return None
+    try:
+        budget = float(payload["budget"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    nights = trip_nights(payload.get("start_date"), payload.get("end_date"))
+    activities = activities if isinstance(activities, list) else [] # Sin actividades, paquetes de vuelo + alojamiento
+    return optimize_bundles(flights, stays, activities, budget, nights, top_k=top_k)
+
+
+def _cheapest(prices: np.ndarray, count: int) -> np.ndarray:
+    # Índices de los 'count' precios más bajos (ordenados), ignorando los NaN.
+    valid = np.flatnonzero(~np.isnan(prices))
+    if valid.size > count:
+        valid = valid[np.argpartition(prices[valid], count - 1)[:count]]
+    return valid[np.argsort(prices[valid], kind="stable")]
@@ -0,0 +1,141 @@
+# agents/host_agent/sweep.py
+import asyncio
+import os
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy as np
+
+from common.batch import A2A_BATCH_MAX_CONCURRENCY
+from common.deadline import remaining
+from common.serialization import ValidatedPayload
+from common.tracing import span
+from shared.schemas import FlexibleDatesRequest, TravelRequest
+from .optimizer import option_prices_usd
+from .task_manager import STATUS_TIMED_OUT, SUBAGENTS, run
+
+# Configuración del barrido de fechas, ajustable con variables de entorno.
+SWEEP_CONCURRENCY = int(os.getenv("SWEEP_CONCURRENCY", "4")) # Fechas consultadas a la vez por defecto
+SWEEP_MAX_DATES = int(os.getenv("SWEEP_MAX_DATES", "62")) # Fechas de inicio máximas por barrido
+
+# Columnas de la matriz de precios (USD), en este orden.
+SWEEP_COLUMNS = ("flight_usd", "stay_usd", "total_usd", "best_bundle_usd")
+
+
+def candidate_start_dates(window_start: str, window_end: str, trip_nights: int) -> list[date]:
+    """
+    Fechas de inicio de todos los viajes de 'trip_nights' noches que terminan como muy
+    tarde en 'window_end'.
+
+    Raises:
+        ValueError: Si las fechas no son ISO, la ventana es demasiado corta para el viaje o
+                    hay más de SWEEP_MAX_DATES fechas candidatas.
+    """
+    first = date.fromisoformat(window_start[:10])
+    last = date.fromisoformat(window_end[:10]) - timedelta(days=trip_nights)
+    if last < first:
+        raise ValueError(f"La ventana {window_start} - {window_end} no admite un viaje de {trip_nights} noches.")
+    count = (last - first).days + 1
+    if count > SWEEP_MAX_DATES:
+        raise ValueError(f"La ventana admite {count} fechas de inicio; el máximo por barrido es {SWEEP_MAX_DATES}.")
+    return [first + timedelta(days=offset) for offset in range(count)]
+
+
+async def run_sweep(request: FlexibleDatesRequest) -> dict:
+    """
+    Consulta el viaje para cada fecha de inicio posible de la ventana, con concurrencia
+    limitada, y devuelve una matriz de precios por fecha de inicio.
+
+    Cada fecha es una solicitud normal del host (run), así que reutiliza el single-flight
+    de viajes idénticos y las cachés de los subagentes. Las actividades se guardan por
+    estación (ver activities_agent), de modo que todo el barrido suele necesitar una o dos
+    llamadas al LLM de actividades en lugar de una por fecha.
+
+    Las fechas que no terminan antes del plazo de la solicitud se devuelven sin precios y
+    con estado "timed_out" para cada agente.
+
+    Args:
+        request (FlexibleDatesRequest): Ventana de fechas, noches, origen, destino y presupuesto.
+
+    Returns:
+        dict: {"trip_nights", "columns", "start_dates", "end_dates", "matrix", "statuses",
+               "cheapest", "best_bundle"}. Cada fila de "matrix" corresponde a una fecha de inicio y
+               contiene los precios de SWEEP_COLUMNS (None si no se pudo calcular):
+               vuelo más barato, alojamiento más barato por todas las noches, la suma de
+               ambos y el total del mejor paquete dentro del presupuesto.
+
+    Raises:
+        ValueError: Si la ventana no es válida (ver candidate_start_dates).
+    """
+    start_dates = candidate_start_dates(request.window_start, request.window_end, request.trip_nights)
+    end_dates = [start + timedelta(days=request.trip_nights) for start in start_dates]
+    concurrency = max(1, min(request.concurrency or SWEEP_CONCURRENCY, A2A_BATCH_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(start: date, end: date) -> dict:
+        async with semaphore:
+            # Ya validada: los subagentes reutilizan el modelo en lugar de validarlo de nuevo.
+            return await run(ValidatedPayload.from_model(TravelRequest(
+                origin=request.origin,
+                destination=request.destination,
+                start_date=start.isoformat(),
+                end_date=end.isoformat(),
+                budget=request.budget,
+            )))
+
+    with span("host.sweep", **{"sweep.dates": len(start_dates), "sweep.concurrency": concurrency}):
+        tasks = [asyncio.create_task(run_one(start, end)) for start, end in zip(start_dates, end_dates)]
+        try:
+            await asyncio.wait(tasks, timeout=remaining())
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    matrix = np.full((len(start_dates), len(SWEEP_COLUMNS)), np.nan)
+    statuses = []
+    best_bundle = None
+    for row, task in enumerate(tasks):
+        response = task.result() if task.done() and not task.cancelled() and task.exception() is None else None
+        if response is None:
+            statuses.append({subagent.ui_key: STATUS_TIMED_OUT for subagent in SUBAGENTS})
+            continue
+        statuses.append(response.get("status", {}))
+        matrix[row, 0] = _cheapest(response.get("flights"), "price")
+        matrix[row, 1] = _cheapest(response.get("stay"), "price_per_night") * request.trip_nights
+        bundles = response.get("bundles") or []
+        if bundles:
+            matrix[row, 3] = bundles[0]["total_usd"]
+            # El mejor paquete de todo el barrido es el de mayor puntuación (ver optimizer.py).
+            if best_bundle is None or bundles[0]["score"] > best_bundle["score"]:
+                best_bundle = {"start_date": start_dates[row].isoformat(),
+                               "end_date": end_dates[row].isoformat(), **bundles[0]}
+    matrix[:, 2] = matrix[:, 0] + matrix[:, 1]
+
+    cheapest = None
+    if not np.isnan(matrix[:, 2]).all():
+        row = int(np.nanargmin(matrix[:, 2]))
+        cheapest = {"start_date": start_dates[row].isoformat(), "end_date": end_dates[row].isoformat(),
+                    **dict(zip(SWEEP_COLUMNS, _row_to_json(matrix[row])))}
+
+    return {
+        "trip_nights": request.trip_nights,
+        "columns": list(SWEEP_COLUMNS),
+        "start_dates": [start.isoformat() for start in start_dates],
+        "end_dates": [end.isoformat() for end in end_dates],
+        "matrix": [_row_to_json(values) for values in matrix],
+        "statuses": statuses,
+        "cheapest": cheapest,
+        "best_bundle": best_bundle,
+    }
+
+
+def _cheapest(options, price_field: str) -> float:
+    # Precio mínimo en USD de una lista de opciones; NaN si no es una lista o ningún precio es interpretable.
+    if not isinstance(options, list) or not options:
+        return np.nan
+    prices = option_prices_usd(options, price_field)
+    return np.nan if np.isnan(prices).all() else float(np.nanmin(prices))
+
+
+def _row_to_json(values: np.ndarray) -> list[Optional[float]]:
+    return [None if np.isnan(value) else round(float(value), 2) for value in values]
@@ -1,119 +1,402 @@
 # agents/host_agent/task_manager.py
 import asyncio # Para ejecutar llamadas a agentes de forma concurrente
-from common.a2a_client import call_agent # Nuestra utilidad para llamar a otros agentes
+import os
+import time
+from typing import AsyncIterator, Callable, NamedTuple, Optional
+from common.a2a_client import call_agent, stream_agent # Nuestras utilidades para llamar a otros agentes
+from common.deadline import remaining
+from common.metrics import FANOUT_SECONDS, PLAN_SECONDS
+from common.registry import A2A_REGISTRY_FILE, registry
+from common.response_cache import canonical_request_key
+from common.single_flight import SingleFlight
+from common.tracing import span
+from common.log import get_logger, log_payload
+from .optimizer import build_bundles
+from . import agent as host_agent # host_plan_agent, para el modo de planificación "single"
 
-# URLs de los endpoints /run de los agentes especializados.
-# Asegúrate de que los puertos coincidan con cómo estás ejecutando cada agente.
-FLIGHT_AGENT_URL = "http://localhost:8001/run"
-STAY_AGENT_URL = "http://localhost:8002/run"
-ACTIVITIES_AGENT_URL = "http://localhost:8003/run"
+logger = get_logger(__name__)
+
+# Réplicas de los agentes especializados: las del archivo A2A_REGISTRY_FILE si está
+# definido y, si no, las de la tarjeta .well_known/agent.json de cada agente. call_agent
+# y stream_agent reparten las llamadas entre ellas (ver common/registry.py).
+_AGENTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _agent_name in ("flight_agent", "stay_agent", "activities_agent"):
+    registry.load_agent_card(os.path.join(_AGENTS_DIR, _agent_name, ".well_known", "agent.json"))
+if A2A_REGISTRY_FILE:
+    registry.load_file(A2A_REGISTRY_FILE)
+
+# URLs de los endpoints /run de los agentes especializados (su primera réplica, que los identifica).
+FLIGHT_AGENT_URL = registry.url_for("flight_agent")
+STAY_AGENT_URL = registry.url_for("stay_agent")
+ACTIVITIES_AGENT_URL = registry.url_for("activities_agent")
+
+class SubAgent(NamedTuple):
+    """
+    Un agente especializado consultado en cada solicitud.
+    """
+    ui_key: str # Clave en la respuesta para la UI
+    url: str
+    data_key: str # Clave de los datos en la respuesta del subagente
+    empty_message: str # Mensaje si no hay datos o hubo un error
+    timeout_message: str # Mensaje si el agente no respondió antes del plazo
+
+    @property
+    def stream_url(self) -> str:
+        # Endpoint progresivo del agente (ver create_app en common/a2a_server.py).
+        return self.url + "/stream"
+
+# El PDF en la página 11, para la UI, accede a data["flights"], data["stay"], data["activities"].
+SUBAGENTS = (
+    SubAgent("flights", FLIGHT_AGENT_URL, "flights",
+             "No se retornaron vuelos o hubo un error.",
+             "El agente de vuelos no respondió a tiempo."),
+    SubAgent("stay", STAY_AGENT_URL, "stays", # La UI usa 'stay'
+             "No se retornaron opciones de estadía o hubo un error.",
+             "El agente de alojamiento no respondió a tiempo."),
+    SubAgent("activities", ACTIVITIES_AGENT_URL, "activities",
+             "No se encontraron actividades o hubo un error.",
+             "El agente de actividades no respondió a tiempo."),
+)
+
+# Estados por agente publicados en la clave "status" de la respuesta.
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_TIMED_OUT = "timed_out"
+
+# Modo de planificación por defecto, si la solicitud no indica 'planning_mode':
+# "fanout" consulta a los tres subagentes (tres llamadas al LLM); "single" pide el plan
+# completo al host_plan_agent en una sola llamada (ver agent.py). La respuesta tiene la
+# misma forma en ambos modos.
+PLANNING_MODES = ("fanout", "single")
+HOST_PLANNING_MODE = os.getenv("HOST_PLANNING_MODE", "fanout").lower()
+if HOST_PLANNING_MODE not in PLANNING_MODES:
+    logger.warning("HOST_PLANNING_MODE=%r desconocido. Se usará 'fanout'.", HOST_PLANNING_MODE)
+    HOST_PLANNING_MODE = "fanout"
+
+# Campos que identifican un viaje idéntico para agrupar solicitudes simultáneas.
+TRIP_KEY_FIELDS = ("origin", "destination", "start_date", "end_date", "budget")
+
+# Solicitudes idénticas en curso comparten una sola ronda de llamadas a los subagentes.
+trip_single_flight = SingleFlight()
+
+def planning_mode(payload: dict) -> str:
+    """
+    Modo de planificación de una solicitud: su campo 'planning_mode' o HOST_PLANNING_MODE.
+    """
+    mode = payload.get("planning_mode") if isinstance(payload, dict) else None
+    return mode if mode in PLANNING_MODES else HOST_PLANNING_MODE
 
 async def run(payload: dict) -> dict:
     """
     Orquesta las llamadas a los agentes de vuelos, alojamiento y actividades.
 
-    Recibe el payload de la solicitud de viaje, lo envía a cada agente especializado
-    concurrentemente, y luego agrega sus respuestas.
+    Si ya hay en curso una solicitud con el mismo viaje (mismo origen, destino, fechas y
+    presupuesto) y el mismo modo de planificación, esta solicitud espera y comparte su
+    resultado en lugar de repetir las llamadas a los subagentes. Si ese resultado tiene
+    agentes con estado "timed_out" (por el plazo de la otra solicitud) y a esta le queda
+    plazo, la planificación se repite con el plazo propio.
 
     Args:
         payload (dict): El payload de la solicitud de viaje (TravelRequest).
 
     Returns:
         dict: Un diccionario consolidado con las respuestas de todos los agentes.
-              Incluye manejo básico de errores si algún agente falla.
-    """
-    print(f"Host Agent - Task Manager: Recibido payload: {payload}")
-
-    # Realizar llamadas concurrentes a los agentes especializados usando asyncio.gather.
-    # call_agent ya es una función async.
-    results = await asyncio.gather(
-        call_agent(FLIGHT_AGENT_URL, payload),
-        call_agent(STAY_AGENT_URL, payload),
-        call_agent(ACTIVITIES_AGENT_URL, payload),
-        return_exceptions=True  # Importante para que una excepción no detenga todo.
-    )
-
-    # Desempaquetar resultados o manejar excepciones.
-    # results será una lista: [flight_result, stay_result, activities_result]
-    
-    flight_response, stay_response, activities_response = results
-
-    # Procesar cada respuesta, verificando si fue una excepción.
-    # El PDF sugiere devolver un string si no hay respuesta,
-    # pero es mejor devolver la estructura esperada (lista vacía) y una clave de error.
-
-    if isinstance(flight_response, Exception):
-        print(f"Error al llamar a Flight Agent: {flight_response}")
-        flights_data = {"flights": [], "error": str(flight_response)}
-    elif flight_response.get("error"): # Si call_agent devolvió un error estructurado
-        print(f"Error desde Flight Agent: {flight_response.get('error')}")
-        flights_data = {"flights": [], "error": flight_response.get('error')}
-    else:
-        flights_data = flight_response.get("flights", []) # Extraer la lista de vuelos
-
-    if isinstance(stay_response, Exception):
-        print(f"Error al llamar a Stay Agent: {stay_response}")
-        stays_data = {"stays": [], "error": str(stay_response)}
-    elif stay_response.get("error"):
-        print(f"Error desde Stay Agent: {stay_response.get('error')}")
-        stays_data = {"stays": [], "error": stay_response.get('error')}
-    else:
-        stays_data = stay_response.get("stays", [])
-
-    if isinstance(activities_response, Exception):
-        print(f"Error al llamar a Activities Agent: {activities_response}")
-        activities_data = {"activities": [], "error": str(activities_response)}
-    elif activities_response.get("error"):
-        print(f"Error desde Activities Agent: {activities_response.get('error')}")
-        activities_data = {"activities": [], "error": activities_response.get('error')}
-    else:
-        activities_data = activities_response.get("activities", [])
-
-    # Construir la respuesta final consolidada.
-    # El PDF [cite: 105] simplemente asigna el resultado o un string.
-    # Nosotros devolveremos la estructura de datos o el mensaje de error bajo su respectiva clave.
-    final_response = {
-        "flights": flights_data if not isinstance(flights_data, dict) or "error" not in flights_data else flights_data,
-        "stays": stays_data if not isinstance(stays_data, dict) or "error" not in stays_data else stays_data,
-        "activities": activities_data if not isinstance(activities_data, dict) or "error" not in activities_data else activities_data
-    }
-    
-    # Si la sub-respuesta ya es un dict con error y datos, la usamos directamente.
-    # Si es solo la lista de datos (ej. flights_data = [...]), la envolvemos.
-    # El objetivo es que el frontend pueda buscar response['flights']['flights'] o response['flights']['error']
-    
-    # Simplificación: La UI espera directamente la lista o el texto del error bajo la clave principal
-    # Si la sub-respuesta es un dict (porque tuvo un error), se pasa tal cual.
-    # Si es una lista (éxito), se pasa la lista. La UI manejará el tipo.
-
-    final_simplified_response = {
-        "flights": flight_response.get("flights", "No se pudieron obtener vuelos." if not isinstance(flight_response, dict) or "error" in flight_response else flight_response),
-        "stay": stay_response.get("stays", "No se pudieron obtener opciones de alojamiento." if not isinstance(stay_response, dict) or "error" in stay_response else stay_response), # PDF usa 'stay' singular para la UI
-        "activities": activities_response.get("activities", "No se pudieron obtener actividades." if not isinstance(activities_response, dict) or "error" in activities_response else activities_response)
-    }
-    
-    # El PDF en la página 11, para la UI, accede a data["flights"], data["stay"], data["activities"].
-    # Y si hubo un error en el call_agent, `call_agent` devuelve un dict con `{"error": ...}`.
-    # La lógica del PDF para el `task_manager` del host (pág 9) es:
-    # "flights": flights.get("flights", "No flights returned."),
-    # "stay": stay.get("stays", "No stay options returned."),
-    # "activities": activities.get("activities", "No activities found.")
-    # Esto implica que si `flights` es un dict de error, `flights.get("flights", ...)` fallaría o no daría lo esperado.
-    # Vamos a ajustar para que coincida mejor con esa expectativa del PDF.
-
-    def get_data_or_error_message(response_dict, data_key, error_message):
-        if isinstance(response_dict, dict):
-            if "error" in response_dict:
-                # Devuelve el mensaje de error específico del subagente si está disponible.
-                return response_dict.get("details", str(response_dict["error"])) 
-            return response_dict.get(data_key, error_message) # Devuelve los datos si existen.
-        return error_message # Si no es un dict (ej. Exception), devuelve mensaje de error genérico.
-
-    final_response_aligned_with_pdf = {
-        "flights": get_data_or_error_message(flight_response, "flights", "No se retornaron vuelos o hubo un error."),
-        "stay": get_data_or_error_message(stay_response, "stays", "No se retornaron opciones de estadía o hubo un error."), # La UI usa 'stay'
-        "activities": get_data_or_error_message(activities_response, "activities", "No se encontraron actividades o hubo un error.")
-    }
-    
-    print(f"Host Agent - Task Manager: Respuesta final: {final_response_aligned_with_pdf}")
-    return final_response_aligned_with_pdf
\ No newline at end of file
+    """
+    mode = planning_mode(payload)
+    plan = _plan_single if mode == "single" else _fan_out
+    started_at = time.perf_counter()
+    with span("host.run", **{"trip.destination": str(payload.get("destination", "")), "planning.mode": mode}) as current_span:
+        try:
+            try:
+                # Presupuesto exacto (sin tramos): sólo se agrupan solicitudes realmente idénticas.
+                trip_key = f"{mode}:{canonical_request_key(payload, TRIP_KEY_FIELDS, budget_bucket=None)}"
+            except (KeyError, TypeError, ValueError):
+                # Payload incompleto: se delega sin agrupar y cada subagente informará del error.
+                return await plan(payload)
+
+            leader = False
+            async def plan_as_leader() -> dict:
+                nonlocal leader
+                leader = True
+                return await plan(payload)
+
+            shared_response = await trip_single_flight.do(trip_key, plan_as_leader)
+            # Las solicitudes agrupadas no tienen spans de subagentes: están en la traza de la primera.
+            current_span.set_attribute("single_flight.shared", not leader)
+            if not leader and _timed_out(shared_response) and remaining() != 0.0: # None: sin plazo
+                # El resultado compartido agotó el plazo de la primera solicitud, no el de ésta:
+                # se repite la planificación con el plazo propio en lugar de heredar el "timed_out".
+                current_span.set_attribute("single_flight.rerun", True)
+                shared_response = await plan(payload)
+            return dict(shared_response) # Copia superficial para que cada solicitud tenga su propio dict.
+        finally:
+            PLAN_SECONDS.labels(mode).observe(time.perf_counter() - started_at)
+
+def _timed_out(response: dict) -> bool:
+    """
+    Indica si algún agente de la respuesta quedó con estado "timed_out".
+    """
+    return STATUS_TIMED_OUT in (response.get("status") or {}).values()
+
+async def _fan_out(payload: dict) -> dict:
+    """
+    Llama a los agentes de vuelos, alojamiento y actividades.
+
+    Recibe el payload de la solicitud de viaje, lo envía a cada agente especializado
+    concurrentemente, y luego agrega sus respuestas. Si vence el plazo de la solicitud,
+    cancela las llamadas pendientes y devuelve los resultados parciales disponibles.
+
+    Args:
+        payload (dict): El payload de la solicitud de viaje (TravelRequest).
+
+    Returns:
+        dict: Un diccionario consolidado con las respuestas de todos los agentes; en
+              "status", el estado de cada uno ("ok", "error" o "timed_out"), y en "bundles",
+              las mejores combinaciones vuelo + alojamiento + actividades dentro del presupuesto.
+    """
+    log_payload(logger, "Payload recibido: %s", payload)
+
+    # Realizar llamadas concurrentes a los agentes especializados.
+    tasks = {asyncio.create_task(_call_subagent(subagent, payload)): subagent for subagent in SUBAGENTS}
+    done, pending = await asyncio.wait(tasks, timeout=remaining())
+    for task in pending:
+        task.cancel()
+
+    final_response = {}
+    statuses = {}
+    for task, subagent in tasks.items():
+        if task in done:
+            _, final_response[subagent.ui_key], statuses[subagent.ui_key] = task.result()
+        else:
+            logger.warning("Plazo agotado esperando al agente en %s", subagent.url)
+            final_response[subagent.ui_key] = subagent.timeout_message
+            statuses[subagent.ui_key] = STATUS_TIMED_OUT
+    final_response["status"] = statuses
+    final_response["bundles"] = _optimize(payload, final_response)
+
+    log_payload(logger, "Respuesta final: %s", final_response)
+    return final_response
+
+async def run_stream(payload: dict) -> AsyncIterator[dict]:
+    """
+    Versión progresiva de run: reenvía cada resultado (vuelo, alojamiento, actividad)
+    en cuanto el subagente lo extrae de la respuesta del modelo, y el resultado
+    completo de cada agente en cuanto termina, sin esperar al más lento.
+
+    Args:
+        payload (dict): El payload de la solicitud de viaje (TravelRequest).
+
+    Yields:
+        dict: {"type": "item", "agent": <clave de la UI>, "item": <objeto>} por cada resultado
+              parcial, {"type": "result", "agent": <clave de la UI>, "data": <lista o mensaje>,
+              "status": <estado>} por cada agente, después {"type": "bundles", "data": <paquetes>}
+              y, al final, {"type": "done"}. Los agentes que no terminan antes del plazo se
+              emiten con estado "timed_out".
+    """
+    if planning_mode(payload) == "single":
+        async for event in _plan_single_stream(payload):
+            yield event
+        return
+
+    log_payload(logger, "Payload recibido (stream): %s", payload)
+
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def stream_subagent(subagent: SubAgent) -> None:
+        def forward_item(item: dict) -> None:
+            events.put_nowait({"type": "item", "agent": subagent.ui_key, "item": item})
+        ui_key, data, status = await _call_subagent(subagent, payload, on_item=forward_item)
+        events.put_nowait({"type": "result", "agent": ui_key, "data": data, "status": status})
+
+    tasks = [asyncio.create_task(stream_subagent(subagent)) for subagent in SUBAGENTS]
+    reported = set()
+    results = {} # Datos finales de cada agente, para calcular los paquetes al terminar
+    try:
+        while len(reported) < len(SUBAGENTS):
+            try:
+                event = await asyncio.wait_for(events.get(), timeout=remaining())
+            except asyncio.TimeoutError:
+                break
+            if event["type"] == "result":
+                reported.add(event["agent"])
+                results[event["agent"]] = event["data"]
+            yield event
+        for subagent in SUBAGENTS:
+            if subagent.ui_key not in reported:
+                logger.warning("Plazo agotado esperando al agente en %s", subagent.url)
+                yield {"type": "result", "agent": subagent.ui_key,
+                       "data": subagent.timeout_message, "status": STATUS_TIMED_OUT}
+        yield {"type": "bundles", "data": _optimize(payload, results)}
+        yield {"type": "done"}
+    finally:
+        # Si el cliente se desconecta o vence el plazo, se cancelan las llamadas pendientes.
+        for task in tasks:
+            task.cancel()
+
+async def _plan_single(payload: dict) -> dict:
+    """
+    Modo "single": pide el plan completo al host_plan_agent en una sola llamada al LLM y lo
+    devuelve con la misma forma que _fan_out (mismas claves, estados y paquetes).
+    """
+    log_payload(logger, "Payload recibido (single): %s", payload)
+    plan, timed_out = None, False
+    with span("host.plan_single"):
+        try:
+            plan = await asyncio.wait_for(host_agent.execute_plan(payload), timeout=remaining())
+        except asyncio.TimeoutError:
+            logger.warning("Plazo agotado esperando al host_plan_agent.")
+            timed_out = True
+        except Exception as e: # Error del modelo: cada sección recibe su mensaje de error
+            logger.warning("Error en el host_plan_agent: %s - %s", type(e).__name__, e)
+            plan = {"error": str(e)}
+
+    final_response = _translate_plan(plan, timed_out)
+    final_response["bundles"] = _optimize(payload, final_response)
+    log_payload(logger, "Respuesta final: %s", final_response)
+    return final_response
+
+async def _plan_single_stream(payload: dict) -> AsyncIterator[dict]:
+    """
+    Versión progresiva de _plan_single, con los mismos eventos que run_stream: cada
+    resultado en cuanto el modelo lo completa y, al terminar la llamada, el resultado de
+    cada sección, los paquetes y "done".
+    """
+    log_payload(logger, "Payload recibido (single, stream): %s", payload)
+    ui_keys = {subagent.data_key: subagent.ui_key for subagent in SUBAGENTS}
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def stream_plan() -> None:
+        plan = {"error": "El host_plan_agent terminó sin enviar su respuesta final."}
+        try:
+            async for event in host_agent.execute_plan_stream(payload):
+                if event.get("type") == "item":
+                    events.put_nowait({"type": "item", "agent": ui_keys[event["list"]], "item": event["item"]})
+                elif event.get("type") == "result":
+                    plan = event["data"]
+        except Exception as e:
+            logger.warning("Error en el host_plan_agent: %s - %s", type(e).__name__, e)
+            plan = {"error": str(e)}
+        events.put_nowait({"type": "plan", "data": plan})
+
+    task = asyncio.create_task(stream_plan())
+    plan, timed_out = None, False
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(events.get(), timeout=remaining())
+            except asyncio.TimeoutError:
+                logger.warning("Plazo agotado esperando al host_plan_agent.")
+                timed_out = True
+                break
+            if event["type"] == "plan":
+                plan = event["data"]
+                break
+            yield event
+        response = _translate_plan(plan, timed_out)
+        for subagent in SUBAGENTS:
+            yield {"type": "result", "agent": subagent.ui_key,
+                   "data": response[subagent.ui_key], "status": response["status"][subagent.ui_key]}
+        yield {"type": "bundles", "data": _optimize(payload, response)}
+        yield {"type": "done"}
+    finally:
+        task.cancel()
+
+def _translate_plan(plan: Optional[dict], timed_out: bool) -> dict:
+    """
+    Traduce un TripPlanResponse (o un {"error": ...}) a la respuesta que espera la UI:
+    una clave por sección con su lista o un mensaje, y "status" con el estado de cada una.
+    """
+    final_response = {}
+    statuses = {}
+    for subagent in SUBAGENTS:
+        if timed_out:
+            final_response[subagent.ui_key] = subagent.timeout_message
+            statuses[subagent.ui_key] = STATUS_TIMED_OUT
+            continue
+        data = get_data_or_error_message(plan, subagent.data_key, subagent.empty_message)
+        final_response[subagent.ui_key] = data
+        statuses[subagent.ui_key] = STATUS_OK if isinstance(data, list) else STATUS_ERROR
+    final_response["status"] = statuses
+    return final_response
+
+def _optimize(payload: dict, response: dict) -> list:
+    """
+    Calcula los paquetes (ver optimizer.py) a partir de los resultados de los agentes.
+    Devuelve una lista vacía si faltan vuelos o alojamientos.
+    """
+    with span("host.optimize") as current_span:
+        bundles = build_bundles(payload, response) or []
+        current_span.set_attribute("optimizer.bundles", len(bundles))
+    return bundles
+
+async def _call_subagent(
+    subagent: SubAgent, payload: dict, on_item: Optional[Callable[[dict], None]] = None
+) -> tuple:
+    """
+    Llama a un agente especializado y traduce su respuesta al formato que espera la UI.
+
+    Args:
+        subagent (SubAgent): El agente a llamar.
+        payload (dict): El payload de la solicitud de viaje.
+        on_item (Optional[Callable]): Si se indica, se usa el endpoint progresivo del agente
+                                      y se llama con cada resultado parcial en cuanto llega.
+
+    Returns:
+        tuple: (clave de la UI, lista de resultados o mensaje de error, estado).
+    """
+    started_at = time.perf_counter()
+    status = STATUS_TIMED_OUT # Si la llamada se cancela por plazo, se registra como tal.
+    with span("host.call_subagent", agent=subagent.ui_key, streaming=on_item is not None) as current_span:
+        try:
+            result = await _call_and_translate(subagent, payload, on_item)
+            status = result[2]
+            return result
+        finally:
+            current_span.set_attribute("agent.status", status)
+            FANOUT_SECONDS.labels(subagent.ui_key, status).observe(time.perf_counter() - started_at)
+
+async def _call_and_translate(
+    subagent: SubAgent, payload: dict, on_item: Optional[Callable[[dict], None]] = None
+) -> tuple:
+    try:
+        if on_item is None:
+            response = await call_agent(subagent.url, payload)
+        else:
+            response = await _consume_stream(subagent, payload, on_item)
+    except Exception as e: # Una excepción en un agente no debe detener a los demás.
+        logger.warning("Error al llamar al agente en %s: %s", subagent.url, e)
+        return subagent.ui_key, subagent.empty_message, STATUS_ERROR
+
+    if isinstance(response, dict) and response.get("timed_out"):
+        logger.warning("Plazo agotado en el agente en %s: %s", subagent.url, response.get("error"))
+        return subagent.ui_key, subagent.timeout_message, STATUS_TIMED_OUT
+    if isinstance(response, dict) and response.get("error"): # Si call_agent devolvió un error estructurado
+        logger.warning("Error desde el agente en %s: %s", subagent.url, response.get("error"))
+    data = get_data_or_error_message(response, subagent.data_key, subagent.empty_message)
+    return subagent.ui_key, data, STATUS_OK if isinstance(data, list) else STATUS_ERROR
+
+async def _consume_stream(subagent: SubAgent, payload: dict, on_item: Callable[[dict], None]) -> dict:
+    """
+    Lee el endpoint progresivo de un subagente: pasa cada resultado parcial a 'on_item'
+    y devuelve la respuesta final, igual que la que devolvería call_agent.
+    """
+    response = {"error": f"El agente en {subagent.stream_url} terminó sin enviar su respuesta final."}
+    async for event in stream_agent(subagent.stream_url, payload):
+        if event.get("type") == "item":
+            on_item(event.get("item"))
+        elif event.get("type") == "result":
+            response = event.get("data")
+    return response
+
+def get_data_or_error_message(response_dict, data_key, error_message):
+    """
+    Extrae los datos de la respuesta de un subagente, o un mensaje de error en texto.
+
+    La UI espera directamente la lista o el texto del error bajo la clave principal.
+    """
+    if isinstance(response_dict, dict):
+        if "error" in response_dict:
+            # Devuelve el mensaje de error específico del subagente si está disponible.
+            return response_dict.get("details", str(response_dict["error"]))
+        return response_dict.get(data_key, error_message) # Devuelve los datos si existen.
+    return error_message # Si no es un dict (ej. Exception), devuelve mensaje de error genérico.
@@ -0,0 +1,384 @@
+# agents/host_agent/warmer.py
+"""
+Precalentamiento de las cachés de respuestas a partir del historial de solicitudes.
+
+El host puede anotar cada solicitud de viaje en un archivo JSONL (HOST_REQUEST_LOG_FILE).
+El precalentador lee ese archivo, agrupa las solicitudes por origen, destino, noches y
+tramo de presupuesto, y ordena los viajes por frecuencia. Después consulta los más
+frecuentes para cada fecha de inicio de los próximos días, respetando un ritmo máximo de
+solicitudes. Cada consulta es una solicitud normal del host (run), así que los resultados
+quedan en las cachés de los subagentes (y en su nivel SQLite, si está configurado).
+
+Se ejecuta de dos formas:
+    * Dentro del host, como tarea periódica (CACHE_WARMER_INTERVAL_SECONDS > 0).
+    * Como CLI, contra los subagentes en marcha (desde la raíz del proyecto):
+        python -m agents.host_agent.warmer --log requests_log.jsonl --top 50 --days 14
+        python -m agents.host_agent.warmer --log requests_log.jsonl --dry-run
+"""
+import argparse
+import asyncio
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import date, timedelta
+from typing import Optional
+
+from common.a2a_client import A2A_DISPATCH_MODE, close_client_pool, open_client_pool
+from common.deadline import A2A_DEFAULT_DEADLINE_SECONDS, reset_deadline, set_deadline
+from common.log import get_logger
+from common.response_cache import canonical_request_key
+from common.serialization import ValidatedPayload
+from common.tracing import span
+from shared.schemas import TravelRequest
+from .task_manager import STATUS_OK, STATUS_TIMED_OUT, run
+
+logger = get_logger(__name__)
+
+# Registro de solicitudes del host: archivo JSONL con una solicitud de viaje por línea.
+# Vacío = no se registran.
+HOST_REQUEST_LOG_FILE = os.getenv("HOST_REQUEST_LOG_FILE", "")
+HOST_REQUEST_LOG_QUEUE_SIZE = int(os.getenv("HOST_REQUEST_LOG_QUEUE_SIZE", "10000")) # Líneas pendientes de escribir
+
+# Configuración del precalentador, ajustable con variables de entorno.
+CACHE_WARMER_LOG_FILE = os.getenv("CACHE_WARMER_LOG_FILE", HOST_REQUEST_LOG_FILE) # Historial que se lee
+CACHE_WARMER_INTERVAL_SECONDS = float(os.getenv("CACHE_WARMER_INTERVAL_SECONDS", "0")) # 0 = sin tarea periódica
+CACHE_WARMER_INITIAL_DELAY_SECONDS = float(os.getenv("CACHE_WARMER_INITIAL_DELAY_SECONDS", "30")) # Espera tras arrancar
+CACHE_WARMER_MAX_LOG_LINES = int(os.getenv("CACHE_WARMER_MAX_LOG_LINES", "100000")) # Últimas líneas que se leen
+CACHE_WARMER_TOP_TRIPS = int(os.getenv("CACHE_WARMER_TOP_TRIPS", "50")) # Viajes más frecuentes que se precalculan
+CACHE_WARMER_DAYS_AHEAD = int(os.getenv("CACHE_WARMER_DAYS_AHEAD", "14")) # Fechas de inicio: de mañana a N días
+CACHE_WARMER_MAX_REQUESTS = int(os.getenv("CACHE_WARMER_MAX_REQUESTS", "200")) # Solicitudes máximas por ronda
+CACHE_WARMER_RATE_PER_SECOND = float(os.getenv("CACHE_WARMER_RATE_PER_SECOND", "0.5")) # Ritmo máximo de solicitudes
+CACHE_WARMER_CONCURRENCY = int(os.getenv("CACHE_WARMER_CONCURRENCY", "2")) # Solicitudes en curso a la vez
+CACHE_WARMER_REQUEST_TIMEOUT_SECONDS = float(
+    os.getenv("CACHE_WARMER_REQUEST_TIMEOUT_SECONDS", str(A2A_DEFAULT_DEADLINE_SECONDS))
+)
+
+# Campos de cada línea del registro de solicitudes (además de "ts").
+REQUEST_LOG_FIELDS = ("origin", "destination", "start_date", "end_date", "budget", "planning_mode")
+
+# Campos que agrupan las solicitudes en un mismo viaje (el presupuesto, por tramos como en
+# las cachés de los subagentes), además de las noches.
+_TRIP_GROUP_FIELDS = ("origin", "destination", "budget")
+
+
+class RequestLog:
+    """
+    Registro de solicitudes en un archivo JSONL. record() sólo encola la línea; un hilo
+    aparte la escribe, así que no bloquea el bucle de eventos. Si la cola se llena, las
+    líneas nuevas se descartan (y se cuentan) en lugar de esperar.
+    """
+
+    def __init__(self, path: str, queue_size: int = HOST_REQUEST_LOG_QUEUE_SIZE):
+        self.path = path
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._counters = {"recorded": 0, "dropped": 0, "write_errors": 0}
+        self._thread = threading.Thread(target=self._write_loop, name="host-request-log", daemon=True)
+        self._thread.start()
+
+    def record(self, payload: dict) -> None:
+        """
+        Encola una solicitud de viaje (sólo los campos de REQUEST_LOG_FIELDS).
+        """
+        entry = {"ts": round(time.time(), 3)}
+        entry.update((field, payload.get(field)) for field in REQUEST_LOG_FIELDS if payload.get(field) is not None)
+        try:
+            self._queue.put_nowait(json.dumps(entry, ensure_ascii=False, default=str))
+            self._counters["recorded"] += 1
+        except queue.Full:
+            self._counters["dropped"] += 1
+
+    def close(self) -> None:
+        """
+        Escribe las líneas pendientes y detiene el hilo.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5.0)
+
+    def stats(self) -> dict:
+        return {"path": self.path, "queued": self._queue.qsize(), **self._counters}
+
+    def _write_loop(self) -> None:
+        while True:
+            line = self._queue.get()
+            lines = []
+            while line is not None:
+                lines.append(line)
+                try:
+                    line = self._queue.get_nowait() # Se escriben juntas las líneas acumuladas
+                except queue.Empty:
+                    break
+            if lines:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as log_file:
+                        log_file.write("\n".join(lines) + "\n")
+                except OSError as e:
+                    self._counters["write_errors"] += 1
+                    logger.warning("No se pudo escribir el registro de solicitudes %s: %s", self.path, e)
+            if line is None:
+                return
+
+
+# Registro de solicitudes del host (None si HOST_REQUEST_LOG_FILE está vacío).
+request_log: Optional[RequestLog] = RequestLog(HOST_REQUEST_LOG_FILE) if HOST_REQUEST_LOG_FILE else None
+
+
+def record_request(payload: dict) -> None:
+    """
+    Anota una solicitud del usuario en el registro de solicitudes, si está activado.
+    Las del propio host (barridos de fechas, precalentador) no se anotan.
+    """
+    if request_log is not None:
+        request_log.record(payload)
+
+
+def close_request_log() -> None:
+    if request_log is not None:
+        request_log.close()
+
+
+def rank_trips(log_path: str, top: int = CACHE_WARMER_TOP_TRIPS,
+               max_lines: int = CACHE_WARMER_MAX_LOG_LINES) -> list[dict]:
+    """
+    Lee las últimas 'max_lines' líneas del registro y devuelve los 'top' viajes más
+    frecuentes. Las líneas que no son JSON o a las que les faltan campos se ignoran.
+
+    Returns:
+        list[dict]: Un viaje por elemento, del más frecuente al menos frecuente:
+                    {"origin", "destination", "nights", "budget", "count"}. El origen, el
+                    destino y el presupuesto son los de la solicitud más reciente del grupo.
+    """
+    with open(log_path, encoding="utf-8") as log_file:
+        lines = deque(log_file, maxlen=max_lines)
+
+    counts: Counter = Counter()
+    latest: dict = {}
+    for line in lines:
+        try:
+            entry = json.loads(line)
+            nights = (date.fromisoformat(entry["end_date"][:10]) - date.fromisoformat(entry["start_date"][:10])).days
+            if nights < 1:
+                continue
+            group = (canonical_request_key(entry, _TRIP_GROUP_FIELDS), nights)
+        except (KeyError, TypeError, ValueError, AttributeError): # Línea inválida (json.JSONDecodeError es un ValueError)
+            continue
+        counts[group] += 1
+        latest[group] = entry
+
+    return [
+        {"origin": latest[group]["origin"], "destination": latest[group]["destination"],
+         "nights": group[1], "budget": latest[group]["budget"], "count": count}
+        for group, count in counts.most_common(top)
+    ]
+
+
+def plan_requests(trips: list[dict], days_ahead: int = CACHE_WARMER_DAYS_AHEAD,
+                  max_requests: int = CACHE_WARMER_MAX_REQUESTS, today: Optional[date] = None) -> list[TravelRequest]:
+    """
+    Solicitudes que se precalculan: para cada viaje, del más frecuente al menos frecuente,
+    una por fecha de inicio entre mañana y 'days_ahead' días, hasta 'max_requests'.
+    """
+    today = today or date.today()
+    requests = []
+    for trip in trips:
+        for offset in range(1, days_ahead + 1):
+            if len(requests) >= max_requests:
+                return requests
+            start = today + timedelta(days=offset)
+            requests.append(TravelRequest(
+                origin=trip["origin"],
+                destination=trip["destination"],
+                start_date=start.isoformat(),
+                end_date=(start + timedelta(days=trip["nights"])).isoformat(),
+                budget=trip["budget"],
+            ))
+    return requests
+
+
+class CacheWarmer:
+    """
+    Ejecuta rondas de precalentamiento, a demanda (run_once) o periódicamente en segundo
+    plano (start/stop), y publica sus contadores en /stats.
+    """
+
+    def __init__(
+        self,
+        log_path: str = CACHE_WARMER_LOG_FILE,
+        top: int = CACHE_WARMER_TOP_TRIPS,
+        days_ahead: int = CACHE_WARMER_DAYS_AHEAD,
+        max_requests: int = CACHE_WARMER_MAX_REQUESTS,
+        rate_per_second: float = CACHE_WARMER_RATE_PER_SECOND,
+        concurrency: int = CACHE_WARMER_CONCURRENCY,
+        request_timeout: float = CACHE_WARMER_REQUEST_TIMEOUT_SECONDS,
+    ):
+        """
+        Args:
+            log_path (str): Registro de solicitudes (JSONL) del que se obtienen los viajes.
+            top (int): Viajes más frecuentes que se precalculan.
+            days_ahead (int): Fechas de inicio desde mañana hasta 'days_ahead' días.
+            max_requests (int): Solicitudes máximas por ronda.
+            rate_per_second (float): Solicitudes iniciadas por segundo como máximo (0 = sin límite).
+            concurrency (int): Solicitudes en curso a la vez.
+            request_timeout (float): Plazo de cada solicitud, en segundos.
+        """
+        self.log_path = log_path
+        self.top = top
+        self.days_ahead = days_ahead
+        self.max_requests = max_requests
+        self.rate_per_second = rate_per_second
+        self.concurrency = max(1, concurrency)
+        self.request_timeout = request_timeout
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._counters = {"rounds": 0, "requests": 0, "ok": 0, "partial": 0, "timed_out": 0, "errors": 0}
+        self._last_round: dict = {}
+
+    async def run_once(self, dry_run: bool = False) -> dict:
+        """
+        Una ronda de precalentamiento: ordena los viajes del registro y consulta sus
+        fechas al ritmo configurado.
+
+        Args:
+            dry_run (bool): Si es True, sólo calcula qué se consultaría.
+
+        Returns:
+            dict: {"trips", "requests", "ok", "partial", "timed_out", "errors", "seconds"}. Con
+                  dry_run, "trips" es la lista de viajes ordenados y "planned", las solicitudes.
+        """
+        started_at = time.perf_counter()
+        trips = await asyncio.to_thread(rank_trips, self.log_path, self.top)
+        requests = plan_requests(trips, self.days_ahead, self.max_requests)
+        if dry_run:
+            return {"trips": trips, "planned": [request.model_dump() for request in requests]}
+
+        result = {"trips": len(trips), "requests": len(requests), "ok": 0, "partial": 0, "timed_out": 0, "errors": 0}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        interval = 1.0 / self.rate_per_second if self.rate_per_second > 0 else 0.0
+
+        async def warm_one(request: TravelRequest) -> None:
+            token = set_deadline(self.request_timeout)
+            try:
+                response = await run(ValidatedPayload.from_model(request))
+                statuses = set(response.get("status", {}).values())
+                outcome = "ok" if statuses == {STATUS_OK} else "timed_out" if statuses == {STATUS_TIMED_OUT} else "partial"
+            except Exception as e:
+                logger.warning("Error precalentando %s -> %s: %s - %s",
+                               request.origin, request.destination, type(e).__name__, e)
+                outcome = "errors"
+            finally:
+                reset_deadline(token)
+                semaphore.release()
+            result[outcome] += 1
+            self._counters[outcome] += 1
+
+        self._running = True
+        tasks = []
+        with span("host.cache_warmer", **{"warmer.trips": len(trips), "warmer.requests": len(requests)}):
+            try:
+                next_start = time.monotonic()
+                for request in requests:
+                    # Ritmo máximo: cada solicitud sale 'interval' segundos después de la anterior.
+                    await asyncio.sleep(max(next_start - time.monotonic(), 0.0))
+                    next_start = max(next_start, time.monotonic()) + interval
+                    await semaphore.acquire()
+                    self._counters["requests"] += 1
+                    tasks.append(asyncio.create_task(warm_one(request)))
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                self._running = False
+
+        result["seconds"] = round(time.perf_counter() - started_at, 3)
+        self._counters["rounds"] += 1
+        self._last_round = {"finished_at": round(time.time(), 3), **result}
+        logger.info("Precalentamiento de cachés: %s", result)
+        return result
+
+    def start(self, interval: float = CACHE_WARMER_INTERVAL_SECONDS,
+              initial_delay: float = CACHE_WARMER_INITIAL_DELAY_SECONDS) -> None:
+        """
+        Ejecuta una ronda cada 'interval' segundos en segundo plano, la primera tras
+        'initial_delay' segundos (para no competir con el arranque). No hace nada si
+        'interval' es 0 o no hay registro de solicitudes.
+        """
+        if interval <= 0 or not self.log_path or self._task is not None:
+            return
+
+        async def loop() -> None:
+            await asyncio.sleep(initial_delay)
+            while True:
+                try:
+                    await self.run_once()
+                except FileNotFoundError:
+                    logger.info("Precalentamiento omitido: aún no existe el registro %s.", self.log_path)
+                except Exception as e:
+                    logger.warning("Error en el precalentamiento de cachés: %s - %s", type(e).__name__, e)
+                await asyncio.sleep(interval)
+
+        self._task = asyncio.create_task(loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        """
+        Contadores del precalentador para /stats.
+        """
+        return {
+            "scheduled": self._task is not None,
+            "running": self._running,
+            **self._counters,
+            "last_round": self._last_round,
+        }
+
+
+# Precalentador periódico del host (ver __main__.py).
+cache_warmer = CacheWarmer()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Precalienta las cachés de los subagentes con los viajes más frecuentes.")
+    parser.add_argument("--log", default=CACHE_WARMER_LOG_FILE, required=not CACHE_WARMER_LOG_FILE,
+                        help="Registro de solicitudes (JSONL).")
+    parser.add_argument("--top", type=int, default=CACHE_WARMER_TOP_TRIPS, help="Viajes más frecuentes que se precalculan.")
+    parser.add_argument("--days", type=int, default=CACHE_WARMER_DAYS_AHEAD, help="Fechas de inicio: de mañana a N días.")
+    parser.add_argument("--max-requests", type=int, default=CACHE_WARMER_MAX_REQUESTS, help="Solicitudes máximas.")
+    parser.add_argument("--rate", type=float, default=CACHE_WARMER_RATE_PER_SECOND, help="Solicitudes por segundo (0 = sin límite).")
+    parser.add_argument("--concurrency", type=int, default=CACHE_WARMER_CONCURRENCY, help="Solicitudes en curso a la vez.")
+    parser.add_argument("--dry-run", action="store_true", help="Muestra los viajes y las solicitudes sin ejecutarlas.")
+    return parser.parse_args(argv)
+
+
+async def _run_cli(args: argparse.Namespace) -> dict:
+    if A2A_DISPATCH_MODE == "inprocess" and not args.dry_run:
+        # Registra los subagentes en este proceso, como al arrancar el host. Sus cachés
+        # sólo sobreviven al proceso si RESPONSE_CACHE_SQLITE_PATH está definido.
+        import agents.host_agent.__main__ # noqa: F401
+    warmer = CacheWarmer(args.log, args.top, args.days, args.max_requests, args.rate, args.concurrency)
+    open_client_pool()
+    try:
+        return await warmer.run_once(dry_run=args.dry_run)
+    finally:
+        await close_client_pool()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    result = asyncio.run(_run_cli(args))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,26 @@
 # agents/stay_agent/__main__.py
-import uvicorn
+# Lo primero: cargar el archivo .env, porque los módulos de common/ y de los agentes leen su
+# configuración (os.getenv) al importarse; después, medir el coste de las importaciones para
+# el informe de arranque (ver common/startup.py).
 from dotenv import load_dotenv
+load_dotenv()
+
+from common import startup
+startup.start_import_profiling()
+
+import uvicorn
 import os
 
 from common.a2a_server import create_app
+from common.log import get_logger
 from .task_manager import run as stay_agent_run_function
+from .task_manager import run_stream as stay_agent_run_stream_function # Versión progresiva para /run/stream
+from .agent import session_manager, response_cache, runner # Para publicar sus estadísticas en /stats
+from .agent import warm_up # Hook de arranque: construye el Runner antes de recibir tráfico
+from common.session_store import close_session_services, session_store_stats # Sesiones en SQLite (SESSION_BACKEND)
+from shared.schemas import TravelRequest # Modelo de las solicitudes de /run
 
-load_dotenv()
+logger = get_logger("stay_agent")
 
 # Opcional: Depuración para la clave API
 # GOOGLE_API_KEY_LOADED = os.getenv("GOOGLE_API_KEY")
@@ -19,10 +33,27 @@ class AgentExecutor:
     async def execute(self, payload: dict) -> dict:
         return await stay_agent_run_function(payload)
 
+    async def execute_stream(self, payload: dict):
+        # Usado por /run/stream: emite cada resultado en cuanto el modelo lo completa.
+        async for event in stay_agent_run_stream_function(payload):
+            yield event
+
 agent_executor_instance = AgentExecutor()
-app = create_app(agent_executor=agent_executor_instance)
+app = create_app(
+    agent_executor=agent_executor_instance,
+    stats_providers={
+        "sessions": session_manager.stats, "cache": response_cache.stats, "runner": runner.stats,
+        "session_store": session_store_stats,
+    },
+    startup_hooks=[warm_up],
+    shutdown_hooks=[close_session_services], # Escribe las sesiones pendientes antes de salir
+    service_name="stay_agent",
+    request_model=TravelRequest, # /run valida la solicitud una vez; el agente reutiliza el modelo
+)
 
 if __name__ == "__main__":
-    print("Iniciando servidor para Stay Agent en el puerto 8002...")
+    port = int(os.getenv("AGENT_PORT", "8002"))
+    logger.info("Iniciando servidor para Stay Agent en el puerto %s...", port)
     # El puerto 8002 se usa para el stay_agent. [cite: 105]
-    uvicorn.run(app, host="0.0.0.0", port=8002)
\ No newline at end of file
+    # AGENT_PORT permite arrancar varias réplicas en la misma máquina (ver common/registry.py).
+    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
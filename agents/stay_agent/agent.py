@@ -1,98 +1,135 @@
 # agents/stay_agent/agent.py
-import json
+from typing import AsyncIterator
 from google.adk.agents import Agent
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.genai import types # Usado para construir el mensaje al LLM
-from shared.schemas import TravelRequest, StaysResponse # Importamos nuestros modelos Pydantic
+from shared.schemas import TravelRequest, StaysResponse, StayOption # Importamos nuestros modelos Pydantic
+from common.session_store import create_session_service
+from common.session_manager import SessionManager
+from common.model_backend import get_model
+from common.response_cache import ResponseCache
+from common.structured_generator import StructuredGenerator
+from common.lazy import Lazy, warm_up_runner
+from common.log import get_logger
+from common.prompts import measure_llm_request, select_instruction
+
+logger = get_logger(__name__)
 
 # --- Configuración del Agente de Alojamiento ---
-session_service = InMemorySessionService()
+session_service = create_session_service() # Ver common/session_store.py (SESSION_BACKEND)
 USER_ID = "user_stay_agent"
-SESSION_ID = "session_stay_agent"
 GEMINI_MODEL_NAME = "gemini-2.0-flash"
 
-# Instrucción del sistema para el LLM, enfocada en alojamiento y formato JSON.
-SYSTEM_INSTRUCTION = (
-    "Eres un asistente de planificación de viajes especializado en encontrar y sugerir opciones de alojamiento (hoteles). "
-    "Dado un destino, fechas de viaje y un presupuesto general de viaje, tu tarea es proponer 2-3 opciones de alojamiento que se ajusten a un rango de precio razonable derivado del presupuesto general. "
-    "Para cada opción de alojamiento, debes proporcionar: 'hotel_name' (nombre del hotel), "
-    "'price_per_night' (precio estimado por noche, incluyendo la moneda, ej. 'Approx 150 USD per night' o 'INR 1800 por noche'), "
-    "'location' (ubicación o área general del hotel), y "
-    "'details' (descripción breve de los detalles del hotel, como tipo, servicios principales o puntos de interés cercanos). "
-    "Interpreta el presupuesto de viaje para estimar un rango adecuado para el costo por noche del hotel. "
-    "Tu respuesta DEBE ser un único objeto JSON válido que se adhiera estrictamente al esquema proporcionado. "
-    "El objeto JSON debe tener una sola clave raíz llamada 'stays'. El valor de esta clave 'stays' DEBE ser una lista de objetos, donde cada objeto representa una opción de alojamiento. "
-    "NO incluyas NINGÚN texto, explicación, comentario, o cualquier carácter ANTES o DESPUÉS del objeto JSON. "
-    "NO utilices vallas de bloque de código Markdown. "
-    "La respuesta debe ser únicamente el texto del objeto JSON, comenzando estrictamente con un carácter '{' y terminando estrictamente con un carácter '}'. "
-    "Todas las claves y los valores de tipo cadena de texto dentro del JSON DEBEN usar comillas dobles. "
-    "Si no puedes encontrar opciones de alojamiento adecuadas o la solicitud no es clara, DEBES responder con el siguiente JSON exacto: {\"stays\": []}."
-)
+# Instrucciones del sistema para el LLM, por perfil (AGENT_PROMPT_PROFILE, ver common/prompts.py).
+# "full" repite las reglas del formato JSON; "compact" deja el formato a output_schema (StaysResponse).
+SYSTEM_INSTRUCTIONS = {
+    "full": (
+        "Eres un asistente de planificación de viajes especializado en encontrar y sugerir opciones de alojamiento (hoteles). "
+        "Dado un destino, fechas de viaje y un presupuesto general de viaje, tu tarea es proponer 2-3 opciones de alojamiento que se ajusten a un rango de precio razonable derivado del presupuesto general. "
+        "Para cada opción de alojamiento, debes proporcionar: 'hotel_name' (nombre del hotel), "
+        "'price_per_night' (precio estimado por noche, incluyendo la moneda, ej. 'Approx 150 USD per night' o 'INR 1800 por noche'), "
+        "'location' (ubicación o área general del hotel), y "
+        "'details' (descripción breve de los detalles del hotel, como tipo, servicios principales o puntos de interés cercanos). "
+        "Interpreta el presupuesto de viaje para estimar un rango adecuado para el costo por noche del hotel. "
+        "Tu respuesta DEBE ser un único objeto JSON válido que se adhiera estrictamente al esquema proporcionado. "
+        "El objeto JSON debe tener una sola clave raíz llamada 'stays'. El valor de esta clave 'stays' DEBE ser una lista de objetos, donde cada objeto representa una opción de alojamiento. "
+        "NO incluyas NINGÚN texto, explicación, comentario, o cualquier carácter ANTES o DESPUÉS del objeto JSON. "
+        "NO utilices vallas de bloque de código Markdown. "
+        "La respuesta debe ser únicamente el texto del objeto JSON, comenzando estrictamente con un carácter '{' y terminando estrictamente con un carácter '}'. "
+        "Todas las claves y los valores de tipo cadena de texto dentro del JSON DEBEN usar comillas dobles. "
+        "Si no puedes encontrar opciones de alojamiento adecuadas o la solicitud no es clara, DEBES responder con el siguiente JSON exacto: {\"stays\": []}."
+    ),
+    "compact": (
+        "Sugiere 2-3 hoteles en el destino y fechas indicados, con un precio por noche razonable "
+        "para el presupuesto total del viaje. 'price_per_night' incluye la moneda (ej. 'Approx 150 USD per night'); "
+        "'details': tipo de hotel, servicios principales o puntos de interés cercanos. "
+        "Si no hay opciones adecuadas, devuelve una lista 'stays' vacía."
+    ),
+}
+PROMPT_PROFILE, SYSTEM_INSTRUCTION = select_instruction("stay_agent", SYSTEM_INSTRUCTIONS)
 
-# Creación del Agente ADK
-stay_agent = Agent(
-    name="stay_agent",
-    model=GEMINI_MODEL_NAME, # Pasamos el nombre del modelo como string
-    description="Recomienda opciones de alojamiento (hoteles) basadas en el destino, fechas y presupuesto del usuario.",
-    instruction=SYSTEM_INSTRUCTION,
-    output_schema=StaysResponse # Especificamos el modelo Pydantic para la salida
-)
+def _build_runner(instruction: str = SYSTEM_INSTRUCTION) -> Runner:
+    # Se llama una sola vez, al calentar el agente o en la primera solicitud (ver common/lazy.py).
+    # benchmarks/prompt_profiles.py la llama con la instrucción de cada perfil.
+    # Creación del Agente ADK
+    stay_agent = Agent(
+        name="stay_agent",
+        model=get_model(GEMINI_MODEL_NAME), # Nombre del modelo, o FakeLlm si AGENT_MODEL_BACKEND=fake
+        description="Recomienda opciones de alojamiento (hoteles) basadas en el destino, fechas y presupuesto del usuario.",
+        instruction=instruction,
+        output_schema=StaysResponse, # Especificamos el modelo Pydantic para la salida
+        before_model_callback=measure_llm_request, # Tamaño real de cada solicitud al modelo
+    )
 
-# Creación del Runner del Agente
-runner = Runner(
-    agent=stay_agent,
-    session_service=session_service,
-    app_name="stay_app"
-)
+    # Creación del Runner del Agente
+    runner = Runner(
+        agent=stay_agent,
+        session_service=session_service,
+        app_name="stay_app"
+    )
+    return runner
+
+# El Agent y el Runner se construyen de forma perezosa: importar el módulo no crea el
+# cliente del modelo, y el arranque del servidor lo hace en segundo plano (warm_up).
+runner = Lazy("stay_agent.runner", _build_runner)
+
+# Sesiones ADK por solicitud (ver common/session_manager.py).
+session_manager = SessionManager(session_service, app_name="stay_app", user_id=USER_ID)
+
+# Caché de respuestas por destino, fechas y tramo de presupuesto (el origen no influye).
+response_cache = ResponseCache("stay_agent")
+
+CACHE_KEY_FIELDS = ("destination", "start_date", "end_date", "budget")
+
+# Respuesta del modelo en fragmentos (SSE) para emitir cada alojamiento en cuanto está completo.
+run_config = RunConfig(streaming_mode=StreamingMode.SSE)
 
+async def warm_up() -> None:
+    """
+    Hook de arranque del servidor: construye el Runner y prepara el modelo y las sesiones
+    antes de recibir tráfico (ver create_app).
+    """
+    await warm_up_runner(runner, session_manager)
+
+@response_cache.cached(key_fields=CACHE_KEY_FIELDS)
 async def execute(request: dict) -> dict:
     """
     Ejecuta la lógica principal del agente de alojamiento.
     """
-    try:
-        travel_request_data = TravelRequest(**request)
-    except Exception as e: # pydantic.ValidationError
-        print(f"Error de validación de la solicitud para stay_agent: {e}")
-        return {"stays": [], "error": f"Solicitud inválida: {e}"}
+    result = {"stays": []}
+    async for event in generator.generate(request):
+        if event["type"] == "result":
+            result = event["data"]
+    return result
 
-    session_service.create_session(
-        app_name="stay_app", user_id=USER_ID, session_id=SESSION_ID
-    )
+@response_cache.cached_stream(key_fields=CACHE_KEY_FIELDS)
+async def execute_stream(request: dict) -> AsyncIterator[dict]:
+    """
+    Versión progresiva de execute: emite {"type": "item", "item": <StayOption>} por cada
+    alojamiento completado y, al final, {"type": "result", "data": ...}.
+    """
+    async for event in generator.generate(request):
+        yield event
 
+def build_user_prompt(travel_request_data: TravelRequest, profile: str = PROMPT_PROFILE) -> str:
     user_prompt = (
         f"Estoy buscando alojamiento en {travel_request_data.destination} "
         f"para las fechas del {travel_request_data.start_date} al {travel_request_data.end_date}. "
         f"Mi presupuesto general para el viaje es de {travel_request_data.budget} USD. "
-        f"Por favor, considera este presupuesto para sugerir hoteles con un precio por noche adecuado y proporciona las opciones en el formato JSON especificado."
+        f"Por favor, considera este presupuesto para sugerir hoteles con un precio por noche adecuado"
     )
-    
-    message_content = types.Content(parts=[types.Part(text=user_prompt)], role="user")
-    response_text = ""
-
-    try:
-        print(f"DEBUG: stay_agent usando Agent con output_schema={stay_agent.output_schema}")
-        async for event in runner.run_async(
-            user_id=USER_ID, session_id=SESSION_ID, new_message=message_content
-        ):
-            if event.is_final_response():
-                if event.content and event.content.parts:
-                    response_text = event.content.parts[0].text
-                break
-        
-        if not response_text:
-            print("ADVERTENCIA: stay_agent no recibió respuesta de texto del modelo.")
-            return {"stays": []}
-
-        print(f"DEBUG: stay_agent - Respuesta de texto crudo del LLM: '{response_text}'")
+    if profile == "full": # El perfil compacto no describe el formato en las instrucciones
+        return user_prompt + " y proporciona las opciones en el formato JSON especificado."
+    return user_prompt + "."
 
-        parsed_json_data = json.loads(response_text)
-        validated_response = StaysResponse(**parsed_json_data)
-        return validated_response.model_dump()
-
-    except json.JSONDecodeError as e:
-        print(f"FALLO AL PARSEAR JSON en stay_agent: {e}. Respuesta recibida:\n{response_text}")
-        return {"stays": [], "error": f"Respuesta inválida del modelo (no es JSON válido): {response_text}"}
-    except Exception as e: # Captura errores de validación Pydantic y otros.
-        print(f"OCURRIÓ UN ERROR INESPERADO en stay_agent: {type(e).__name__} - {e}. Respuesta recibida:\n{response_text}")
-        return {"stays": [], "error": f"Error procesando la respuesta: {e}. Texto original: {response_text}"}
\ No newline at end of file
+# Llamada al modelo compartida por los agentes (ver common/structured_generator.py).
+generator = StructuredGenerator(
+    "stay_agent", runner, session_manager, USER_ID,
+    request_model=TravelRequest,
+    response_model=StaysResponse,
+    lists=(("stays", StayOption),),
+    build_user_prompt=build_user_prompt,
+    profile=PROMPT_PROFILE,
+    system_instruction=SYSTEM_INSTRUCTION,
+    run_config=run_config,
+)
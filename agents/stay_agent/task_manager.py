@@ -1,8 +1,17 @@
 # agents/stay_agent/task_manager.py
-from .agent import execute
+from typing import AsyncIterator
+from .agent import execute, execute_stream
 
 async def run(payload: dict) -> dict:
     """
     Actúa como un intermediario para invocar la lógica principal del stay_agent.
     """
-    return await execute(payload)
\ No newline at end of file
+    return await execute(payload)
+
+async def run_stream(payload: dict) -> AsyncIterator[dict]:
+    """
+    Versión progresiva de run: emite cada resultado en cuanto el modelo lo completa
+    y, al final, la respuesta completa (ver execute_stream en agent.py).
+    """
+    async for event in execute_stream(payload):
+        yield event
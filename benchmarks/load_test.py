@@ -0,0 +1,255 @@
+# benchmarks/load_test.py
+"""
+Prueba de carga de la capa de orquestación.
+
+Arranca los cuatro agentes con el modelo simulado (AGENT_MODEL_BACKEND=fake), envía
+solicitudes a POST /run del host_agent a un ritmo fijo (carga abierta: las solicitudes
+salen a su hora aunque las anteriores no hayan terminado) y muestra el throughput y
+los percentiles de latencia.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.load_test --rps 20 --duration 30
+    python -m benchmarks.load_test --rps 50 --duration 60 --max-p95-ms 3000 --json resultado.json
+    python -m benchmarks.load_test --rps 20 --duration 30 --dispatch-mode inprocess
+    python -m benchmarks.load_test --rps 40 --duration 30 --flight-replicas 3
+
+Con --max-p95-ms / --max-p99-ms / --max-error-rate el proceso termina con código 1 si
+se superan los umbrales, para detectar regresiones en CI.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+import httpx
+
+# Agentes que se arrancan: (módulo, puerto). Los puertos son los que espera el host_agent.
+SERVICES = (
+    ("agents.flight_agent.__main__", 8001),
+    ("agents.stay_agent.__main__", 8002),
+    ("agents.activities_agent.__main__", 8003),
+    ("agents.host_agent.__main__", 8000),
+)
+HOST_RUN_URL = "http://localhost:8000/run"
+# Puertos de las réplicas adicionales del flight_agent (--flight-replicas).
+FLIGHT_REPLICA_BASE_PORT = 8011
+
+# Destinos con los que se generan las solicitudes.
+_DESTINATIONS = ("Madrid", "Lima", "Bogotá", "Cancún", "Buenos Aires", "Cusco", "Roma", "Lisboa")
+
+
+def build_payload(index: int, distinct_trips: int) -> dict:
+    """
+    Solicitud número 'index'. Se repiten cíclicamente 'distinct_trips' viajes distintos,
+    así que con un valor bajo se ejercitan la caché y el single-flight y con uno alto
+    cada solicitud llega a los subagentes.
+    """
+    trip = index % max(distinct_trips, 1)
+    return {
+        "origin": "Ciudad de México",
+        "destination": _DESTINATIONS[trip % len(_DESTINATIONS)],
+        "start_date": f"2025-{(trip // len(_DESTINATIONS)) % 12 + 1:02d}-10",
+        "end_date": f"2025-{(trip // len(_DESTINATIONS)) % 12 + 1:02d}-17",
+        "budget": 1500 + 10 * (trip // (len(_DESTINATIONS) * 12)),
+    }
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Percentil por el método del rango más cercano sobre una lista ya ordenada.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def start_services(env: dict, log_dir: Optional[str], services: tuple = SERVICES) -> list:
+    processes = []
+    for module, port in services:
+        output = subprocess.DEVNULL
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+            output = open(os.path.join(log_dir, f"{module.split('.')[1]}_{port}.log"), "w")
+        process_env = {**env, "AGENT_PORT": str(port)}
+        processes.append(subprocess.Popen([sys.executable, "-m", module], env=process_env, stdout=output, stderr=subprocess.STDOUT))
+        print(f"Arrancado {module} (pid {processes[-1].pid}, puerto {port})")
+    return processes
+
+
+def with_flight_replicas(env: dict, replicas: int) -> tuple:
+    """
+    Añade réplicas del flight_agent a los agentes que se arrancan y escribe el archivo de
+    registro (A2A_REGISTRY_FILE) con el que el host reparte las llamadas entre ellas.
+    """
+    ports = [8001] + [FLIGHT_REPLICA_BASE_PORT + index for index in range(replicas - 1)]
+    registry_file = tempfile.NamedTemporaryFile("w", suffix=".json", prefix="a2a_registry_", delete=False)
+    with registry_file:
+        json.dump({"flight_agent": [f"http://localhost:{port}" for port in ports]}, registry_file)
+    env["A2A_REGISTRY_FILE"] = registry_file.name
+    extra = tuple(("agents.flight_agent.__main__", port) for port in ports[1:])
+    return SERVICES[:1] + extra + SERVICES[1:]
+
+
+def stop_services(processes: list) -> None:
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def wait_until_ready(timeout_seconds: float = 60.0, services: tuple = SERVICES) -> None:
+    """
+    Espera a que todos los agentes estén listos (GET /readyz responde 200, calentamiento incluido).
+    """
+    deadline = time.monotonic() + timeout_seconds
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        for _, port in services:
+            while True:
+                try:
+                    response = await client.get(f"http://localhost:{port}/readyz")
+                    if response.status_code == 200:
+                        break
+                except httpx.RequestError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"El agente del puerto {port} no arrancó en {timeout_seconds:.0f}s.")
+                await asyncio.sleep(0.25)
+
+
+async def drive_load(rps: float, duration: float, distinct_trips: int, timeout: float) -> dict:
+    """
+    Envía solicitudes al host a 'rps' por segundo durante 'duration' segundos y espera
+    a que terminen todas.
+
+    Returns:
+        dict: Resultados agregados (enviadas, correctas, errores, latencias, throughput).
+    """
+    latencies = []
+    outcomes = {"ok": 0, "partial": 0, "http_error": 0, "transport_error": 0}
+    total = int(rps * duration)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    headers = {"X-Request-Timeout-Ms": str(int(timeout * 1000))}
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout + 5) as client:
+        async def one_request(index: int) -> None:
+            started_at = time.perf_counter()
+            try:
+                response = await client.post(HOST_RUN_URL, json=build_payload(index, distinct_trips), headers=headers)
+            except httpx.RequestError:
+                outcomes["transport_error"] += 1
+                return
+            latencies.append(time.perf_counter() - started_at)
+            if response.status_code != 200:
+                outcomes["http_error"] += 1
+                return
+            statuses = response.json().get("status", {})
+            outcomes["ok" if all(status == "ok" for status in statuses.values()) else "partial"] += 1
+
+        started_at = time.perf_counter()
+        tasks = []
+        for index in range(total):
+            # Carga abierta: cada solicitud sale en su instante programado.
+            delay = started_at + index / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one_request(index)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started_at
+
+    latencies.sort()
+    failed = outcomes["http_error"] + outcomes["transport_error"]
+    return {
+        "target_rps": rps,
+        "duration_s": round(elapsed, 2),
+        "sent": total,
+        **outcomes,
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "throughput_rps": round((total - failed) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "max_ms": round((latencies[-1] if latencies else 0.0) * 1000, 1),
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Prueba de carga del host_agent con el modelo simulado.")
+    parser.add_argument("--rps", type=float, default=10.0, help="Solicitudes por segundo.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Duración de la carga en segundos.")
+    parser.add_argument("--distinct-trips", type=int, default=1000,
+                        help="Viajes distintos que se repiten cíclicamente (bajo = más aciertos de caché).")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Plazo de cada solicitud en segundos.")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Mediana de latencia del modelo simulado.")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Dispersión log-normal de la latencia.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proporción de llamadas al modelo que fallan.")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Proporción de respuestas con JSON inválido.")
+    parser.add_argument("--keep-cache", action="store_true",
+                        help="Mantiene la caché de respuestas activa (por defecto se desactiva para medir la orquestación).")
+    parser.add_argument("--dispatch-mode", choices=("http", "inprocess"), default="http",
+                        help="inprocess arranca sólo el host_agent, con los subagentes en su mismo proceso.")
+    parser.add_argument("--flight-replicas", type=int, default=1,
+                        help="Réplicas del flight_agent; el host reparte las llamadas entre ellas (modo http).")
+    parser.add_argument("--no-start", action="store_true", help="No arranca los agentes: usa los que ya estén en marcha.")
+    parser.add_argument("--log-dir", help="Directorio donde guardar la salida de cada agente.")
+    parser.add_argument("--json", dest="json_path", help="Guarda el resultado en este archivo JSON.")
+    parser.add_argument("--max-p95-ms", type=float, help="Falla si el p95 supera este valor.")
+    parser.add_argument("--max-p99-ms", type=float, help="Falla si el p99 supera este valor.")
+    parser.add_argument("--max-error-rate", type=float, help="Falla si la tasa de errores supera este valor.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    env = {
+        **os.environ,
+        "AGENT_MODEL_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_MS": str(args.latency_ms),
+        "FAKE_LLM_LATENCY_SIGMA": str(args.latency_sigma),
+        "FAKE_LLM_ERROR_RATE": str(args.error_rate),
+        "FAKE_LLM_MALFORMED_RATE": str(args.malformed_rate),
+    }
+    if not args.keep_cache:
+        env["RESPONSE_CACHE_ENABLED"] = "false"
+    env["A2A_DISPATCH_MODE"] = args.dispatch_mode
+    # En modo en proceso sólo se arranca el host_agent (el último de SERVICES).
+    services = SERVICES if args.dispatch_mode == "http" else SERVICES[-1:]
+    if args.dispatch_mode == "http" and args.flight_replicas > 1:
+        services = with_flight_replicas(env, args.flight_replicas)
+
+    processes = [] if args.no_start else start_services(env, args.log_dir, services)
+    try:
+        asyncio.run(wait_until_ready(services=services))
+        print(f"Enviando {args.rps} solicitudes/s durante {args.duration}s a {HOST_RUN_URL}...")
+        result = asyncio.run(drive_load(args.rps, args.duration, args.distinct_trips, args.timeout))
+    finally:
+        stop_services(processes)
+
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as result_file:
+            json.dump(result, result_file, indent=2)
+
+    failures = []
+    if args.max_p95_ms is not None and result["p95_ms"] > args.max_p95_ms:
+        failures.append(f"p95 {result['p95_ms']}ms > {args.max_p95_ms}ms")
+    if args.max_p99_ms is not None and result["p99_ms"] > args.max_p99_ms:
+        failures.append(f"p99 {result['p99_ms']}ms > {args.max_p99_ms}ms")
+    if args.max_error_rate is not None and result["error_rate"] > args.max_error_rate:
+        failures.append(f"tasa de errores {result['error_rate']} > {args.max_error_rate}")
+    for failure in failures:
+        print(f"REGRESIÓN: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# benchmarks/prompt_profiles.py
+"""
+Comparación de los perfiles de instrucciones de los agentes ("full" y "compact", ver
+common/prompts.py).
+
+Para cada agente (vuelos, alojamiento, actividades) y cada perfil construye su Runner con
+la instrucción de ese perfil, ejecuta N viajes y mide con PromptUsage el tamaño real de
+cada solicitud al modelo (instrucción, mensaje y esquema de salida, tal como los arma ADK),
+el tamaño de la respuesta y la tasa de respuestas que se validan con el output_schema.
+
+Por defecto usa el modelo simulado (AGENT_MODEL_BACKEND=fake) sin latencia: mide el tamaño
+de los prompts sin consumir cuota. El modelo simulado ignora las instrucciones, así que su
+tasa de éxito sólo depende de --malformed-rate; para comparar si el modelo real sigue igual
+de bien el perfil compacto, usa --backend gemini (necesita GOOGLE_API_KEY).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.prompt_profiles
+    python -m benchmarks.prompt_profiles --trips 50 --malformed-rate 0.1 --json resultado.json
+    python -m benchmarks.prompt_profiles --backend gemini --trips 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# Solicitudes de ejemplo: se combinan destinos y presupuestos.
+_DESTINATIONS = ("Madrid", "Lima", "Bogotá", "Cancún", "Buenos Aires", "Cusco", "Roma", "Lisboa")
+_BUDGETS = (800, 1500, 3000)
+
+
+def build_trips(count: int) -> list[dict]:
+    return [
+        {
+            "origin": "Ciudad de México",
+            "destination": _DESTINATIONS[index % len(_DESTINATIONS)],
+            "start_date": f"2025-{index % 12 + 1:02d}-10",
+            "end_date": f"2025-{index % 12 + 1:02d}-17",
+            "budget": _BUDGETS[index % len(_BUDGETS)],
+        }
+        for index in range(count)
+    ]
+
+
+async def run_profile(agent_name: str, module, profile: str, trips: list[dict]) -> dict:
+    """
+    Ejecuta los viajes con un agente y un perfil, sin caché ni streaming.
+    """
+    from google.genai import types
+    from pydantic import ValidationError
+
+    from common.prompts import (
+        OUTCOME_EMPTY, OUTCOME_ERROR, OUTCOME_JSON_INVALID, OUTCOME_OK, OUTCOME_SCHEMA_MISMATCH, PromptUsage,
+    )
+    from common.serialization import validate_json
+    from shared.schemas import TravelRequest
+
+    instruction = module.SYSTEM_INSTRUCTIONS[profile]
+    runner = module._build_runner(instruction)
+    response_model = runner.agent.output_schema
+    usages = []
+    for trip in trips:
+        user_prompt = module.build_user_prompt(TravelRequest(**trip), profile)
+        usage = PromptUsage(agent_name, profile, instruction, user_prompt)
+        response_text, outcome = "", OUTCOME_ERROR
+        message = types.Content(parts=[types.Part(text=user_prompt)], role="user")
+        try:
+            async with module.session_manager.session() as session_id:
+                with usage.measuring():
+                    async for event in runner.run_async(user_id=module.USER_ID, session_id=session_id, new_message=message):
+                        if event.is_final_response():
+                            if event.content and event.content.parts:
+                                response_text = event.content.parts[0].text or ""
+                            break
+            if not response_text:
+                outcome = OUTCOME_EMPTY
+            else:
+                validate_json(response_model, response_text)
+                outcome = OUTCOME_OK
+        except json.JSONDecodeError:
+            outcome = OUTCOME_JSON_INVALID
+        except ValidationError:
+            outcome = OUTCOME_SCHEMA_MISMATCH
+        except Exception as e: # Error del modelo (ej. FakeLlmError)
+            print(f"{agent_name}/{profile}: {type(e).__name__}: {e}", file=sys.stderr)
+        usage.finish(response_text, outcome)
+        usages.append(usage)
+
+    calls = len(usages)
+    outcomes = {}
+    for usage in usages:
+        outcomes[usage.outcome] = outcomes.get(usage.outcome, 0) + 1
+    return {
+        "calls": calls,
+        "system_chars": round(sum(u.system_chars for u in usages) / calls, 1),
+        "user_chars": round(sum(u.user_chars for u in usages) / calls, 1),
+        "schema_chars": round(sum(u.schema_chars for u in usages) / calls, 1),
+        "prompt_tokens": round(sum(u.prompt_tokens for u in usages) / calls, 1),
+        "output_tokens": round(sum(u.output_tokens for u in usages) / calls, 1),
+        "parse_success_rate": round(outcomes.get(OUTCOME_OK, 0) / calls, 3),
+        "outcomes": outcomes,
+    }
+
+
+async def run(trips: int) -> dict:
+    # Los agentes se importan aquí, después de configurar el backend del modelo en main().
+    from agents.activities_agent import agent as activities_agent
+    from agents.flight_agent import agent as flight_agent
+    from agents.stay_agent import agent as stay_agent
+    from common.prompts import PROMPT_PROFILES
+
+    requests = build_trips(trips)
+    result = {}
+    for agent_name, module in (
+        ("flight_agent", flight_agent), ("stay_agent", stay_agent), ("activities_agent", activities_agent),
+    ):
+        result[agent_name] = {
+            profile: await run_profile(agent_name, module, profile, requests) for profile in PROMPT_PROFILES
+        }
+        full, compact = result[agent_name]["full"], result[agent_name]["compact"]
+        result[agent_name]["prompt_tokens_saved_pct"] = round(
+            100 * (full["prompt_tokens"] - compact["prompt_tokens"]) / full["prompt_tokens"], 1
+        )
+    return result
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Tamaño de los prompts y tasa de parseo por perfil de instrucciones.")
+    parser.add_argument("--trips", type=int, default=20, help="Viajes por agente y perfil.")
+    parser.add_argument("--backend", choices=("fake", "gemini"), default="fake", help="Modelo con el que se ejecuta.")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fracción de respuestas JSON truncadas (sólo 'fake').")
+    parser.add_argument("--json", dest="json_path", help="Guarda el resultado en este archivo JSON.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # common.model_backend lee su configuración al importarse.
+    os.environ["AGENT_MODEL_BACKEND"] = args.backend
+    os.environ["FAKE_LLM_LATENCY_MS"] = "0"
+    os.environ["FAKE_LLM_MALFORMED_RATE"] = str(args.malformed_rate)
+    result = asyncio.run(run(args.trips))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as result_file:
+            json.dump(result, result_file, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
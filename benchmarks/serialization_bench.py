@@ -0,0 +1,196 @@
+# benchmarks/serialization_bench.py
+"""
+Microbenchmark del coste de CPU de serialización y validación por solicitud.
+
+Reproduce, sin red ni modelo, el trabajo de JSON y Pydantic que hace una solicitud de viaje
+al recorrer host -> flight/stay/activities -> host, con el camino anterior y con el actual
+(ver common/serialization.py):
+
+  - anterior: FastAPI interpreta el cuerpo con json, cada subagente vuelve a validar
+    TravelRequest(**request), la respuesta del LLM pasa por json.loads + Model(**datos) +
+    model_dump() y cada respuesta se codifica con jsonable_encoder + json.dumps.
+  - actual: orjson para cuerpos y respuestas, /run valida TravelRequest una vez por proceso
+    y el agente reutiliza el modelo, y la respuesta del LLM se valida con model_validate_json.
+
+Se miden los dos modos de llamada a los subagentes: "http" (un proceso por agente) e
+"inprocess" (A2A_DISPATCH_MODE=inprocess: el payload se copia con deepcopy y los subagentes
+reutilizan el TravelRequest que validó el host, sin volver a validarlo).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.serialization_bench
+    python -m benchmarks.serialization_bench --items 10 --iterations 5000 --json resultado.json
+"""
+import argparse
+import copy
+import json
+import random
+import sys
+import timeit
+
+from common import serialization
+from common.serialization import ValidatedPayload, as_model, dumps, loads, validate_json, validate_payload
+from shared.schemas import ActivitiesResponse, FlightsResponse, StaysResponse, TravelRequest
+
+try:
+    from fastapi.encoders import jsonable_encoder
+except ImportError: # Sin FastAPI se mide sólo json.dumps: el ahorro real es mayor que el medido
+    jsonable_encoder = None
+
+# Subagentes: (modelo de la respuesta del LLM, clave de la lista).
+SUBAGENTS = ((FlightsResponse, "flights"), (StaysResponse, "stays"), (ActivitiesResponse, "activities"))
+
+TRAVEL_REQUEST = {
+    "origin": "Ciudad de México",
+    "destination": "Lisboa",
+    "start_date": "2025-06-10",
+    "end_date": "2025-06-17",
+    "budget": 1500,
+}
+
+
+def _sample_item(key: str, index: int, rng: random.Random) -> dict:
+    if key == "flights":
+        return {
+            "airline": rng.choice(("Iberia", "LATAM", "Aeroméxico", "TAP")),
+            "price": f"${rng.randint(400, 1600):,} USD",
+            "departure_time": f"0{rng.randint(1, 9)}:30 PM on June 10, 2025",
+            "flight_details": f"Opción {index}: una escala, equipaje de mano incluido, comida a bordo.",
+        }
+    if key == "stays":
+        return {
+            "hotel_name": f"Hotel Lisboa {index}",
+            "price_per_night": f"EUR {rng.randint(60, 240)} per night",
+            "location": "Baixa, cerca del metro",
+            "details": "Habitación doble con desayuno, wifi gratuito y recepción 24 horas.",
+        }
+    return {
+        "name": f"Actividad {index}",
+        "description": "Recorrido guiado por el centro histórico con degustación de pastéis de nata.",
+        "price_estimate": f"EUR {rng.randint(10, 80)}",
+    }
+
+
+def llm_texts(items: int, seed: int = 0) -> dict:
+    """
+    Texto crudo de la respuesta del LLM de cada subagente, con 'items' opciones cada una.
+    """
+    rng = random.Random(seed)
+    return {key: json.dumps({key: [_sample_item(key, i, rng) for i in range(items)]}, ensure_ascii=False)
+            for _, key in SUBAGENTS}
+
+
+def _fastapi_encode(content) -> bytes:
+    # Lo que hacía FastAPI con el dict devuelto por el endpoint (sin response_model).
+    if jsonable_encoder is not None:
+        content = jsonable_encoder(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def previous_path(body: bytes, texts: dict, mode: str) -> bytes:
+    """
+    Una solicitud con el camino anterior.
+    """
+    payload = json.loads(body) # Cuerpo del /run del host (FastAPI)
+    responses = {}
+    for model, key in SUBAGENTS:
+        if mode == "http":
+            request = json.loads(json.dumps(payload)) # httpx json=payload y cuerpo del /run del subagente
+        else:
+            request = copy.deepcopy(payload) # call_agent en proceso
+        TravelRequest(**request) # Validación en el subagente
+        data = model(**json.loads(texts[key])).model_dump() # Respuesta del LLM
+        if mode == "http":
+            responses[key] = json.loads(_fastapi_encode(data)) # Respuesta del subagente y response.json() del host
+        else:
+            responses[key] = copy.deepcopy(data)
+    return _fastapi_encode(responses) # Respuesta del host
+
+
+def current_path(body: bytes, texts: dict, mode: str) -> bytes:
+    """
+    Una solicitud con el camino actual.
+    """
+    payload = validate_payload(loads(body), TravelRequest) # /run del host valida una vez
+    responses = {}
+    for model, key in SUBAGENTS:
+        if mode == "http":
+            request = validate_payload(loads(dumps(payload)), TravelRequest) # /run del subagente
+        else:
+            request = copy.deepcopy(payload) # Comparte el modelo ya validado por el host
+        as_model(request, TravelRequest) # El agente reutiliza el modelo
+        data = validate_json(model, texts[key]).model_dump()
+        responses[key] = loads(dumps(data)) if mode == "http" else copy.deepcopy(data)
+    return dumps(responses)
+
+
+def measure(function, iterations: int, repeat: int) -> float:
+    """
+    Microsegundos por llamada (la mejor de 'repeat' rondas).
+    """
+    return min(timeit.repeat(function, number=iterations, repeat=repeat)) / iterations * 1e6
+
+
+def run(items: int, iterations: int, repeat: int) -> dict:
+    texts = llm_texts(items)
+    body = json.dumps(TRAVEL_REQUEST, ensure_ascii=False).encode("utf-8")
+    text = texts["flights"]
+    validated = ValidatedPayload.from_model(TravelRequest(**TRAVEL_REQUEST))
+    stages = {
+        "llm_response": (
+            lambda: FlightsResponse(**json.loads(text)).model_dump(),
+            lambda: validate_json(FlightsResponse, text).model_dump(),
+        ),
+        "inprocess_hop_request": (
+            lambda: TravelRequest(**copy.deepcopy(TRAVEL_REQUEST)),
+            lambda: as_model(copy.deepcopy(validated), TravelRequest),
+        ),
+    }
+    result = {
+        "items_per_response": items,
+        "orjson": serialization.orjson is not None,
+        "fastapi_encoder": jsonable_encoder is not None,
+        "per_request_us": {},
+        "stages_us": {
+            name: {"previous": round(measure(old, iterations, repeat), 2), "current": round(measure(new, iterations, repeat), 2)}
+            for name, (old, new) in stages.items()
+        },
+    }
+    for mode in ("http", "inprocess"):
+        # Ambos caminos deben producir la misma respuesta.
+        assert json.loads(previous_path(body, texts, mode)) == loads(current_path(body, texts, mode))
+        previous = measure(lambda: previous_path(body, texts, mode), iterations, repeat)
+        current = measure(lambda: current_path(body, texts, mode), iterations, repeat)
+        result["per_request_us"][mode] = {
+            "previous": round(previous, 1),
+            "current": round(current, 1),
+            "saved": round(previous - current, 1),
+            "saved_pct": round(100 * (previous - current) / previous, 1),
+        }
+    return result
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Coste de CPU de serialización y validación por solicitud.")
+    parser.add_argument("--items", type=int, default=5, help="Opciones en cada respuesta del LLM.")
+    parser.add_argument("--iterations", type=int, default=2000, help="Llamadas por ronda.")
+    parser.add_argument("--repeat", type=int, default=5, help="Rondas (se toma la mejor).")
+    parser.add_argument("--json", dest="json_path", help="Guarda el resultado en este archivo JSON.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    result = run(args.items, args.iterations, args.repeat)
+    if not result["orjson"]:
+        print("Aviso: orjson no está instalado; el camino actual usa json.", file=sys.stderr)
+    if not result["fastapi_encoder"]:
+        print("Aviso: FastAPI no está instalado; el camino anterior no incluye jsonable_encoder.", file=sys.stderr)
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as result_file:
+            json.dump(result, result_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,33 +1,568 @@
 # common/a2a_client.py
 import httpx
 import asyncio
+import copy
+import importlib.util
+import json
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from urllib.parse import urlsplit
+
+from common.deadline import (
+    A2A_DEFAULT_DEADLINE_SECONDS, deadline_headers, remaining, reset_deadline, set_deadline,
+)
+from common.log import get_logger, request_id_headers
+from common.registry import Replica, registry
+from common.resilience import A2A_RETRY_ATTEMPTS, CircuitBreaker, backoff_delay, get_breaker
+from common.serialization import dumps, loads
+from common.tracing import SpanKind, mark_error, span, trace_headers
+
+logger = get_logger(__name__)
+
+# --- Configuración del pool de conexiones compartido ---
+# Los valores por defecto se pueden ajustar con variables de entorno sin tocar el código.
+A2A_MAX_CONNECTIONS = int(os.getenv("A2A_MAX_CONNECTIONS", "100"))
+A2A_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("A2A_MAX_KEEPALIVE_CONNECTIONS", "20"))
+A2A_KEEPALIVE_EXPIRY = float(os.getenv("A2A_KEEPALIVE_EXPIRY", "30.0"))
+A2A_HTTP2 = os.getenv("A2A_HTTP2", "false").lower() in ("1", "true", "yes")
+A2A_REQUEST_TIMEOUT = float(os.getenv("A2A_REQUEST_TIMEOUT", "60.0"))
+
+# Modo de llamada a los agentes: "http" (por defecto) envía cada llamada a su URL;
+# "inprocess" ejecuta directamente, sin HTTP ni JSON, los agentes registrados con
+# register_local_agent (despliegue en un solo proceso). Las URLs sin agente registrado
+# siguen llamándose por HTTP.
+A2A_DISPATCH_MODE = os.getenv("A2A_DISPATCH_MODE", "http").lower()
+
+# Cliente HTTP de larga duración compartido por todas las llamadas a agentes.
+# Se abre y se cierra desde el ciclo de vida de la app (ver common/a2a_server.create_app).
+_shared_client: Optional[httpx.AsyncClient] = None
+
+# Estadísticas de conexión por destino (host:puerto).
+_destination_stats: dict = {}
+
+# Agentes ejecutables en este proceso, por URL de su endpoint /run y /run/stream.
+_local_agents: dict[str, Callable[[dict], Awaitable[dict]]] = {}
+_local_streams: dict[str, Callable[[dict], AsyncIterator[dict]]] = {}
+
+# Códigos de estado que indican que el agente no procesó la solicitud, así que
+# reintentarla es seguro: 429 (rechazada por el limitador), 502 y 503.
+_RETRYABLE_STATUS_CODES = (429, 502, 503)
+
+# Códigos de estado que cuentan como fallo para el circuit breaker.
+_BREAKER_FAILURE_STATUS_CODES = (500, 502, 503)
+
+
+def open_client_pool(
+    max_connections: int = A2A_MAX_CONNECTIONS,
+    max_keepalive_connections: int = A2A_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = A2A_KEEPALIVE_EXPIRY,
+    http2: bool = A2A_HTTP2,
+) -> httpx.AsyncClient:
+    """
+    Crea el cliente HTTP compartido con un pool de conexiones persistentes (keep-alive).
+
+    Args:
+        max_connections (int): Número máximo de conexiones simultáneas del pool.
+        max_keepalive_connections (int): Conexiones inactivas que se mantienen abiertas para reutilizarlas.
+        keepalive_expiry (float): Segundos que una conexión inactiva permanece en el pool.
+        http2 (bool): Habilita HTTP/2 si el paquete opcional 'h2' está instalado.
+
+    Returns:
+        httpx.AsyncClient: El cliente compartido (si ya existía, se devuelve el mismo).
+    """
+    global _shared_client
+    if _shared_client is not None and not _shared_client.is_closed:
+        return _shared_client
+
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("A2A_HTTP2 activado pero el paquete 'h2' no está instalado. Se usará HTTP/1.1.")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    _shared_client = httpx.AsyncClient(limits=limits, http2=http2, timeout=A2A_REQUEST_TIMEOUT)
+    logger.info(
+        "Pool HTTP A2A abierto (max_connections=%s, max_keepalive=%s, keepalive_expiry=%ss, http2=%s)",
+        max_connections, max_keepalive_connections, keepalive_expiry, http2,
+    )
+    return _shared_client
+
+
+async def close_client_pool() -> None:
+    """
+    Cierra el cliente HTTP compartido y libera todas sus conexiones.
+    """
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
+        logger.info("Pool HTTP A2A cerrado.")
+
+
+def register_local_agent(
+    url: str,
+    execute: Callable[[dict], Awaitable[dict]],
+    execute_stream: Optional[Callable[[dict], AsyncIterator[dict]]] = None,
+) -> None:
+    """
+    Registra las funciones de un agente para llamarlo dentro de este proceso cuando
+    A2A_DISPATCH_MODE=inprocess.
+
+    Args:
+        url (str): La URL del endpoint /run del agente (la misma que se pasa a call_agent).
+        execute (Callable): La función 'run' de su task_manager.
+        execute_stream (Optional[Callable]): Su versión progresiva ('run_stream'), que
+                                             atiende las llamadas de stream_agent a url + "/stream".
+    """
+    _local_agents[url] = execute
+    if execute_stream is not None:
+        _local_streams[url + "/stream"] = execute_stream
+
+
+def _is_local(url: str, registry: dict) -> bool:
+    return A2A_DISPATCH_MODE == "inprocess" and url in registry
+
+
+def get_pool_stats() -> dict:
+    """
+    Devuelve las estadísticas de conexión por destino y el estado del pool.
+
+    Returns:
+        dict: Estado del pool y, por cada destino, peticiones, errores, peticiones en curso
+              y latencia media en milisegundos.
+    """
+    destinations = {}
+    for destination, stats in _destination_stats.items():
+        completed = stats["requests"] - stats["in_flight"]
+        destinations[destination] = {
+            "requests": stats["requests"],
+            "errors": stats["errors"],
+            "in_flight": stats["in_flight"],
+            "avg_latency_ms": round(stats["total_latency"] * 1000 / completed, 2) if completed else 0.0,
+        }
+    return {
+        "pool_open": _shared_client is not None and not _shared_client.is_closed,
+        "dispatch_mode": A2A_DISPATCH_MODE,
+        "destinations": destinations,
+    }
+
+
+def _destination(url: str) -> str:
+    split_url = urlsplit(url)
+    return f"{split_url.hostname}:{split_url.port or (443 if split_url.scheme == 'https' else 80)}"
+
+
+def _record_start(destination: str) -> None:
+    stats = _destination_stats.setdefault(
+        destination, {"requests": 0, "errors": 0, "in_flight": 0, "total_latency": 0.0}
+    )
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+
+
+def _record_end(destination: str, started_at: float, failed: bool) -> None:
+    stats = _destination_stats[destination]
+    stats["in_flight"] -= 1
+    stats["total_latency"] += time.perf_counter() - started_at
+    if failed:
+        stats["errors"] += 1
+
 
 async def call_agent(url: str, payload: dict) -> dict:
     """
     Realiza una llamada asíncrona a otro agente a través de su endpoint /run.
 
+    Usa el cliente compartido si el pool está abierto (ver open_client_pool); si no,
+    crea un cliente temporal para esta llamada.
+
+    Si la solicitud en curso tiene plazo (ver common/deadline.py), el timeout de la llamada
+    se limita al tiempo restante y éste se propaga al agente llamado en la cabecera
+    X-Request-Timeout-Ms. Las respuestas agotadas por plazo llevan "timed_out": True.
+
+    Los fallos en los que el agente no llegó a procesar la solicitud (error de conexión,
+    429, 502, 503) se reintentan con espera exponencial con jitter, respetando Retry-After
+    y el plazo. Cada agente tiene un circuit breaker (ver common/resilience.py): si está
+    abierto, la llamada falla al instante con "circuit_open": True.
+
+    Cada intento abre un span de cliente y propaga la traza al agente llamado en la
+    cabecera traceparent (ver common/tracing.py).
+
+    Si el agente tiene varias réplicas en el registro (ver common/registry.py), cada intento
+    va a la réplica elegida por el balanceador, con su propio circuit breaker; los
+    reintentos prefieren una réplica distinta de las ya probadas.
+
+    Con A2A_DISPATCH_MODE=inprocess, los agentes registrados con register_local_agent se
+    ejecutan en este proceso con la misma semántica: copia del payload y de la respuesta,
+    plazo propio descontando el margen del salto, reintentos, circuit breaker y estadísticas.
+
     Args:
         url (str): La URL del endpoint /run del agente a llamar.
         payload (dict): El diccionario de datos (basado en TravelRequest) a enviar.
 
     Returns:
-        dict: La respuesta JSON del agente.
+        dict: La respuesta JSON del agente, o un diccionario con la clave "error".
+    """
+    result = None
+    tried = [] # Réplicas ya usadas en intentos anteriores
+    for attempt in range(max(1, A2A_RETRY_ATTEMPTS)):
+        target_url, replica, breaker, probe = _route(url, tried, _local_agents)
+        if breaker is None:
+            logger.warning("Circuit breaker abierto para %s: se omite la llamada.", url)
+            if result is not None:
+                return result
+            return {"error": f"Circuit breaker abierto para {url}: el agente no está disponible.", "circuit_open": True}
+
+        breaker_outcome = None
+        replica_started_at = _begin_replica(replica, tried)
+        with span(f"call_agent {url}", kind=SpanKind.CLIENT, **{"http.url": target_url, "a2a.attempt": attempt + 1}) as current_span:
+            try:
+                call_once = _call_local_once if _is_local(url, _local_agents) else _post_once
+                result, breaker_outcome, retryable, retry_after = await call_once(target_url, payload)
+            finally:
+                breaker.record(breaker_outcome, probe) # None si la llamada se canceló a medias.
+                if replica is not None:
+                    replica.end(replica_started_at, failed=breaker_outcome is not True)
+            if isinstance(result, dict) and "error" in result:
+                mark_error(current_span, str(result["error"]))
+
+        if not retryable or attempt + 1 >= A2A_RETRY_ATTEMPTS:
+            return result
+        delay = max(backoff_delay(attempt), retry_after or 0.0)
+        budget = remaining()
+        if budget is not None and delay >= budget:
+            return result # No queda plazo para otro intento.
+        logger.info("Reintentando la llamada a %s en %.2fs (intento %s de %s).", url, delay, attempt + 2, A2A_RETRY_ATTEMPTS)
+        await asyncio.sleep(delay)
+    return result
+
+
+def _route(url: str, tried: list, local_registry: dict) -> tuple:
+    """
+    Elige a dónde va un intento de llamada a 'url': a la propia URL si el agente se ejecuta
+    en este proceso o no está en el registro, o a una de sus réplicas cuyo circuit breaker
+    admita la llamada.
+
+    Returns:
+        tuple: (URL del intento, réplica o None, circuit breaker que admitió la llamada, o
+                None si todos los circuit breakers están abiertos, y si la llamada es una
+                prueba del circuit breaker semiabierto, para pasarlo a record()).
+    """
+    service = None if _is_local(url, local_registry) else registry.resolve(url)
+    if service is None:
+        breaker = get_breaker(url)
+        allowed, probe = breaker.allow_request()
+        return url, None, breaker if allowed else None, probe
+    rejected = []
+    while True:
+        replica = service.choose(avoid=tried, exclude=rejected)
+        if replica is None:
+            return url, None, None, False
+        target_url = replica.url_for(url)
+        breaker: CircuitBreaker = get_breaker(target_url)
+        allowed, probe = breaker.allow_request()
+        if allowed:
+            return target_url, replica, breaker, probe
+        rejected.append(replica.base_url)
+
+
+def _begin_replica(replica: Optional[Replica], tried: list) -> Optional[float]:
+    if replica is None:
+        return None
+    tried.append(replica.base_url)
+    return replica.begin()
+
+
+async def _post_once(url: str, payload: dict) -> tuple:
+    """
+    Un único intento de llamada a un agente.
+
+    Returns:
+        tuple: (respuesta o diccionario de error, éxito para el circuit breaker,
+                si se puede reintentar, segundos de Retry-After o None).
+    """
+    budget = remaining()
+    if budget is not None and budget <= 0:
+        return {"error": f"Plazo de la solicitud agotado antes de llamar a {url}", "timed_out": True}, None, False, None
+    timeout = A2A_REQUEST_TIMEOUT if budget is None else min(A2A_REQUEST_TIMEOUT, budget)
+
+    destination = _destination(url)
+    _record_start(destination)
+    started_at = time.perf_counter()
+    failed = True
+
+    client = _shared_client if _shared_client is not None and not _shared_client.is_closed else None
+    temporary_client = client is None
+    if temporary_client:
+        client = httpx.AsyncClient()
+
+    try:
+        headers = _request_headers()
+        response = await client.post(url, content=dumps(payload), timeout=timeout, headers=headers)
+        response.raise_for_status()  # Lanza una excepción para respuestas 4xx/5xx
+        result = loads(response.content)
+        failed = False
+        return result, True, False, None
+    except httpx.HTTPStatusError as e:
+        # Podrías añadir un logging más robusto aquí
+        logger.warning("Error al llamar al agente en %s: %s", url, e)
+        # Devuelve un error estructurado si lo prefieres, o relanza la excepción
+        # Para este ejemplo, devolvemos un diccionario con el error.
+        return _status_error_outcome(e)
+    except httpx.TimeoutException as e:
+        # No se reintenta: el agente pudo haber recibido la solicitud y seguir procesándola.
+        logger.warning("Timeout al llamar al agente en %s (límite %.1fs): %s", url, timeout, e)
+        return {"error": f"Timeout calling {url}: {e}", "timed_out": True}, False, False, None
+    except httpx.RequestError as e:
+        # Para otros errores de red (ej. no se puede conectar)
+        logger.warning("Error de solicitud al agente en %s: %s", url, e)
+        return {"error": f"Request error to {url}: {e}"}, False, True, None
+    finally:
+        _record_end(destination, started_at, failed)
+        if temporary_client:
+            await client.aclose()
+
+
+def _request_headers() -> dict:
+    """
+    Cabeceras de una llamada a otro agente: cuerpo JSON (serializado con orjson, ver
+    common/serialization.py), plazo, traza e identificador de la solicitud.
+    """
+    return {"Content-Type": "application/json", **deadline_headers(), **trace_headers(), **request_id_headers()}
+
+
+async def _call_local_once(url: str, payload: dict) -> tuple:
+    """
+    Un único intento de llamada a un agente registrado en este proceso. Devuelve lo mismo
+    que _post_once: el agente recibe su propio plazo, como si leyera X-Request-Timeout-Ms,
+    y las excepciones se traducen como un 500.
+    """
+    budget = remaining()
+    if budget is not None and budget <= 0:
+        return {"error": f"Plazo de la solicitud agotado antes de llamar a {url}", "timed_out": True}, None, False, None
+    timeout = A2A_REQUEST_TIMEOUT if budget is None else min(A2A_REQUEST_TIMEOUT, budget)
+
+    destination = _destination(url)
+    _record_start(destination)
+    started_at = time.perf_counter()
+    failed = True
+    try:
+        result = await asyncio.wait_for(_run_local(_local_agents[url], payload, budget), timeout=timeout)
+        failed = False
+        return copy.deepcopy(result), True, False, None # Copia: el llamante no comparte objetos con el agente.
+    except asyncio.TimeoutError:
+        logger.warning("Timeout al llamar al agente local %s (límite %.1fs)", url, timeout)
+        return {"error": f"Timeout calling {url}", "timed_out": True}, False, False, None
+    except Exception as e:
+        logger.warning("Error al llamar al agente local %s: %s - %s", url, type(e).__name__, e)
+        return {"error": f"Internal error in {url}: {type(e).__name__}: {e}"}, False, False, None
+    finally:
+        _record_end(destination, started_at, failed)
+
+
+async def _run_local(execute: Callable[[dict], Awaitable[dict]], payload: dict, budget: Optional[float]) -> dict:
+    # Se ejecuta en su propia tarea (asyncio.wait_for), así que el plazo fijado aquí no
+    # afecta al llamante.
+    token = set_deadline(A2A_DEFAULT_DEADLINE_SECONDS if budget is None else budget)
+    try:
+        return await execute(copy.deepcopy(payload))
+    finally:
+        reset_deadline(token)
+
+
+def _status_error_outcome(error: httpx.HTTPStatusError) -> tuple:
+    """
+    Traduce una respuesta 4xx/5xx a (diccionario de error, éxito para el circuit breaker,
+    si se puede reintentar, segundos de Retry-After o None).
+    """
+    status_code = error.response.status_code
+    error_response = {"error": str(error), "details": error.response.text if error.response else "No response"}
+    if status_code == 504: # El agente agotó su plazo
+        error_response["timed_out"] = True
+    retry_after = _parse_retry_after(error.response.headers.get("Retry-After"))
+    return (error_response, status_code not in _BREAKER_FAILURE_STATUS_CODES,
+            status_code in _RETRYABLE_STATUS_CODES, retry_after)
+
+
+class _StreamFailure(Exception):
+    """
+    Fallo de una llamada a /run/stream, con la misma información que devuelve _post_once.
+    """
+    def __init__(self, error_response: dict, breaker_outcome: Optional[bool], retryable: bool,
+                 retry_after: Optional[float] = None):
+        super().__init__(error_response.get("error"))
+        self.error_response = error_response
+        self.breaker_outcome = breaker_outcome
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+async def stream_agent(url: str, payload: dict) -> AsyncIterator[dict]:
+    """
+    Llama al endpoint /run/stream de otro agente y emite cada evento NDJSON en cuanto llega.
+
+    Aplica el mismo plazo, balanceo entre réplicas, circuit breaker, trazas y estadísticas
+    por destino que call_agent.
+    Los fallos se reintentan sólo si ocurren antes del primer evento (después, el llamante
+    ya habría recibido resultados parciales) y se emiten como evento final
+    {"type": "result", "data": {"error": ...}}, con "timed_out": True si venció el plazo.
+
+    Args:
+        url (str): La URL del endpoint /run/stream del agente.
+        payload (dict): El diccionario de datos (basado en TravelRequest) a enviar.
+
+    Yields:
+        dict: Los eventos del agente (ej. {"type": "item", ...} y {"type": "result", ...}).
+    """
+    tried = [] # Réplicas ya usadas en intentos anteriores
+    for attempt in range(max(1, A2A_RETRY_ATTEMPTS)):
+        target_url, replica, breaker, probe = _route(url, tried, _local_streams)
+        if breaker is None:
+            logger.warning("Circuit breaker abierto para %s: se omite la llamada.", url)
+            yield {"type": "result", "data": {
+                "error": f"Circuit breaker abierto para {url}: el agente no está disponible.", "circuit_open": True}}
+            return
+
+        received_events = False
+        breaker_outcome = None
+        last_failure = None
+        replica_started_at = _begin_replica(replica, tried)
+        with span(f"stream_agent {url}", kind=SpanKind.CLIENT, **{"http.url": target_url, "a2a.attempt": attempt + 1}) as current_span:
+            try:
+                stream_once = _stream_local_once if _is_local(url, _local_streams) else _stream_once
+                async for event in stream_once(target_url, payload):
+                    received_events = True
+                    yield event
+                breaker_outcome = True
+                return
+            except _StreamFailure as failure:
+                last_failure = failure
+                breaker_outcome = failure.breaker_outcome
+                mark_error(current_span, str(failure))
+            finally:
+                breaker.record(breaker_outcome, probe) # None si la llamada se canceló a medias.
+                if replica is not None:
+                    replica.end(replica_started_at, failed=breaker_outcome is not True)
+
+        if received_events or not last_failure.retryable or attempt + 1 >= A2A_RETRY_ATTEMPTS:
+            yield {"type": "result", "data": last_failure.error_response}
+            return
+        delay = max(backoff_delay(attempt), last_failure.retry_after or 0.0)
+        budget = remaining()
+        if budget is not None and delay >= budget:
+            yield {"type": "result", "data": last_failure.error_response}
+            return
+        logger.info("Reintentando la llamada a %s en %.2fs (intento %s de %s).", url, delay, attempt + 2, A2A_RETRY_ATTEMPTS)
+        await asyncio.sleep(delay)
+
+
+async def _stream_once(url: str, payload: dict) -> AsyncIterator[dict]:
+    """
+    Un único intento de llamada a /run/stream.
 
     Raises:
-        httpx.HTTPStatusError: Si la respuesta del agente no es exitosa (código de estado >= 400).
+        _StreamFailure: Si la llamada falla o la respuesta no es NDJSON válido.
     """
-    async with httpx.AsyncClient() as client:
+    budget = remaining()
+    if budget is not None and budget <= 0:
+        raise _StreamFailure({"error": f"Plazo de la solicitud agotado antes de llamar a {url}", "timed_out": True}, None, False)
+    timeout = A2A_REQUEST_TIMEOUT if budget is None else min(A2A_REQUEST_TIMEOUT, budget)
+
+    destination = _destination(url)
+    _record_start(destination)
+    started_at = time.perf_counter()
+    failed = True
+
+    client = _shared_client if _shared_client is not None and not _shared_client.is_closed else None
+    temporary_client = client is None
+    if temporary_client:
+        client = httpx.AsyncClient()
+
+    try:
+        headers = _request_headers()
+        async with client.stream("POST", url, content=dumps(payload), timeout=timeout, headers=headers) as response:
+            if response.is_error:
+                await response.aread() # Para incluir el cuerpo del error en los detalles
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield loads(line)
+        failed = False
+    except httpx.HTTPStatusError as e:
+        logger.warning("Error al llamar al agente en %s: %s", url, e)
+        raise _StreamFailure(*_status_error_outcome(e))
+    except httpx.TimeoutException as e:
+        logger.warning("Timeout al llamar al agente en %s (límite %.1fs): %s", url, timeout, e)
+        raise _StreamFailure({"error": f"Timeout calling {url}: {e}", "timed_out": True}, False, False)
+    except httpx.RequestError as e:
+        logger.warning("Error de solicitud al agente en %s: %s", url, e)
+        raise _StreamFailure({"error": f"Request error to {url}: {e}"}, False, True)
+    except json.JSONDecodeError as e:
+        logger.warning("Evento NDJSON inválido desde el agente en %s: %s", url, e)
+        raise _StreamFailure({"error": f"Invalid NDJSON from {url}: {e}"}, True, False)
+    finally:
+        _record_end(destination, started_at, failed)
+        if temporary_client:
+            await client.aclose()
+
+
+async def _stream_local_once(url: str, payload: dict) -> AsyncIterator[dict]:
+    """
+    Un único intento de llamada a la versión progresiva de un agente registrado en este
+    proceso. El agente se ejecuta en su propia tarea, con su propio plazo, y sus eventos
+    llegan por una cola.
+
+    Raises:
+        _StreamFailure: Si el agente falla o no termina antes del plazo.
+    """
+    budget = remaining()
+    if budget is not None and budget <= 0:
+        raise _StreamFailure({"error": f"Plazo de la solicitud agotado antes de llamar a {url}", "timed_out": True}, None, False)
+    timeout = A2A_REQUEST_TIMEOUT if budget is None else min(A2A_REQUEST_TIMEOUT, budget)
+    ends_at = time.monotonic() + timeout
+
+    destination = _destination(url)
+    _record_start(destination)
+    started_at = time.perf_counter()
+    failed = True
+    events: asyncio.Queue = asyncio.Queue()
+    finished = object() # Marca de fin del stream
+
+    async def produce() -> None:
+        token = set_deadline(A2A_DEFAULT_DEADLINE_SECONDS if budget is None else budget)
         try:
-            response = await client.post(url, json=payload, timeout=60.0)
-            response.raise_for_status()  # Lanza una excepción para respuestas 4xx/5xx
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            # Podrías añadir un logging más robusto aquí
-            print(f"Error al llamar al agente en {url}: {e}")
-            # Devuelve un error estructurado si lo prefieres, o relanza la excepción
-            # Para este ejemplo, devolvemos un diccionario con el error.
-            return {"error": str(e), "details": e.response.text if e.response else "No response"}
-        except httpx.RequestError as e:
-            # Para otros errores de red (ej. no se puede conectar)
-            print(f"Error de solicitud al agente en {url}: {e}")
-            return {"error": f"Request error to {url}: {e}"}
\ No newline at end of file
+            async for event in _local_streams[url](copy.deepcopy(payload)):
+                events.put_nowait(copy.deepcopy(event))
+        finally:
+            reset_deadline(token)
+
+    producer = asyncio.create_task(produce())
+    producer.add_done_callback(lambda _: events.put_nowait(finished))
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(events.get(), timeout=max(ends_at - time.monotonic(), 0.0))
+            except asyncio.TimeoutError:
+                logger.warning("Timeout al llamar al agente local %s (límite %.1fs)", url, timeout)
+                raise _StreamFailure({"error": f"Timeout calling {url}", "timed_out": True}, False, False)
+            if event is finished:
+                break
+            yield event
+        if not producer.cancelled() and producer.exception() is not None:
+            error = producer.exception()
+            logger.warning("Error al llamar al agente local %s: %s - %s", url, type(error).__name__, error)
+            raise _StreamFailure({"error": f"Internal error in {url}: {type(error).__name__}: {error}"}, False, False)
+        failed = False
+    finally:
+        producer.cancel()
+        _record_end(destination, started_at, failed)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None # Retry-After en formato fecha: se usa la espera exponencial.
@@ -1,34 +1,533 @@
 # common/a2a_server.py
-from fastapi import FastAPI
+import asyncio
+import functools
+import inspect
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Optional, Sequence
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.background import BackgroundTask
 import uvicorn # Aunque uvicorn se usa en __main__.py, importarlo aquí no causa problema
                 # y es a veces útil para tipado o stubs si se expande la función.
 
-def create_app(agent_executor: object) -> FastAPI:
+from common.a2a_client import open_client_pool, close_client_pool, get_pool_stats
+from common.batch import A2A_BATCH_CONCURRENCY, A2A_BATCH_MAX_ITEMS, run_batch
+from common.concurrency import A2A_LIMIT_ENABLED, AdaptiveLimiter, LimitExceeded
+from common.log import (
+    REQUEST_ID_HEADER, configure_logging, get_logger, get_request_id, logging_stats, reset_request_id,
+    set_request_id, shutdown_logging,
+)
+from common.metrics import HTTP_REQUEST_SECONDS, render_metrics
+from common.prompts import prompt_stats
+from common.serialization import dumps, loads, validate_payload
+from common.startup import mark_ready, startup_report
+from common.tracing import configure_tracing, mark_error, server_span, shutdown_tracing
+from common.deadline import (
+    A2A_DEADLINE_HOP_MARGIN_SECONDS, timeout_from_headers, set_deadline, reset_deadline, remaining,
+)
+
+logger = get_logger(__name__)
+
+def create_app(
+    agent_executor: object,
+    use_client_pool: bool = False,
+    stats_providers: Optional[dict[str, Callable[[], dict]]] = None,
+    concurrency_limiter: Optional[AdaptiveLimiter] = None,
+    service_name: Optional[str] = None,
+    startup_hooks: Optional[Sequence[Callable]] = None,
+    shutdown_hooks: Optional[Sequence[Callable]] = None,
+    request_model: Optional[type[BaseModel]] = None,
+    limited_routes: Optional[dict[str, Callable]] = None,
+) -> FastAPI:
     """
     Crea una aplicación FastAPI con un endpoint /run estándar que delega
     la ejecución al método 'execute' del objeto agente_executor proporcionado.
 
+    Si el objeto tiene además un generador asíncrono `execute_stream(payload: dict)`,
+    se añade el endpoint /run/stream, que envía cada evento como una línea JSON
+    (NDJSON) en cuanto está disponible.
+
+    El endpoint /run/batch recibe una lista de solicitudes, las ejecuta con concurrencia
+    limitada (eliminando duplicados) y devuelve cada resultado como NDJSON en orden de
+    finalización.
+
+    Cada solicitud tiene un plazo, tomado de la cabecera X-Request-Timeout-Ms o del valor
+    por defecto (ver common/deadline.py). El plazo queda disponible para el agente y para
+    sus llamadas salientes; si 'execute' no termina a tiempo, /run responde 504.
+
+    Las ejecuciones pasan por un limitador de concurrencia adaptativo (ver
+    common/concurrency.py): si el agente está saturado, /run, /run/stream y las rutas de
+    'limited_routes' responden 429 con la cabecera Retry-After en lugar de acumular solicitudes.
+
+    GET /stats devuelve las estadísticas internas en JSON y GET /metrics las mismas
+    estadísticas junto con las métricas de common/metrics.py (latencias por endpoint,
+    llamadas al LLM, errores de parseo, etc.) en formato Prometheus.
+
+    Las solicitudes a /run, /run/stream y /run/batch abren un span que continúa la traza
+    del llamante (cabecera traceparent); si A2A_TRACE_FILE está definido, los spans se
+    exportan a ese archivo JSONL (ver common/tracing.py).
+
+    Al arrancar, los 'startup_hooks' (ej. el calentamiento del Runner) se ejecutan en
+    segundo plano, en orden. GET /healthz responde 200 mientras el proceso esté vivo y
+    GET /readyz responde 503 hasta que terminan (y de nuevo al apagarse), para que un
+    despliegue progresivo no envíe tráfico a un agente frío. /stats incluye el informe de
+    arranque con el coste de las importaciones (ver common/startup.py).
+
+    Si se indica 'request_model', /run, /run/stream y cada elemento de /run/batch validan la
+    solicitud con él directamente desde el cuerpo (422 si no lo cumple) y el agente recibe un
+    ValidatedPayload que lleva el modelo ya validado, así que no necesita validarlo de nuevo
+    (ver common/serialization.py). Los cuerpos se interpretan y las respuestas se serializan
+    con orjson, sin pasar por la codificación genérica de FastAPI.
+
     Args:
         agent_executor (object): Un objeto que debe tener un método asíncrono
                                  `execute(payload: dict) -> dict`.
+        use_client_pool (bool): Si es True, el pool HTTP compartido de common.a2a_client
+                                se abre al arrancar la app y se cierra al apagarla.
+                                Lo usan los agentes que llaman a otros agentes (host_agent).
+        stats_providers (Optional[dict]): Funciones sin argumentos que devuelven estadísticas
+                                          adicionales (ej. sesiones); se publican en /stats
+                                          bajo su clave.
+        concurrency_limiter (Optional[AdaptiveLimiter]): Limitador a usar. Si es None se crea
+                                                         uno con la configuración del entorno
+                                                         (salvo que A2A_LIMIT_ENABLED=false).
+        service_name (Optional[str]): Nombre del agente en las trazas exportadas. Si es None,
+                                      las trazas de este proceso no se registran.
+        startup_hooks (Optional[Sequence[Callable]]): Funciones sin argumentos (síncronas o
+                                                      asíncronas) que preparan el agente al arrancar.
+        shutdown_hooks (Optional[Sequence[Callable]]): Funciones sin argumentos que se ejecutan
+                                                       al apagar, antes de cerrar el pool HTTP.
+        request_model (Optional[type[BaseModel]]): Modelo de las solicitudes (ej. TravelRequest).
+                                                   Si es None, se acepta cualquier objeto JSON.
+        limited_routes (Optional[dict[str, Callable]]): Endpoints POST adicionales (ruta -> función
+                                                        de FastAPI con un parámetro 'request: Request')
+                                                        que pasan por el mismo plazo y limitador que
+                                                        /run (ej. /run/sweep del host_agent).
 
     Returns:
         FastAPI: Una instancia de la aplicación FastAPI configurada.
     """
-    app = FastAPI()
+    # Estado de preparación publicado en /readyz: "starting", "ready", "failed" o "stopping".
+    readiness = {"state": "starting", "error": None}
+
+    async def warm_up() -> None:
+        started_at = time.perf_counter()
+        try:
+            for hook in startup_hooks or ():
+                await _call_hook(hook)
+        except Exception as e:
+            readiness.update(state="failed", error=f"{type(e).__name__}: {e}")
+            logger.error("Falló el calentamiento del agente: %s", readiness["error"])
+            return
+        readiness["state"] = "ready"
+        mark_ready(time.perf_counter() - started_at)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if use_client_pool:
+            open_client_pool()
+        # El calentamiento corre en segundo plano: el servidor ya acepta /healthz mientras tanto.
+        warm_up_task = asyncio.create_task(warm_up())
+        try:
+            yield
+        finally:
+            readiness["state"] = "stopping"
+            warm_up_task.cancel()
+            for hook in shutdown_hooks or ():
+                try:
+                    await _call_hook(hook)
+                except Exception as e:
+                    logger.warning("Error en un hook de apagado: %s - %s", type(e).__name__, e)
+            if use_client_pool:
+                await close_client_pool()
+            shutdown_tracing()
+            shutdown_logging()
+
+    configure_logging(service_name)
+    if service_name:
+        configure_tracing(service_name)
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(_TracingMiddleware)
+    app.add_middleware(_RequestMetricsMiddleware, fastapi_app=app)
+
+    limiter = concurrency_limiter
+    if limiter is None and A2A_LIMIT_ENABLED:
+        limiter = AdaptiveLimiter()
+
+    async def acquire_slot() -> Optional[float]:
+        """
+        Reserva un hueco del limitador (sin esperar más que el plazo de la solicitud) y
+        devuelve el instante de inicio; None si no hay limitador.
+        """
+        if limiter is None:
+            return None
+        await limiter.acquire(max_wait=remaining())
+        return time.monotonic()
+
+    def release_slot(started_at: Optional[float], succeeded: bool) -> None:
+        if limiter is not None and started_at is not None:
+            limiter.release(time.monotonic() - started_at, succeeded)
+
+    def parse_payload(data):
+        """
+        Valida una solicitud ya interpretada con 'request_model', si lo hay.
+
+        Raises:
+            pydantic.ValidationError: Si la solicitud no cumple el modelo.
+        """
+        return data if request_model is None else validate_payload(data, request_model)
+
+    async def read_payload(request: Request):
+        """
+        Lee y valida el cuerpo de /run y /run/stream.
+
+        Returns:
+            tuple: (solicitud, None) o (None, respuesta 422 si el cuerpo no es JSON válido o no
+                   cumple el modelo).
+        """
+        try:
+            data = loads(await request.body())
+        except json.JSONDecodeError as e:
+            return None, _unprocessable(f"El cuerpo de la solicitud no es JSON válido: {e}")
+        if request_model is None and not isinstance(data, dict):
+            return None, _unprocessable("La solicitud debe ser un objeto JSON.")
+        try:
+            return parse_payload(data), None
+        except ValidationError as e:
+            return None, _unprocessable("La solicitud no cumple el modelo.", e)
+
+    async def limited_execute(payload: dict) -> dict:
+        # Versión de 'execute' para los elementos de un lote: un rechazo del limitador o una
+        # solicitud inválida se devuelven como error del elemento en lugar de detener el lote.
+        try:
+            payload = parse_payload(payload)
+        except ValidationError as e:
+            return {"error": f"Solicitud inválida: {e}"}
+        try:
+            started_at = await acquire_slot()
+        except LimitExceeded as e:
+            return {"error": str(e), "rejected": True, "retry_after": e.retry_after}
+        succeeded = False
+        try:
+            result = await agent_executor.execute(payload)
+            succeeded = not _timed_out(result)
+            return result
+        finally:
+            release_slot(started_at, succeeded)
 
     @app.post("/run")
-    async def run_agent_logic(payload: dict) -> dict:
+    async def run_agent_logic(request: Request):
         """
         Endpoint que recibe la carga útil y la pasa al método execute del agente.
         """
-        # Aquí asumimos que el objeto 'agent' (o 'agent_executor')
-        # tiene un método 'execute' que toma el payload.
-        return await agent_executor.execute(payload)
+        payload, error_response = await read_payload(request)
+        if error_response is not None:
+            return error_response
+        token = set_deadline(timeout_from_headers(request.headers))
+        started_at = None
+        succeeded = False
+        try:
+            started_at = await acquire_slot()
+            # Aquí asumimos que el objeto 'agent' (o 'agent_executor')
+            # tiene un método 'execute' que toma el payload.
+            # Guarda de último recurso: se corta a mitad del margen del salto, de modo que
+            # el agente pueda devolver antes sus resultados parciales y el llamante reciba
+            # el 504 antes de agotar su propio plazo.
+            result = await asyncio.wait_for(agent_executor.execute(payload), timeout=_guard_timeout())
+            # Un resultado parcial por plazo agotado cuenta como fallo para el limitador, igual que en los lotes.
+            succeeded = not _timed_out(result)
+            return FastJSONResponse(content=result)
+        except LimitExceeded as e:
+            return _too_many_requests(e)
+        except asyncio.TimeoutError:
+            logger.warning("El agente no terminó antes del plazo de la solicitud.")
+            return JSONResponse(
+                status_code=504,
+                content={"error": "Plazo de la solicitud agotado en el agente.", "timed_out": True},
+            )
+        finally:
+            release_slot(started_at, succeeded)
+            reset_deadline(token)
+
+    if hasattr(agent_executor, "execute_stream"):
+        @app.post("/run/stream")
+        async def run_agent_logic_stream(request: Request):
+            """
+            Endpoint que devuelve los eventos de execute_stream como NDJSON, uno por línea.
+            """
+            payload, error_response = await read_payload(request)
+            if error_response is not None:
+                return error_response
+            timeout_seconds = timeout_from_headers(request.headers)
+            token = set_deadline(timeout_seconds)
+            try:
+                # El hueco se reserva antes de empezar a responder para poder devolver 429.
+                started_at = await acquire_slot()
+            except LimitExceeded as e:
+                return _too_many_requests(e)
+            finally:
+                reset_deadline(token)
+
+            released = False
+            def release_once(succeeded: bool = True) -> None:
+                # Se llama al terminar el stream y también como tarea de fondo de la respuesta,
+                # por si el cliente se desconecta antes de que el generador empiece.
+                nonlocal released
+                if not released:
+                    released = True
+                    release_slot(started_at, succeeded)
+
+            async def ndjson_events():
+                # El plazo se fija dentro del generador porque se consume después de que el
+                # endpoint retorne; execute_stream es responsable de respetarlo.
+                token = set_deadline(timeout_seconds)
+                succeeded = False
+                try:
+                    async for event in agent_executor.execute_stream(payload):
+                        yield dumps(event) + b"\n"
+                    succeeded = True
+                finally:
+                    reset_deadline(token)
+                    release_once(succeeded)
+
+            return StreamingResponse(
+                ndjson_events(), media_type="application/x-ndjson", background=BackgroundTask(release_once)
+            )
+
+    @app.post("/run/batch")
+    async def run_agent_logic_batch(request: Request, concurrency: int = A2A_BATCH_CONCURRENCY):
+        """
+        Endpoint que ejecuta un lote de solicitudes y devuelve un resultado por línea
+        (NDJSON) con su índice y estado, a medida que cada una termina.
+        """
+        try:
+            payload = loads(await request.body())
+        except json.JSONDecodeError as e:
+            return _unprocessable(f"El cuerpo de la solicitud no es JSON válido: {e}")
+        if not isinstance(payload, list):
+            return _unprocessable("El lote debe ser una lista JSON de solicitudes.")
+        if len(payload) > A2A_BATCH_MAX_ITEMS:
+            return JSONResponse(
+                status_code=413,
+                content={"error": f"El lote supera el máximo de {A2A_BATCH_MAX_ITEMS} solicitudes."},
+            )
+        timeout_seconds = timeout_from_headers(request.headers)
+
+        async def ndjson_results():
+            token = set_deadline(timeout_seconds)
+            try:
+                async for event in run_batch(payload, limited_execute, concurrency):
+                    yield dumps(event) + b"\n"
+            finally:
+                reset_deadline(token)
+
+        return StreamingResponse(ndjson_results(), media_type="application/x-ndjson")
+
+    def limited_route(endpoint: Callable) -> Callable:
+        """
+        Envuelve un endpoint adicional con el plazo de la solicitud y un hueco del limitador,
+        como /run: 429 si el agente está saturado y fallo para el limitador si el endpoint
+        lanza una excepción o devuelve un resultado con "timed_out".
+        """
+        request_param = next(
+            (name for name, param in inspect.signature(endpoint).parameters.items() if param.annotation is Request),
+            None,
+        )
+        if request_param is None:
+            raise TypeError(f"El endpoint {endpoint.__name__} debe recibir un parámetro 'request: Request'.")
+
+        @functools.wraps(endpoint) # FastAPI lee los parámetros de la firma original
+        async def limited_endpoint(*args, **kwargs):
+            token = set_deadline(timeout_from_headers(kwargs[request_param].headers))
+            started_at = None
+            succeeded = False
+            try:
+                started_at = await acquire_slot()
+                result = await endpoint(*args, **kwargs)
+                succeeded = not _timed_out(result)
+                return result
+            except LimitExceeded as e:
+                return _too_many_requests(e)
+            finally:
+                release_slot(started_at, succeeded)
+                reset_deadline(token)
+
+        return limited_endpoint
+
+    for path, endpoint in (limited_routes or {}).items():
+        app.post(path)(limited_route(endpoint))
+
+    @app.get("/healthz")
+    async def healthz() -> dict:
+        """
+        Sonda de vida: el proceso responde.
+        """
+        return {"status": "ok"}
+
+    @app.get("/readyz")
+    async def readyz():
+        """
+        Sonda de preparación: 200 cuando el calentamiento terminó y el agente acepta tráfico;
+        503 mientras arranca, si el calentamiento falló o mientras se apaga.
+        """
+        if readiness["state"] == "ready":
+            return {"status": "ready"}
+        content = {"status": readiness["state"]}
+        if readiness["error"]:
+            content["error"] = readiness["error"]
+        return JSONResponse(status_code=503, content=content)
+
+    def collect_stats() -> dict:
+        result = {"http_pool": get_pool_stats(), "startup": startup_report(), "logging": logging_stats()}
+        # Tamaño de las llamadas al LLM de los agentes de este proceso (ver common/prompts.py).
+        result["prompts"] = prompt_stats()
+        if limiter is not None:
+            result["limiter"] = limiter.stats()
+        for name, provider in (stats_providers or {}).items():
+            result[name] = provider()
+        return result
+
+    @app.get("/stats")
+    async def stats() -> dict:
+        """
+        Endpoint con estadísticas internas del agente (pool de conexiones salientes,
+        limitador de concurrencia, sesiones y cualquier otro proveedor registrado).
+        """
+        return collect_stats()
+
+    @app.get("/metrics")
+    async def metrics() -> PlainTextResponse:
+        """
+        Endpoint de métricas en formato de exposición de Prometheus.
+        """
+        return PlainTextResponse(render_metrics(collect_stats()), media_type="text/plain; version=0.0.4")
 
     # Opcionalmente, puedes añadir el endpoint .well-known/agent.json aquí
     # si todos tus agentes van a tener uno y quieres centralizar su servicio,
     # aunque el PDF lo muestra como un archivo estático por agente.
     # Por ahora, seguiremos la estructura del PDF con archivos agent.json estáticos.
 
-    return app
\ No newline at end of file
+    return app
+
+class FastJSONResponse(JSONResponse):
+    """
+    Respuesta JSON serializada con orjson (ver common/serialization.py). Los endpoints /run
+    la devuelven directamente, sin pasar por jsonable_encoder de FastAPI.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+class _RequestMetricsMiddleware:
+    """
+    Middleware ASGI que mide la duración de cada solicitud HTTP por endpoint, método y
+    código de estado. Las rutas desconocidas se agrupan como "other" para que el número
+    de series no crezca con URLs arbitrarias.
+    """
+
+    def __init__(self, app, fastapi_app: FastAPI):
+        self.app = app
+        self.fastapi_app = fastapi_app
+        self._known_paths: Optional[set] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if self._known_paths is None:
+                self._known_paths = {getattr(route, "path", None) for route in self.fastapi_app.routes}
+            endpoint = scope["path"] if scope["path"] in self._known_paths else "other"
+            HTTP_REQUEST_SECONDS.labels(endpoint, scope["method"], status_code).observe(
+                time.perf_counter() - started_at
+            )
+
+class _TracingMiddleware:
+    """
+    Middleware ASGI que abre un span por cada solicitud de ejecución (/run, /run/stream,
+    /run/batch), hijo del span del llamante si la solicitud trae 'traceparent'. El span
+    cubre también el envío de las respuestas en streaming.
+
+    También fija el identificador de la solicitud (cabecera X-Request-Id del llamante o uno
+    nuevo), que acompaña a los mensajes del registro, se propaga a los agentes llamados y
+    se devuelve en la respuesta (ver common/log.py).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/run"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        request_id_token = set_request_id(headers.get(REQUEST_ID_HEADER.lower()))
+        request_id = get_request_id()
+        try:
+            with server_span(f"{scope['method']} {scope['path']}", headers,
+                             **{"http.route": scope["path"], "request.id": request_id}) as current_span:
+                async def send_with_status(message):
+                    if message["type"] == "http.response.start":
+                        current_span.set_attribute("http.status_code", message["status"])
+                        if message["status"] >= 500:
+                            mark_error(current_span, f"HTTP {message['status']}")
+                        message = {**message, "headers": [
+                            *message.get("headers", []), (REQUEST_ID_HEADER.encode("latin-1"), request_id.encode("latin-1"))
+                        ]}
+                    await send(message)
+
+                await self.app(scope, receive, send_with_status)
+        finally:
+            reset_request_id(request_id_token)
+
+async def _call_hook(hook: Callable) -> None:
+    result = hook()
+    if inspect.isawaitable(result):
+        await result
+
+def _too_many_requests(error: LimitExceeded) -> JSONResponse:
+    """
+    Respuesta 429 con Retry-After para una solicitud rechazada por el limitador.
+    """
+    return JSONResponse(
+        status_code=429,
+        content={"error": str(error), "retry_after": error.retry_after},
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+def _unprocessable(message: str, error: Optional[ValidationError] = None) -> FastJSONResponse:
+    """
+    Respuesta 422 para una solicitud que no es JSON válido o no cumple el modelo.
+    """
+    content = {"error": message}
+    if error is not None:
+        content["detail"] = error.errors(include_url=False, include_context=False)
+    return FastJSONResponse(status_code=422, content=content)
+
+def _timed_out(result) -> bool:
+    """
+    Indica si 'execute' devolvió un resultado marcado con "timed_out" (plazo agotado).
+    """
+    return isinstance(result, dict) and bool(result.get("timed_out"))
+
+def _guard_timeout() -> float:
+    """
+    Tiempo máximo de 'execute': el plazo local más la mitad del margen reservado por el salto.
+    """
+    return remaining() + A2A_DEADLINE_HOP_MARGIN_SECONDS / 2
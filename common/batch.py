@@ -0,0 +1,110 @@
+# common/batch.py
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Awaitable, Callable
+
+from common.deadline import remaining
+from common.response_cache import canonical_request_key
+from common.log import get_logger
+
+logger = get_logger(__name__)
+
+# Concurrencia por defecto y tamaño máximo de un lote, ajustables con variables de entorno.
+A2A_BATCH_CONCURRENCY = int(os.getenv("A2A_BATCH_CONCURRENCY", "8"))
+A2A_BATCH_MAX_CONCURRENCY = int(os.getenv("A2A_BATCH_MAX_CONCURRENCY", "32"))
+A2A_BATCH_MAX_ITEMS = int(os.getenv("A2A_BATCH_MAX_ITEMS", "1000"))
+
+# Campos del TravelRequest que se normalizan al detectar solicitudes repetidas en un lote.
+_TRAVEL_REQUEST_FIELDS = ("origin", "destination", "start_date", "end_date", "budget")
+
+# Estados de cada elemento del lote.
+ITEM_OK = "ok"
+ITEM_ERROR = "error"
+ITEM_TIMED_OUT = "timed_out"
+
+
+def batch_item_key(item: dict) -> str:
+    """
+    Clave para detectar solicitudes idénticas dentro de un lote: los campos del
+    TravelRequest normalizados (presupuesto exacto) más el resto de campos tal cual.
+
+    Raises:
+        TypeError, ValueError: Si el elemento no es un diccionario interpretable.
+    """
+    fields = [field for field in _TRAVEL_REQUEST_FIELDS if field in item]
+    extra = {key: value for key, value in item.items() if key not in _TRAVEL_REQUEST_FIELDS}
+    return canonical_request_key(item, fields, budget_bucket=None) + json.dumps(extra, sort_keys=True, default=str)
+
+
+def _item_status(result) -> str:
+    if isinstance(result, dict) and result.get("timed_out"):
+        return ITEM_TIMED_OUT
+    if isinstance(result, dict) and "error" in result:
+        return ITEM_ERROR
+    return ITEM_OK
+
+
+async def run_batch(
+    items: list,
+    execute: Callable[[dict], Awaitable[dict]],
+    concurrency: int = A2A_BATCH_CONCURRENCY,
+) -> AsyncIterator[dict]:
+    """
+    Ejecuta un lote de solicitudes con concurrencia limitada y emite cada resultado
+    en orden de finalización, de modo que un elemento lento no retrasa a los demás.
+
+    Las solicitudes idénticas se ejecutan una sola vez y su resultado se emite para
+    cada una de sus posiciones. Los elementos que no terminan antes del plazo de la
+    solicitud se emiten con estado "timed_out".
+
+    Args:
+        items (list): Las solicitudes (diccionarios TravelRequest).
+        execute (Callable): La función 'execute' del agente.
+        concurrency (int): Número máximo de solicitudes ejecutándose a la vez.
+
+    Yields:
+        dict: {"type": "item", "index": i, "status": "ok" | "error" | "timed_out", "result": ...,
+               "deduplicated": bool} por cada elemento y, al final, {"type": "done", ...}.
+    """
+    groups: dict[str, list[int]] = {}
+    for index, item in enumerate(items):
+        try:
+            key = batch_item_key(item)
+        except (AttributeError, TypeError, ValueError):
+            key = f"#{index}" # No interpretable: se ejecuta sin agrupar y 'execute' informará del error.
+        groups.setdefault(key, []).append(index)
+
+    semaphore = asyncio.Semaphore(max(1, min(concurrency, A2A_BATCH_MAX_CONCURRENCY)))
+
+    async def run_one(key: str, item) -> tuple:
+        async with semaphore:
+            try:
+                result = await execute(item)
+            except Exception as e: # Un elemento fallido no debe detener el lote.
+                logger.warning("Error ejecutando un elemento del lote: %s - %s", type(e).__name__, e)
+                return key, ITEM_ERROR, {"error": f"{type(e).__name__}: {e}"}
+        return key, _item_status(result), result
+
+    tasks = {asyncio.create_task(run_one(key, items[indices[0]])): key for key, indices in groups.items()}
+    reported = set()
+    try:
+        try:
+            for next_result in asyncio.as_completed(tasks, timeout=remaining()):
+                key, status, result = await next_result
+                reported.add(key)
+                for position, index in enumerate(groups[key]):
+                    yield {"type": "item", "index": index, "status": status,
+                           "result": result, "deduplicated": position > 0}
+        except asyncio.TimeoutError:
+            pass
+        for key, indices in groups.items():
+            if key not in reported:
+                for position, index in enumerate(indices):
+                    yield {"type": "item", "index": index, "status": ITEM_TIMED_OUT,
+                           "result": {"error": "Plazo de la solicitud agotado.", "timed_out": True},
+                           "deduplicated": position > 0}
+        yield {"type": "done", "count": len(items), "unique": len(groups)}
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,187 @@
+# common/concurrency.py
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+# Configuración por defecto del limitador, ajustable con variables de entorno.
+A2A_LIMIT_ENABLED = os.getenv("A2A_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+A2A_LIMIT_INITIAL = int(os.getenv("A2A_LIMIT_INITIAL", "16"))
+A2A_LIMIT_MIN = int(os.getenv("A2A_LIMIT_MIN", "2"))
+A2A_LIMIT_MAX = int(os.getenv("A2A_LIMIT_MAX", "256"))
+A2A_LIMIT_QUEUE = int(os.getenv("A2A_LIMIT_QUEUE", "64"))
+A2A_LIMIT_QUEUE_WAIT_SECONDS = float(os.getenv("A2A_LIMIT_QUEUE_WAIT_SECONDS", "2.0"))
+A2A_LIMIT_LATENCY_TOLERANCE = float(os.getenv("A2A_LIMIT_LATENCY_TOLERANCE", "2.0"))
+
+
+class LimitExceeded(Exception):
+    """
+    La solicitud se rechaza porque el agente está saturado.
+    """
+    def __init__(self, retry_after: int):
+        super().__init__(f"Agente saturado, reintentar en {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """
+    Limitador de concurrencia que ajusta su límite según la latencia observada (AIMD).
+
+    Mientras la latencia reciente se mantiene cerca de la latencia de referencia, el
+    límite crece en 1 por cada 'límite' solicitudes completadas (aumento aditivo). Si la
+    latencia reciente supera 'latency_tolerance' veces la referencia, o una solicitud
+    falla, el límite se multiplica por 'backoff_ratio' (disminución multiplicativa),
+    como mucho una vez por ventana de latencia.
+
+    Las solicitudes que superan el límite esperan brevemente en una cola; si la cola
+    está llena o la espera vence, se rechazan con LimitExceeded para responder 429
+    enseguida en lugar de acumular trabajo que haría más lentas a todas.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = A2A_LIMIT_INITIAL,
+        min_limit: int = A2A_LIMIT_MIN,
+        max_limit: int = A2A_LIMIT_MAX,
+        max_queue: int = A2A_LIMIT_QUEUE,
+        max_queue_wait: float = A2A_LIMIT_QUEUE_WAIT_SECONDS,
+        latency_tolerance: float = A2A_LIMIT_LATENCY_TOLERANCE,
+        backoff_ratio: float = 0.9,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._queue: "deque[asyncio.Future]" = deque()
+        self._recent_latency: Optional[float] = None # Media móvil rápida
+        self._baseline_latency: Optional[float] = None # Media móvil lenta (referencia)
+        self._last_decrease = 0.0
+        self._accepted = 0
+        self._rejected = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    async def acquire(self, max_wait: Optional[float] = None) -> None:
+        """
+        Reserva un hueco de ejecución, esperando en cola como mucho 'max_wait' segundos.
+
+        Raises:
+            LimitExceeded: Si la cola está llena o la espera vence.
+        """
+        if self._in_flight < self.limit and not self._queue:
+            self._in_flight += 1
+            self._accepted += 1
+            return
+        if len(self._queue) >= self.max_queue:
+            self._rejected += 1
+            raise LimitExceeded(self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queue.append(waiter)
+        wait = self.max_queue_wait if max_wait is None else min(self.max_queue_wait, max_wait)
+        try:
+            await asyncio.wait_for(waiter, timeout=wait)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled(): # Concedido justo al vencer la espera
+                self._accepted += 1
+                return
+            self._discard(waiter)
+            self._rejected += 1
+            raise LimitExceeded(self.retry_after())
+        except BaseException:
+            # Cancelada mientras esperaba: si ya se le había concedido el hueco, se devuelve.
+            if waiter.done() and not waiter.cancelled():
+                self._in_flight -= 1
+                self._wake_waiters()
+            else:
+                self._discard(waiter)
+            raise
+        self._accepted += 1
+
+    def release(self, latency: float, succeeded: bool = True) -> None:
+        """
+        Libera un hueco y ajusta el límite con la latencia de la solicitud terminada.
+
+        Args:
+            latency (float): Duración de la solicitud en segundos.
+            succeeded (bool): False si la solicitud falló o agotó su plazo.
+        """
+        self._in_flight -= 1
+        self._update_limit(latency, succeeded)
+        self._wake_waiters()
+
+    @asynccontextmanager
+    async def slot(self, max_wait: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Context manager que reserva un hueco, mide la solicitud y lo libera al salir.
+        """
+        await self.acquire(max_wait)
+        started_at = time.monotonic()
+        succeeded = False
+        try:
+            yield
+            succeeded = True
+        finally:
+            self.release(time.monotonic() - started_at, succeeded)
+
+    def retry_after(self) -> int:
+        """
+        Segundos sugeridos para reintentar: el tiempo estimado para vaciar la cola actual.
+        """
+        latency = self._recent_latency or 1.0
+        return max(1, math.ceil(latency * (len(self._queue) + 1) / max(self.limit, 1)))
+
+    def stats(self) -> dict:
+        """
+        Devuelve el límite actual, las solicitudes en curso, la profundidad de la cola
+        y los contadores de solicitudes aceptadas y rechazadas.
+        """
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._queue),
+            "accepted": self._accepted,
+            "rejected": self._rejected,
+            "recent_latency_ms": round((self._recent_latency or 0.0) * 1000, 1),
+            "baseline_latency_ms": round((self._baseline_latency or 0.0) * 1000, 1),
+        }
+
+    def _update_limit(self, latency: float, succeeded: bool) -> None:
+        if self._recent_latency is None:
+            self._recent_latency = self._baseline_latency = latency
+        else:
+            self._recent_latency += 0.2 * (latency - self._recent_latency)
+            self._baseline_latency += 0.01 * (latency - self._baseline_latency)
+
+        now = time.monotonic()
+        congested = not succeeded or self._recent_latency > self.latency_tolerance * self._baseline_latency
+        if congested:
+            if now - self._last_decrease >= self._recent_latency:
+                self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+                self._last_decrease = now
+        elif self._in_flight + 1 >= self.limit:
+            # Sólo crece si el límite se está usando; si no, la latencia no dice nada de él.
+            self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+
+    def _wake_waiters(self) -> None:
+        while self._queue and self._in_flight < self.limit:
+            waiter = self._queue.popleft()
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._queue.remove(waiter)
+        except ValueError:
+            pass
@@ -0,0 +1,81 @@
+# common/deadline.py
+import os
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+from common.log import get_logger
+
+logger = get_logger(__name__)
+
+# Cabecera con el tiempo restante (en milisegundos) de la solicitud. Se envía un tiempo
+# relativo, no una hora absoluta, para no depender de que los relojes estén sincronizados.
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+# Plazo por defecto de una solicitud que llega sin cabecera.
+A2A_DEFAULT_DEADLINE_SECONDS = float(os.getenv("A2A_DEFAULT_DEADLINE_SECONDS", "120"))
+
+# Margen que cada salto reserva para devolver su respuesta antes de que venza el plazo del llamante.
+A2A_DEADLINE_HOP_MARGIN_SECONDS = float(os.getenv("A2A_DEADLINE_HOP_MARGIN_SECONDS", "0.5"))
+
+# Instante límite (time.monotonic) de la solicitud en curso. Las tareas creadas con
+# asyncio.create_task heredan el valor, así que llega a todas las llamadas salientes.
+_current_deadline: ContextVar[Optional[float]] = ContextVar("a2a_deadline", default=None)
+
+
+def timeout_from_headers(headers) -> float:
+    """
+    Obtiene el plazo (en segundos) de una solicitud entrante a partir de sus cabeceras.
+
+    Args:
+        headers: Cabeceras HTTP de la solicitud (ej. request.headers de FastAPI).
+
+    Returns:
+        float: Segundos disponibles; A2A_DEFAULT_DEADLINE_SECONDS si no hay cabecera válida.
+    """
+    value = headers.get(DEADLINE_HEADER)
+    if value:
+        try:
+            return max(float(value) / 1000.0, 0.0)
+        except ValueError:
+            logger.warning("Cabecera %s inválida: %r", DEADLINE_HEADER, value)
+    return A2A_DEFAULT_DEADLINE_SECONDS
+
+
+def set_deadline(timeout_seconds: float) -> Token:
+    """
+    Fija el plazo de la solicitud en curso, reservando el margen del salto para responder.
+
+    Args:
+        timeout_seconds (float): Segundos que el llamante está dispuesto a esperar.
+
+    Returns:
+        Token: Token para restaurar el valor anterior con reset_deadline.
+    """
+    local_timeout = max(timeout_seconds - A2A_DEADLINE_HOP_MARGIN_SECONDS, 0.0)
+    return _current_deadline.set(time.monotonic() + local_timeout)
+
+
+def reset_deadline(token: Token) -> None:
+    _current_deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """
+    Segundos que quedan hasta el plazo de la solicitud en curso (nunca negativos),
+    o None si no hay plazo.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def deadline_headers() -> dict:
+    """
+    Cabeceras que propagan el tiempo restante a un agente llamado desde esta solicitud.
+    """
+    budget = remaining()
+    if budget is None:
+        return {}
+    return {DEADLINE_HEADER: str(int(budget * 1000))}
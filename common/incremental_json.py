@@ -0,0 +1,120 @@
+# common/incremental_json.py
+import json
+from typing import Optional
+
+
+class IncrementalItemParser:
+    """
+    Parser incremental para respuestas JSON del tipo {"<clave>": [ {...}, {...} ]}.
+
+    Recibe el texto del modelo en fragmentos (feed) y devuelve cada objeto de la lista
+    en cuanto se cierra su llave, sin esperar al resto de la respuesta. Así el primer
+    resultado puede mostrarse mientras el modelo sigue generando los demás.
+
+    El texto se recorre una sola vez: cada llamada a feed sólo examina los caracteres
+    nuevos. Se ignora cualquier texto antes del primer '{' (ej. una valla ```json).
+
+    Si se indica 'item_model' (un modelo Pydantic, ej. FlightOption), cada objeto se
+    valida con él y se devuelve normalizado (model_dump); los que no cumplen el modelo
+    se descartan y se cuentan en 'invalid_items'.
+    """
+
+    def __init__(self, list_key: str, item_model: Optional[type] = None):
+        self.list_key = list_key
+        self.item_model = item_model
+        self._buffer = []          # Fragmentos recibidos (el texto completo, para el parseo final)
+        self._text = ""            # Texto pendiente de examinar más el objeto en curso
+        self._position = 0         # Siguiente carácter por examinar (relativo a self._text)
+        self._stack = []           # Contenedores abiertos: '{' o '['
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._array_depth: Optional[int] = None # Profundidad de la lista buscada, si está abierta
+        self._item_start: Optional[int] = None
+        self.items_emitted = 0
+        self.invalid_items = 0
+
+    @property
+    def text(self) -> str:
+        """
+        Todo el texto recibido hasta ahora.
+        """
+        return "".join(self._buffer)
+
+    def feed(self, chunk: str) -> list:
+        """
+        Añade un fragmento de texto y devuelve los elementos de la lista que se completaron.
+
+        Args:
+            chunk (str): Texto nuevo (delta) de la respuesta del modelo.
+
+        Returns:
+            list: Los objetos completados con este fragmento, en orden.
+        """
+        if not chunk:
+            return []
+        self._buffer.append(chunk)
+        self._text += chunk
+        completed = []
+        text = self._text
+        stack = self._stack
+        position = self._position
+        while position < len(text):
+            char = text[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(stack) == 1 and stack[0] == "{": # Cadena del objeto raíz (clave o valor)
+                        self._last_string = text[self._string_start:position]
+            elif char == '"':
+                self._in_string = True
+                self._string_start = position + 1
+            elif char == ":" and len(stack) == 1:
+                self._current_key = self._last_string
+            elif char in "{[":
+                if char == "{" and self._array_depth is not None and len(stack) == self._array_depth:
+                    self._item_start = position
+                if char == "[" and len(stack) == 1 and self._current_key == self.list_key:
+                    self._array_depth = 2
+                stack.append(char)
+            elif char in "}]" and stack:
+                stack.pop()
+                if char == "}" and self._item_start is not None and len(stack) == self._array_depth:
+                    item = self._decode(text[self._item_start:position + 1])
+                    if item is not None:
+                        completed.append(item)
+                    self._item_start = None
+                elif char == "]" and len(stack) + 1 == self._array_depth:
+                    self._array_depth = None # La lista terminó
+                elif len(stack) == 1:
+                    self._last_string = None
+            position += 1
+
+        # Se descarta el texto ya examinado, salvo el del objeto en curso.
+        keep_from = self._item_start if self._item_start is not None else position
+        if self._in_string and len(stack) == 1:
+            keep_from = min(keep_from, self._string_start)
+        self._text = text[keep_from:]
+        self._position = position - keep_from
+        if self._item_start is not None:
+            self._item_start -= keep_from
+        if self._in_string:
+            self._string_start -= keep_from
+        return completed
+
+    def _decode(self, item_text: str):
+        try:
+            item = json.loads(item_text)
+            if self.item_model is not None:
+                item = self.item_model.model_validate(item).model_dump()
+        except ValueError: # json.JSONDecodeError o pydantic.ValidationError
+            self.invalid_items += 1
+            return None
+        self.items_emitted += 1
+        return item
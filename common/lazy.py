@@ -0,0 +1,75 @@
+# common/lazy.py
+import asyncio
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+from common.log import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """
+    Objeto costoso (ej. el Agent y el Runner de ADK) que se construye la primera vez que
+    se usa, en lugar de al importar el módulo.
+
+    La construcción ocurre una sola vez aunque varios hilos llamen a get() a la vez.
+    Lo normal es forzarla durante el arranque con warm_up_runner, desde un hilo, para
+    que la primera solicitud no pague las importaciones ni la creación del cliente.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        """
+        Args:
+            name (str): Nombre para los mensajes y las estadísticas (ej. "flight_agent.runner").
+            factory (Callable): Función sin argumentos que construye el objeto.
+        """
+        self.name = name
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+        self._build_seconds: Optional[float] = None
+
+    @property
+    def built(self) -> bool:
+        return self._build_seconds is not None
+
+    def get(self) -> T:
+        """
+        Devuelve el objeto, construyéndolo si todavía no existe.
+        """
+        if self._build_seconds is None:
+            with self._lock:
+                if self._build_seconds is None:
+                    started_at = time.perf_counter()
+                    self._value = self._factory()
+                    self._build_seconds = time.perf_counter() - started_at
+                    logger.info("%s construido en %.0f ms.", self.name, self._build_seconds * 1000)
+        return self._value
+
+    def stats(self) -> dict:
+        return {
+            "built": self.built,
+            "build_ms": round(self._build_seconds * 1000, 1) if self._build_seconds is not None else None,
+        }
+
+
+async def warm_up_runner(runner: "Lazy", session_manager) -> None:
+    """
+    Calentamiento de un agente ADK antes de recibir tráfico: construye el Runner (y con él
+    las importaciones de ADK y el modelo) en un hilo, crea el cliente del modelo si lo
+    tiene (ej. el cliente de google-genai de Gemini) y abre y cierra una sesión.
+
+    Args:
+        runner (Lazy): El Runner perezoso del agente.
+        session_manager (SessionManager): El gestor de sesiones del agente.
+    """
+    built_runner = await asyncio.to_thread(runner.get)
+    model = built_runner.agent.canonical_model
+    if hasattr(type(model), "api_client"): # Gemini: el cliente se crea en el primer uso (cached_property)
+        await asyncio.to_thread(lambda: model.api_client)
+    async with session_manager.session():
+        pass
@@ -0,0 +1,185 @@
+# common/log.py
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar, Token
+from typing import Optional
+
+# Configuración del registro (logging), ajustable con variables de entorno.
+AGENT_LOG_LEVEL = os.getenv("AGENT_LOG_LEVEL", "INFO").upper()
+AGENT_LOG_FORMAT = os.getenv("AGENT_LOG_FORMAT", "json").lower() # "json" (una línea por mensaje) o "text"
+AGENT_LOG_MAX_CHARS = int(os.getenv("AGENT_LOG_MAX_CHARS", "2000")) # Tamaño máximo de cada mensaje
+AGENT_LOG_QUEUE_SIZE = int(os.getenv("AGENT_LOG_QUEUE_SIZE", "10000")) # Mensajes pendientes de escribir
+# Proporción de payloads de depuración (solicitudes, respuestas crudas del LLM) que se registran.
+AGENT_LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("AGENT_LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+
+# Cabecera con el identificador de la solicitud, para correlacionar los mensajes de todos los agentes.
+REQUEST_ID_HEADER = "X-Request-Id"
+
+# Identificador de la solicitud en curso. Como el plazo (ver common/deadline.py), lo heredan
+# las tareas creadas con asyncio.create_task y llega a las llamadas salientes.
+_current_request_id: ContextVar[Optional[str]] = ContextVar("a2a_request_id", default=None)
+
+# Todos los loggers de los agentes cuelgan de éste; los de uvicorn y ADK no se tocan.
+_ROOT_LOGGER_NAME = "a2a"
+
+_service_name: Optional[str] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_stats = {"dropped": 0, "truncated": 0, "payloads_sampled_out": 0}
+
+
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Pone cada mensaje en una cola acotada sin bloquear el bucle de eventos: el formateo y la
+    escritura en stdout ocurren en el hilo del QueueListener. Si la cola está llena (stdout
+    no da abasto), el mensaje se descarta y se cuenta en lugar de esperar.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Sólo lo imprescindible en el hilo que registra: fijar el texto (los argumentos
+        # podrían cambiar después), recortarlo y anotar el identificador de la solicitud.
+        message = record.getMessage()
+        if len(message) > AGENT_LOG_MAX_CHARS:
+            _stats["truncated"] += 1
+            message = f"{message[:AGENT_LOG_MAX_CHARS]}... [{len(message) - AGENT_LOG_MAX_CHARS} caracteres omitidos]"
+        if record.exc_info:
+            message += "\n" + logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg, record.args, record.exc_info, record.exc_text = message, None, None, None
+        record.request_id = _current_request_id.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _stats["dropped"] += 1
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "service": _service_name,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "msg": record.getMessage(),
+        }
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = "-"
+        return super().format(record)
+
+
+def configure_logging(service_name: Optional[str] = None) -> None:
+    """
+    Prepara el registro de los agentes: un QueueHandler con cola acotada y un QueueListener
+    que escribe en stdout desde un hilo propio. Se puede llamar varias veces (get_logger lo
+    hace la primera vez); las siguientes sólo fijan el nombre del servicio.
+
+    Args:
+        service_name (Optional[str]): Nombre del agente que acompaña a cada mensaje.
+    """
+    global _listener, _service_name
+    if service_name:
+        _service_name = service_name
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=AGENT_LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(_TextFormatter() if AGENT_LOG_FORMAT == "text" else _JsonFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+
+    root = logging.getLogger(_ROOT_LOGGER_NAME)
+    root.setLevel(AGENT_LOG_LEVEL)
+    root.addHandler(_BoundedQueueHandler(log_queue))
+    root.propagate = False
+
+
+def shutdown_logging() -> None:
+    """
+    Escribe los mensajes pendientes y detiene el hilo del QueueListener.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        root = logging.getLogger(_ROOT_LOGGER_NAME)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Logger de un módulo de los agentes (ej. get_logger(__name__)).
+    """
+    configure_logging()
+    return logging.getLogger(f"{_ROOT_LOGGER_NAME}.{name}")
+
+
+def log_payload(logger: logging.Logger, message: str, *args) -> None:
+    """
+    Registra en nivel DEBUG un mensaje con datos voluminosos (una solicitud completa, la
+    respuesta cruda del modelo...) sólo para una muestra de AGENT_LOG_PAYLOAD_SAMPLE_RATE
+    solicitudes, de modo que el coste del registro no crece con la carga. Los argumentos
+    se formatean sólo si el mensaje se registra.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if random.random() >= AGENT_LOG_PAYLOAD_SAMPLE_RATE:
+        _stats["payloads_sampled_out"] += 1
+        return
+    logger.debug(message, *args)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def set_request_id(request_id: Optional[str]) -> Token:
+    """
+    Fija el identificador de la solicitud en curso; si es None, se genera uno nuevo.
+
+    Returns:
+        Token: Token para restaurar el valor anterior con reset_request_id.
+    """
+    return _current_request_id.set(request_id or new_request_id())
+
+
+def reset_request_id(token: Token) -> None:
+    _current_request_id.reset(token)
+
+
+def get_request_id() -> Optional[str]:
+    return _current_request_id.get()
+
+
+def request_id_headers() -> dict:
+    """
+    Cabecera X-Request-Id para propagar el identificador de la solicitud en curso a otro agente.
+    """
+    request_id = _current_request_id.get()
+    return {REQUEST_ID_HEADER: request_id} if request_id else {}
+
+
+def logging_stats() -> dict:
+    """
+    Estadísticas del registro para /stats: mensajes pendientes, descartados por cola llena,
+    recortados y payloads de depuración omitidos por el muestreo.
+    """
+    return {"queued": _listener.queue.qsize() if _listener is not None else 0, **_stats}
@@ -0,0 +1,265 @@
+# common/metrics.py
+import bisect
+import re
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+# Límites (en segundos) de los histogramas de latencia: desde respuestas de caché
+# (milisegundos) hasta llamadas al LLM que tardan decenas de segundos.
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0, 120.0)
+
+
+def _format_labels(label_names: tuple, label_values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "bucket_counts", "sum", "count")
+
+    def __init__(self, upper_bounds: tuple):
+        self.upper_bounds = upper_bounds
+        self.bucket_counts = [0] * len(upper_bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.upper_bounds, value)
+        if index < len(self.bucket_counts):
+            self.bucket_counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at)
+
+
+class _Metric:
+    """
+    Métrica con etiquetas. Cada combinación de valores de etiqueta se guarda en un hijo
+    que se crea una sola vez, así que registrar un valor es una búsqueda en un diccionario
+    y una suma: lo bastante barato para dejarlo activo en producción.
+    """
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._children: dict[tuple, object] = {}
+
+    def labels(self, *label_values):
+        key = tuple(str(value) for value in label_values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for label_values, child in list(self._children.items()):
+            lines.extend(self._render_child(label_values, child))
+        return lines
+
+    def _render_child(self, label_values: tuple, child) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _render_child(self, label_values, child):
+        return [f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(child.value)}"]
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets: tuple = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, label_values, child):
+        lines = []
+        cumulative = 0
+        for upper_bound, bucket_count in zip(child.upper_bounds, child.bucket_counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.label_names, label_values, f'le="{upper_bound}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, label_values, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{labels} {child.count}")
+        labels = _format_labels(self.label_names, label_values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+# Registro de métricas del proceso.
+_registry: dict[str, _Metric] = {}
+
+
+def counter(name: str, documentation: str, label_names: Iterable[str] = ()) -> Counter:
+    """
+    Devuelve el contador 'name', creándolo si no existe.
+    """
+    metric = _registry.get(name)
+    if metric is None:
+        metric = _registry[name] = Counter(name, documentation, label_names)
+    return metric
+
+
+def histogram(name: str, documentation: str, label_names: Iterable[str] = (),
+              buckets: tuple = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+    """
+    Devuelve el histograma 'name', creándolo si no existe.
+    """
+    metric = _registry.get(name)
+    if metric is None:
+        metric = _registry[name] = Histogram(name, documentation, label_names, buckets)
+    return metric
+
+
+def _stats_to_gauges(prefix: str, stats: dict, labels: Optional[dict] = None) -> list[str]:
+    """
+    Convierte un diccionario de estadísticas (el de /stats) en líneas de gauges:
+    los números se publican como a2a_<proveedor>_<clave>, los diccionarios anidados
+    por nombre (ej. destinos, circuit breakers) como etiqueta 'name' y los textos
+    (ej. estado de un circuit breaker) como etiqueta 'value' con valor 1.
+    """
+    lines = []
+    labels = labels or {}
+    for key, value in stats.items():
+        metric_name = re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{key}")
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, (int, float)):
+            label_text = _format_labels(tuple(labels), tuple(labels.values()))
+            lines.append(f"{metric_name}{label_text} {_format_value(value)}")
+        elif isinstance(value, str):
+            label_values = {**labels, "value": value}
+            lines.append(f"{metric_name}{_format_labels(tuple(label_values), tuple(label_values.values()))} 1")
+        elif isinstance(value, dict):
+            if value and all(isinstance(child, dict) for child in value.values()):
+                for child_name, child_stats in value.items():
+                    lines.extend(_stats_to_gauges(metric_name, child_stats, {**labels, "name": child_name}))
+            else:
+                lines.extend(_stats_to_gauges(metric_name, value, labels))
+    return lines
+
+
+def render_metrics(stats: Optional[dict] = None) -> str:
+    """
+    Genera el texto de /metrics en el formato de exposición de Prometheus.
+
+    Args:
+        stats (Optional[dict]): Estadísticas de /stats, que se publican como gauges.
+
+    Returns:
+        str: Las métricas en formato texto (versión 0.0.4).
+    """
+    lines = []
+    for metric in list(_registry.values()):
+        lines.extend(metric.render())
+    lines.extend(_stats_to_gauges("a2a", stats or {}))
+    return "\n".join(lines) + "\n"
+
+
+# --- Métricas compartidas por todos los agentes ---
+HTTP_REQUEST_SECONDS = histogram(
+    "a2a_http_request_duration_seconds",
+    "Duración de las solicitudes HTTP atendidas por el agente.",
+    ("endpoint", "method", "status"),
+)
+LLM_CALL_SECONDS = histogram(
+    "agent_llm_call_duration_seconds",
+    "Duración de la llamada al LLM (runner.run_async) dentro de execute.",
+    ("agent",),
+)
+LLM_ERRORS = counter(
+    "agent_llm_errors_total",
+    "Errores al llamar al LLM o al procesar su respuesta, por tipo.",
+    ("agent", "kind"),
+)
+JSON_PARSE_FAILURES = counter(
+    "agent_json_parse_failures_total",
+    "Respuestas del LLM que no eran JSON válido.",
+    ("agent",),
+)
+FANOUT_SECONDS = histogram(
+    "host_fanout_duration_seconds",
+    "Duración de cada llamada del host_agent a un agente especializado.",
+    ("agent", "status"),
+)
+PLAN_SECONDS = histogram(
+    "host_plan_duration_seconds",
+    "Duración de cada solicitud /run del host_agent por modo de planificación ('fanout' o 'single').",
+    ("mode",),
+)
+
+# Tamaño de las llamadas al LLM (ver common/prompts.py).
+TOKEN_BUCKETS = (25, 50, 100, 200, 400, 800, 1600, 3200, 6400, 12800)
+CHAR_BUCKETS = tuple(bucket * 4 for bucket in TOKEN_BUCKETS)
+LLM_PROMPT_CHARS = histogram(
+    "agent_llm_prompt_chars",
+    "Caracteres enviados al LLM por llamada: instrucción del sistema, mensaje del usuario y esquema de salida.",
+    ("agent", "profile", "part"),
+    buckets=CHAR_BUCKETS,
+)
+LLM_PROMPT_TOKENS = histogram(
+    "agent_llm_prompt_tokens",
+    "Tokens de entrada estimados por llamada al LLM.",
+    ("agent", "profile"),
+    buckets=TOKEN_BUCKETS,
+)
+LLM_OUTPUT_CHARS = histogram(
+    "agent_llm_output_chars",
+    "Caracteres de la respuesta del LLM por llamada.",
+    ("agent", "profile"),
+    buckets=CHAR_BUCKETS,
+)
+LLM_OUTPUT_TOKENS = histogram(
+    "agent_llm_output_tokens",
+    "Tokens de salida estimados por llamada al LLM.",
+    ("agent", "profile"),
+    buckets=TOKEN_BUCKETS,
+)
+LLM_RESPONSES = counter(
+    "agent_llm_responses_total",
+    "Llamadas al LLM por resultado: ok, empty, json_invalid, schema_mismatch o error.",
+    ("agent", "profile", "outcome"),
+)
@@ -0,0 +1,178 @@
+# common/model_backend.py
+import asyncio
+import json
+import os
+import random
+import typing
+from typing import AsyncGenerator, Union
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+from common.log import get_logger
+
+logger = get_logger(__name__)
+
+# Backend de modelo de los agentes: "gemini" (por defecto) usa el modelo real;
+# "fake" usa FakeLlm, que no consume cuota y permite medir la capa de orquestación.
+AGENT_MODEL_BACKEND = os.getenv("AGENT_MODEL_BACKEND", "gemini").lower()
+
+# Configuración del modelo simulado, ajustable con variables de entorno.
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800")) # Mediana de la latencia
+FAKE_LLM_LATENCY_SIGMA = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5")) # Dispersión (log-normal); 0 = fija
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_MALFORMED_RATE = float(os.getenv("FAKE_LLM_MALFORMED_RATE", "0"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+
+# Aerolíneas y hoteles con los que se rellenan las respuestas simuladas.
+_AIRLINES = ("Iberia", "LATAM", "Avianca", "Air Europa", "Copa Airlines", "Aeroméxico")
+_HOTEL_PREFIXES = ("Hotel", "Hostal", "Gran Hotel", "Posada", "Apartamentos")
+
+
+class FakeLlmError(RuntimeError):
+    """
+    Error simulado del proveedor del modelo (equivalente a un 500/503 de la API).
+    """
+
+
+class FakeLlm(BaseLlm):
+    """
+    Modelo simulado para pruebas de carga y benchmarks.
+
+    Devuelve JSON válido para el output_schema del agente (FlightsResponse, StaysResponse,
+    ActivitiesResponse o cualquier modelo con una lista de objetos), con una latencia
+    log-normal de mediana 'latency_ms'. Con probabilidad 'error_rate' lanza FakeLlmError
+    y con probabilidad 'malformed_rate' devuelve JSON truncado.
+
+    El contenido depende sólo del prompt y de 'seed', así que una misma solicitud
+    produce siempre la misma respuesta; la latencia y los fallos se sortean con un
+    generador aleatorio propio inicializado con 'seed'.
+    """
+    model: str = "fake-llm"
+    latency_ms: float = FAKE_LLM_LATENCY_MS
+    latency_sigma: float = FAKE_LLM_LATENCY_SIGMA
+    error_rate: float = FAKE_LLM_ERROR_RATE
+    malformed_rate: float = FAKE_LLM_MALFORMED_RATE
+    seed: int = FAKE_LLM_SEED
+    _rng: random.Random = PrivateAttr(default=None)
+
+    def model_post_init(self, __context) -> None:
+        self._rng = random.Random(self.seed)
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r"fake-llm"]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        latency = self._sample_latency()
+        failed = self._rng.random() < self.error_rate
+        malformed = self._rng.random() < self.malformed_rate
+
+        prompt = _prompt_text(llm_request)
+        schema = llm_request.config.response_schema if llm_request.config else None
+        if isinstance(schema, type):
+            text = json.dumps(_sample_for_model(schema, random.Random(f"{self.seed}:{prompt}")), ensure_ascii=False)
+        else:
+            text = "Solicitud de planificación de viaje recibida." # Agentes sin output_schema (host)
+        if malformed:
+            text = text[: max(1, len(text) // 2)] # JSON cortado a la mitad
+
+        if not stream:
+            await asyncio.sleep(latency)
+            if failed:
+                raise FakeLlmError("Error simulado del modelo (FAKE_LLM_ERROR_RATE).")
+            yield _text_response(text)
+            return
+
+        # En streaming, el primer fragmento llega tras una parte de la latencia y el resto
+        # se reparte entre los fragmentos, como haría un modelo que genera token a token.
+        chunks = [text[start:start + 64] for start in range(0, len(text), 64)] or [""]
+        await asyncio.sleep(latency * 0.3)
+        if failed:
+            raise FakeLlmError("Error simulado del modelo (FAKE_LLM_ERROR_RATE).")
+        for chunk in chunks:
+            yield _text_response(chunk, partial=True)
+            await asyncio.sleep(latency * 0.7 / len(chunks))
+        yield _text_response(text)
+
+    def _sample_latency(self) -> float:
+        median = self.latency_ms / 1000.0
+        if self.latency_sigma <= 0 or median <= 0:
+            return max(median, 0.0)
+        return self._rng.lognormvariate(0.0, self.latency_sigma) * median
+
+
+def get_model(model_name: str) -> Union[str, BaseLlm]:
+    """
+    Devuelve el modelo que debe usar un agente según AGENT_MODEL_BACKEND.
+
+    Args:
+        model_name (str): Nombre del modelo real (ej. "gemini-2.0-flash").
+
+    Returns:
+        El nombre del modelo (backend "gemini") o una instancia de FakeLlm (backend "fake").
+    """
+    if AGENT_MODEL_BACKEND == "fake":
+        return FakeLlm()
+    if AGENT_MODEL_BACKEND != "gemini":
+        logger.warning("AGENT_MODEL_BACKEND=%r desconocido. Se usará %s.", AGENT_MODEL_BACKEND, model_name)
+    return model_name
+
+
+def _text_response(text: str, partial: bool = False) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), partial=partial)
+
+
+def _prompt_text(llm_request: LlmRequest) -> str:
+    # El último mensaje del usuario identifica la solicitud (destino, fechas, presupuesto).
+    for content in reversed(llm_request.contents or []):
+        if content.role == "user" and content.parts:
+            return "".join(part.text or "" for part in content.parts)
+    return ""
+
+
+def _sample_for_model(model: type, rng: random.Random) -> dict:
+    """
+    Genera un objeto válido para un modelo Pydantic: las listas de submodelos reciben
+    2-3 elementos y cada campo de texto un valor verosímil según su nombre.
+    """
+    sample = {}
+    for field_name, field in model.model_fields.items():
+        annotation = field.annotation
+        if typing.get_origin(annotation) in (list, typing.List):
+            (item_type,) = typing.get_args(annotation) or (str,)
+            count = rng.randint(2, 3)
+            sample[field_name] = [_sample_item(item_type, index, rng) for index in range(count)]
+        else:
+            sample[field_name] = _sample_value(field_name, annotation, 0, rng)
+    return sample
+
+
+def _sample_item(item_type, index: int, rng: random.Random):
+    if isinstance(item_type, type) and hasattr(item_type, "model_fields"):
+        return {name: _sample_value(name, field.annotation, index, rng) for name, field in item_type.model_fields.items()}
+    return _sample_value("item", item_type, index, rng)
+
+
+def _sample_value(field_name: str, annotation, index: int, rng: random.Random):
+    if annotation in (int, float):
+        return rng.randint(50, 1500)
+    if isinstance(annotation, type) and hasattr(annotation, "model_fields"):
+        return _sample_item(annotation, index, rng)
+    if field_name == "airline":
+        return rng.choice(_AIRLINES)
+    if field_name == "hotel_name":
+        return f"{rng.choice(_HOTEL_PREFIXES)} {rng.choice(('Central', 'del Mar', 'Plaza', 'Real', 'Colonial'))}"
+    if "price" in field_name:
+        amount = rng.randint(40, 1500)
+        return f"${amount} USD per night" if "night" in field_name else f"${amount} USD"
+    if "time" in field_name:
+        return f"{rng.randint(1, 12):02d}:{rng.choice(('00', '15', '30', '45'))} {rng.choice(('AM', 'PM'))} on April {rng.randint(1, 28)}, 2025"
+    if field_name == "location":
+        return rng.choice(("Centro histórico", "Zona hotelera", "Cerca del aeropuerto", "Barrio antiguo"))
+    return f"{field_name.replace('_', ' ').capitalize()} de ejemplo {index + 1}"
@@ -0,0 +1,167 @@
+# common/prompts.py
+import json
+import math
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from common.log import get_logger
+from common.metrics import LLM_OUTPUT_CHARS, LLM_OUTPUT_TOKENS, LLM_PROMPT_CHARS, LLM_PROMPT_TOKENS, LLM_RESPONSES
+from common.tracing import annotate
+
+logger = get_logger(__name__)
+
+# Perfil de las instrucciones del sistema de los agentes: "full" (las originales, que repiten
+# las reglas del formato JSON) o "compact" (sólo la tarea: el formato lo impone output_schema).
+AGENT_PROMPT_PROFILE = os.getenv("AGENT_PROMPT_PROFILE", "full").lower()
+
+PROMPT_PROFILES = ("full", "compact")
+
+# Caracteres por token para estimar los tokens: ADK 0.5.0 no entrega a los agentes el uso
+# de tokens que informa el modelo. Es la proporción habitual en texto y JSON.
+CHARS_PER_TOKEN = 4
+
+# Resultado de cada llamada al LLM, según lo que se pudo hacer con su respuesta.
+OUTCOME_OK = "ok"
+OUTCOME_EMPTY = "empty" # El modelo no devolvió texto
+OUTCOME_JSON_INVALID = "json_invalid" # El texto no es JSON
+OUTCOME_SCHEMA_MISMATCH = "schema_mismatch" # JSON que no cumple el esquema de la respuesta
+OUTCOME_ERROR = "error" # Error del modelo o del agente
+
+# Medición de la llamada al LLM en curso, que completa measure_llm_request.
+_current_usage: ContextVar[Optional["PromptUsage"]] = ContextVar("prompt_usage", default=None)
+
+# Totales por agente para /stats.
+_totals: dict[str, dict] = {}
+
+
+def select_instruction(agent_name: str, instructions: dict[str, str], profile: str = AGENT_PROMPT_PROFILE) -> tuple:
+    """
+    Elige la instrucción del sistema de un agente según el perfil. Si el agente no tiene
+    ese perfil, usa "full".
+
+    Args:
+        agent_name (str): Nombre del agente, para los mensajes.
+        instructions (dict): Instrucción por perfil ({"full": ..., "compact": ...}).
+        profile (str): Perfil pedido (por defecto, AGENT_PROMPT_PROFILE).
+
+    Returns:
+        tuple: (perfil usado, instrucción).
+    """
+    if profile not in instructions:
+        logger.warning("%s no tiene el perfil de instrucciones %r. Se usará 'full'.", agent_name, profile)
+        profile = "full"
+    return profile, instructions[profile]
+
+
+def estimate_tokens(chars: int) -> int:
+    return math.ceil(chars / CHARS_PER_TOKEN)
+
+
+class PromptUsage:
+    """
+    Tamaño de una llamada al LLM: caracteres de la instrucción del sistema, del mensaje del
+    usuario y del esquema de salida, caracteres de la respuesta y los tokens estimados.
+
+    Los tamaños de entrada parten de la instrucción y el mensaje del agente; si la llamada se
+    hace dentro de measuring(), measure_llm_request los sustituye por los de la solicitud que
+    ADK envía realmente al modelo (con el texto que ADK añade a la instrucción).
+    """
+
+    def __init__(self, agent_name: str, profile: str, system_instruction: str, user_prompt: str):
+        self.agent_name = agent_name
+        self.profile = profile
+        self.system_chars = len(system_instruction)
+        self.user_chars = len(user_prompt)
+        self.schema_chars = 0
+        self.output_chars = 0
+        self.outcome: Optional[str] = None
+
+    @property
+    def prompt_chars(self) -> int:
+        return self.system_chars + self.user_chars + self.schema_chars
+
+    @property
+    def prompt_tokens(self) -> int:
+        return estimate_tokens(self.prompt_chars)
+
+    @property
+    def output_tokens(self) -> int:
+        return estimate_tokens(self.output_chars)
+
+    @contextmanager
+    def measuring(self) -> Iterator["PromptUsage"]:
+        """
+        Activa esta medición para las llamadas al modelo hechas dentro del bloque.
+        """
+        token = _current_usage.set(self)
+        try:
+            yield self
+        finally:
+            _current_usage.reset(token)
+
+    def finish(self, response_text: Optional[str], outcome: str) -> None:
+        """
+        Registra la llamada en las métricas, en /stats y en el span actual.
+        """
+        self.output_chars = len(response_text or "")
+        self.outcome = outcome
+        labels = (self.agent_name, self.profile)
+        for part, chars in (("system", self.system_chars), ("user", self.user_chars), ("schema", self.schema_chars)):
+            LLM_PROMPT_CHARS.labels(*labels, part).observe(chars)
+        LLM_PROMPT_TOKENS.labels(*labels).observe(self.prompt_tokens)
+        LLM_OUTPUT_CHARS.labels(*labels).observe(self.output_chars)
+        LLM_OUTPUT_TOKENS.labels(*labels).observe(self.output_tokens)
+        LLM_RESPONSES.labels(*labels, outcome).inc()
+
+        totals = _totals.setdefault(
+            self.agent_name, {"calls": 0, "prompt_tokens": 0, "output_tokens": 0, "outcomes": {}}
+        )
+        totals["profile"] = self.profile
+        totals["calls"] += 1
+        totals["prompt_tokens"] += self.prompt_tokens
+        totals["output_tokens"] += self.output_tokens
+        totals["outcomes"][outcome] = totals["outcomes"].get(outcome, 0) + 1
+
+        annotate(**{
+            "llm.prompt_profile": self.profile, "llm.prompt_tokens": self.prompt_tokens,
+            "llm.output_tokens": self.output_tokens, "llm.outcome": outcome,
+        })
+
+
+def measure_llm_request(callback_context, llm_request) -> None:
+    """
+    before_model_callback de los agentes ADK: anota en la medición en curso (ver
+    PromptUsage.measuring) el tamaño de la solicitud que se envía al modelo. No la modifica.
+    """
+    usage = _current_usage.get()
+    if usage is None:
+        return None
+    config = llm_request.config
+    system_instruction = config.system_instruction if config is not None else None
+    if isinstance(system_instruction, str):
+        usage.system_chars = len(system_instruction)
+    usage.user_chars = sum(
+        len(part.text or "") for content in llm_request.contents or [] for part in content.parts or []
+    )
+    schema = config.response_schema if config is not None else None
+    if isinstance(schema, type) and hasattr(schema, "model_json_schema"):
+        usage.schema_chars = len(json.dumps(schema.model_json_schema(), ensure_ascii=False))
+    return None
+
+
+def prompt_stats() -> dict:
+    """
+    Llamadas al LLM por agente para /stats: perfil, tokens estimados por llamada y resultados.
+    """
+    return {
+        agent_name: {
+            "profile": totals["profile"],
+            "calls": totals["calls"],
+            "avg_prompt_tokens": round(totals["prompt_tokens"] / totals["calls"], 1),
+            "avg_output_tokens": round(totals["output_tokens"] / totals["calls"], 1),
+            "outcomes": dict(totals["outcomes"]),
+        }
+        for agent_name, totals in _totals.items()
+    }
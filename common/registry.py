@@ -0,0 +1,256 @@
+# common/registry.py
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from common.log import get_logger
+
+logger = get_logger(__name__)
+
+# Registro de réplicas de los agentes, ajustable con variables de entorno.
+# Archivo JSON {"flight_agent": ["http://10.0.0.5:8001", "http://10.0.0.6:8001"], ...}; si no
+# se define, las réplicas salen de "replicas" (o "url") del .well_known/agent.json de cada agente.
+A2A_REGISTRY_FILE = os.getenv("A2A_REGISTRY_FILE", "")
+A2A_LB_POLICY = os.getenv("A2A_LB_POLICY", "p2c").lower() # "p2c" o "least_outstanding"
+A2A_HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("A2A_HEALTH_CHECK_INTERVAL_SECONDS", "5")) # 0 = sin comprobaciones
+A2A_HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("A2A_HEALTH_CHECK_TIMEOUT_SECONDS", "1"))
+A2A_HEALTH_CHECK_FAILURES = int(os.getenv("A2A_HEALTH_CHECK_FAILURES", "2")) # Fallos seguidos para retirar una réplica
+
+# Peso de la última latencia en la media móvil exponencial de cada réplica.
+_LATENCY_EWMA_ALPHA = 0.2
+
+
+class Replica:
+    """
+    Una instancia de un agente (scheme://host:puerto) con sus solicitudes en curso, su
+    latencia media y el resultado de las comprobaciones de salud.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.healthy = True # Hasta que una comprobación diga lo contrario
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.latency_ewma: Optional[float] = None
+        self._check_failures = 0
+
+    def url_for(self, url: str) -> str:
+        """
+        Traslada 'url' (la URL de otra réplica del mismo agente) a esta réplica, conservando la ruta.
+        """
+        split_url = urlsplit(url)
+        path = split_url.path + (f"?{split_url.query}" if split_url.query else "")
+        return self.base_url + path
+
+    def begin(self) -> float:
+        self.outstanding += 1
+        self.requests += 1
+        return time.perf_counter()
+
+    def end(self, started_at: float, failed: bool) -> None:
+        self.outstanding -= 1
+        elapsed = time.perf_counter() - started_at
+        if failed:
+            self.errors += 1
+        elif self.latency_ewma is None:
+            self.latency_ewma = elapsed
+        else:
+            self.latency_ewma += _LATENCY_EWMA_ALPHA * (elapsed - self.latency_ewma)
+
+    def record_check(self, ok: bool) -> None:
+        if ok:
+            if not self.healthy:
+                logger.info("Réplica %s de nuevo disponible.", self.base_url)
+            self.healthy = True
+            self._check_failures = 0
+            return
+        self._check_failures += 1
+        if self.healthy and self._check_failures >= A2A_HEALTH_CHECK_FAILURES:
+            logger.warning("Réplica %s retirada: %s comprobaciones de salud fallidas.", self.base_url, self._check_failures)
+            self.healthy = False
+
+    def stats(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+        }
+
+
+class AgentService:
+    """
+    Un agente lógico (ej. "flight_agent") y sus réplicas.
+    """
+
+    def __init__(self, name: str, base_urls: Iterable[str], policy: str = A2A_LB_POLICY):
+        self.name = name
+        self.replicas = [Replica(base_url) for base_url in base_urls]
+        if not self.replicas:
+            raise ValueError(f"El agente {name} no tiene réplicas.")
+        self.policy = policy
+
+    def choose(self, avoid: Iterable[str] = (), exclude: Iterable[str] = ()) -> Optional[Replica]:
+        """
+        Elige la réplica para una llamada.
+
+        Con la política "p2c" (power of two choices) toma dos réplicas al azar y se queda con
+        la que tiene menos solicitudes en curso (a igualdad, la de menor latencia media); con
+        "least_outstanding", la de menos solicitudes en curso de todas. Ambas reparten la carga
+        según la velocidad real de cada réplica: una réplica lenta acumula solicitudes en curso
+        y recibe menos.
+
+        Se prefieren las réplicas sanas que no estén en 'avoid' (ej. las que ya fallaron en un
+        intento anterior). Si no queda ninguna sana se usan las demás, porque las comprobaciones
+        de salud pueden ir con retraso.
+
+        Args:
+            avoid (Iterable[str]): URLs base que se usan sólo si no hay alternativa.
+            exclude (Iterable[str]): URLs base que no se pueden usar (ej. circuit breaker abierto).
+
+        Returns:
+            Optional[Replica]: La réplica elegida, o None si todas están excluidas.
+        """
+        exclude, avoid = set(exclude), set(avoid)
+        allowed = [replica for replica in self.replicas if replica.base_url not in exclude]
+        candidates = (
+            [replica for replica in allowed if replica.healthy and replica.base_url not in avoid]
+            or [replica for replica in allowed if replica.healthy]
+            or allowed
+        )
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+        if self.policy == "least_outstanding":
+            random.shuffle(candidates) # Desempate aleatorio: no todas las llamadas van a la primera
+            return min(candidates, key=_load)
+        return min(random.sample(candidates, 2), key=_load)
+
+
+def _load(replica: Replica) -> tuple:
+    return replica.outstanding, replica.latency_ewma or 0.0
+
+
+class AgentRegistry:
+    """
+    Registro de los agentes a los que llama este proceso y de sus réplicas.
+
+    Un agente se identifica por la URL base de cualquiera de sus réplicas, así que el código
+    que llama a call_agent con la URL de un agente (ej. FLIGHT_AGENT_URL) no cambia: call_agent
+    consulta el registro y reparte las llamadas entre todas sus réplicas (ver common/a2a_client.py).
+    """
+
+    def __init__(self):
+        self.services: dict[str, AgentService] = {}
+        self._by_base_url: dict[str, AgentService] = {}
+        self._health_task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, base_urls: Iterable[str]) -> AgentService:
+        """
+        Registra (o reemplaza) las réplicas de un agente.
+        """
+        service = AgentService(name, base_urls)
+        previous = self.services.get(name)
+        if previous is not None:
+            for replica in previous.replicas:
+                self._by_base_url.pop(replica.base_url, None)
+        self.services[name] = service
+        for replica in service.replicas:
+            self._by_base_url[replica.base_url] = service
+        return service
+
+    def load_agent_card(self, path: str) -> AgentService:
+        """
+        Registra un agente a partir de su tarjeta .well_known/agent.json: "name" y la lista
+        "replicas" de URLs base (o "url" si sólo hay una).
+        """
+        with open(path, encoding="utf-8") as card_file:
+            card = json.load(card_file)
+        return self.register(card["name"], card.get("replicas") or [card["url"]])
+
+    def load_file(self, path: str) -> None:
+        """
+        Registra los agentes de un archivo JSON {"nombre": ["http://host:puerto", ...]}.
+        """
+        with open(path, encoding="utf-8") as registry_file:
+            for name, base_urls in json.load(registry_file).items():
+                self.register(name, base_urls)
+
+    def url_for(self, name: str, path: str = "/run") -> str:
+        """
+        URL de 'path' en la primera réplica del agente 'name'. Sirve para identificar al
+        agente en call_agent y stream_agent, que reparten las llamadas entre sus réplicas.
+        """
+        return self.services[name].replicas[0].base_url + path
+
+    def resolve(self, url: str) -> Optional[AgentService]:
+        """
+        Devuelve el agente al que pertenece 'url', o None si no está registrado.
+        """
+        split_url = urlsplit(url)
+        return self._by_base_url.get(f"{split_url.scheme}://{split_url.netloc}")
+
+    async def check_health(self) -> None:
+        """
+        Comprueba una vez GET /readyz de todas las réplicas (ver common/a2a_server.py).
+        """
+        replicas = [replica for service in self.services.values() for replica in service.replicas]
+        async with httpx.AsyncClient(timeout=A2A_HEALTH_CHECK_TIMEOUT_SECONDS) as client:
+            results = await asyncio.gather(
+                *(client.get(replica.base_url + "/readyz") for replica in replicas), return_exceptions=True
+            )
+        for replica, result in zip(replicas, results):
+            replica.record_check(isinstance(result, httpx.Response) and result.status_code == 200)
+
+    def start_health_checks(self, interval: float = A2A_HEALTH_CHECK_INTERVAL_SECONDS) -> None:
+        """
+        Comprueba la salud de las réplicas cada 'interval' segundos en segundo plano.
+        No hace nada si 'interval' es 0 o ningún agente tiene más de una réplica.
+        """
+        if interval <= 0 or self._health_task is not None:
+            return
+        if all(len(service.replicas) == 1 for service in self.services.values()):
+            return # Con una sola réplica no hay a dónde desviar el tráfico: el circuit breaker basta.
+
+        async def loop() -> None:
+            while True:
+                try:
+                    await self.check_health()
+                except Exception as e:
+                    logger.warning("Error comprobando la salud de las réplicas: %s - %s", type(e).__name__, e)
+                await asyncio.sleep(interval)
+
+        self._health_task = asyncio.create_task(loop())
+
+    async def stop_health_checks(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+    def stats(self) -> dict:
+        """
+        Réplicas de cada agente con su estado, para publicarlo en /stats.
+        """
+        return {
+            "policy": A2A_LB_POLICY,
+            "health_checks": self._health_task is not None,
+            "replicas": {
+                replica.base_url: {"agent": name, **replica.stats()}
+                for name, service in self.services.items() for replica in service.replicas
+            },
+        }
+
+
+# Registro compartido por call_agent y stream_agent. Se llena al importar el task_manager del host.
+registry = AgentRegistry()
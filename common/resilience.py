@@ -0,0 +1,155 @@
+# common/resilience.py
+import os
+import random
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+from common.log import get_logger
+
+logger = get_logger(__name__)
+
+# Reintentos con espera exponencial y jitter, ajustables con variables de entorno.
+A2A_RETRY_ATTEMPTS = int(os.getenv("A2A_RETRY_ATTEMPTS", "3")) # Intentos totales, incluido el primero
+A2A_RETRY_BASE_DELAY_SECONDS = float(os.getenv("A2A_RETRY_BASE_DELAY_SECONDS", "0.2"))
+A2A_RETRY_MAX_DELAY_SECONDS = float(os.getenv("A2A_RETRY_MAX_DELAY_SECONDS", "2.0"))
+
+# Circuit breaker por agente.
+A2A_BREAKER_FAILURE_THRESHOLD = int(os.getenv("A2A_BREAKER_FAILURE_THRESHOLD", "5"))
+A2A_BREAKER_RESET_SECONDS = float(os.getenv("A2A_BREAKER_RESET_SECONDS", "30"))
+A2A_BREAKER_HALF_OPEN_PROBES = int(os.getenv("A2A_BREAKER_HALF_OPEN_PROBES", "1"))
+
+# Estados del circuit breaker.
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def backoff_delay(
+    attempt: int,
+    base_delay: float = A2A_RETRY_BASE_DELAY_SECONDS,
+    max_delay: float = A2A_RETRY_MAX_DELAY_SECONDS,
+) -> float:
+    """
+    Espera antes del reintento número 'attempt' (0 = primer reintento), con "full jitter":
+    un valor aleatorio entre 0 y base * 2^attempt (acotado por max_delay), para que los
+    reintentos de muchas solicitudes no lleguen todos a la vez al agente.
+    """
+    return random.uniform(0.0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de un agente.
+
+    Tras 'failure_threshold' fallos consecutivos el circuito se abre y las llamadas
+    fallan al instante sin esperar conexiones ni timeouts. Pasados 'reset_seconds'
+    pasa a semiabierto y deja pasar 'half_open_probes' llamadas de prueba: si una
+    tiene éxito el circuito se cierra y, si falla, vuelve a abrirse. Las llamadas admitidas
+    con el circuito cerrado que terminan después no cuentan como pruebas.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = A2A_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = A2A_BREAKER_RESET_SECONDS,
+        half_open_probes: int = A2A_BREAKER_HALF_OPEN_PROBES,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._rejected = 0
+        self._times_opened = 0
+
+    def allow_request(self) -> tuple[bool, bool]:
+        """
+        Indica si se puede llamar al agente. Cada llamada permitida debe terminar con
+        record(), pasándole el indicador de prueba devuelto aquí.
+
+        Returns:
+            tuple: (si la llamada está permitida, si es una llamada de prueba del estado
+                    semiabierto).
+        """
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                self._rejected += 1
+                return False, False
+            self.state = HALF_OPEN
+            self._probes_in_flight = 0
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                self._rejected += 1
+                return False, False
+            self._probes_in_flight += 1
+            return True, True
+        return True, False
+
+    def record(self, succeeded: Optional[bool], probe: bool = False) -> None:
+        """
+        Registra el resultado de una llamada permitida.
+
+        Args:
+            succeeded (Optional[bool]): True si el agente respondió, False si falló
+                                        (conexión, timeout o 5xx), None si la llamada se
+                                        abandonó (ej. cancelada) sin información.
+            probe (bool): El indicador de prueba que devolvió allow_request().
+        """
+        if probe:
+            if self.state == HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+        elif self.state != CLOSED:
+            # Llamada admitida antes de abrirse el circuito que termina tarde: su resultado no
+            # dice nada del estado actual del agente, sólo las pruebas deciden si se cierra.
+            return
+        if succeeded is None:
+            return
+        if succeeded:
+            self._consecutive_failures = 0
+            if probe and self.state == HALF_OPEN:
+                logger.info("Circuit breaker de %s: cerrado (el agente vuelve a responder).", self.name)
+                self.state = CLOSED
+            return
+        self._consecutive_failures += 1
+        if (probe and self.state == HALF_OPEN) or self._consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning("Circuit breaker de %s: abierto tras %s fallos.", self.name, self._consecutive_failures)
+                self._times_opened += 1
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "times_opened": self._times_opened,
+            "rejected": self._rejected,
+        }
+
+
+# Un circuit breaker por agente (esquema://host:puerto), compartido por todas las llamadas.
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """
+    Devuelve el circuit breaker del agente al que apunta 'url', creándolo si no existe.
+    """
+    split_url = urlsplit(url)
+    name = f"{split_url.scheme}://{split_url.netloc}"
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def breaker_states() -> dict:
+    """
+    Estado de todos los circuit breakers, para publicarlo en /stats.
+    """
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
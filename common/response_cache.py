@@ -0,0 +1,331 @@
+# common/response_cache.py
+import asyncio
+import copy
+import functools
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from common.single_flight import SingleFlight
+from common.tracing import annotate
+
+# Configuración por defecto, ajustable con variables de entorno.
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_SQLITE_PATH = os.getenv("RESPONSE_CACHE_SQLITE_PATH", "") # Vacío = sin nivel en disco
+RESPONSE_CACHE_BUDGET_BUCKET = float(os.getenv("RESPONSE_CACHE_BUDGET_BUCKET", "100"))
+
+# Formatos de fecha aceptados además de ISO (YYYY-MM-DD).
+_DATE_FORMATS = ("%d/%m/%Y", "%Y/%m/%d", "%d-%m-%Y", "%d.%m.%Y")
+
+# Estación (trimestre meteorológico) de cada mes, para el campo derivado "season".
+_SEASONS = ("DEF", "DEF", "MAM", "MAM", "MAM", "JJA", "JJA", "JJA", "SON", "SON", "SON", "DEF")
+
+
+def _normalize_text(value) -> str:
+    return " ".join(str(value).split()).casefold()
+
+
+def _normalize_date(value) -> str:
+    text = str(value).strip()
+    try:
+        return date.fromisoformat(text[:10]).isoformat()
+    except ValueError:
+        pass
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return _normalize_text(text)
+
+
+def _season(value) -> str:
+    # "2025-JJA" para cualquier fecha de junio a agosto de 2025; diciembre cuenta en el DEF del año siguiente.
+    day = date.fromisoformat(_normalize_date(value)) # ValueError si la fecha no es interpretable
+    return f"{day.year + (day.month == 12)}-{_SEASONS[day.month - 1]}"
+
+
+def _bucket_budget(value, bucket: Optional[float]) -> str:
+    budget = float(value)
+    if not bucket:
+        return repr(budget)
+    return repr(math.floor(budget / bucket) * bucket)
+
+
+def canonical_request_key(
+    request: dict,
+    fields: Iterable[str],
+    budget_bucket: Optional[float] = RESPONSE_CACHE_BUDGET_BUCKET,
+) -> str:
+    """
+    Construye una clave canónica a partir de los campos relevantes de un TravelRequest.
+
+    Las ciudades se recortan y se pasan a minúsculas (casefold), las fechas se
+    normalizan a ISO y el presupuesto se agrupa en tramos de 'budget_bucket' USD,
+    de modo que solicitudes equivalentes comparten la misma clave.
+
+    El campo derivado "season" agrupa por la estación de 'start_date' (ej. "2025-JJA"),
+    para respuestas que no dependen de las fechas exactas (actividades).
+
+    Args:
+        request (dict): La solicitud de viaje.
+        fields (Iterable[str]): Campos del TravelRequest que afectan a la respuesta.
+        budget_bucket (Optional[float]): Tamaño del tramo de presupuesto. None o 0 usa el valor exacto.
+
+    Returns:
+        str: La clave canónica.
+
+    Raises:
+        KeyError, TypeError, ValueError: Si falta un campo o su valor no es interpretable.
+    """
+    normalized = {}
+    for field in fields:
+        if field == "season":
+            normalized[field] = _season(request["start_date"])
+            continue
+        value = request[field]
+        if field in ("start_date", "end_date"):
+            normalized[field] = _normalize_date(value)
+        elif field == "budget":
+            normalized[field] = _bucket_budget(value, budget_bucket)
+        else:
+            normalized[field] = _normalize_text(value)
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+
+
+def is_cacheable(result) -> bool:
+    """
+    Indica si una respuesta de agente puede guardarse en caché: sin clave 'error',
+    con todos sus valores en forma de lista y al menos una lista no vacía.
+    Los mensajes de error en texto (ej. {"activities": "Error..."}) no se guardan.
+    """
+    if not isinstance(result, dict) or not result or "error" in result:
+        return False
+    values = list(result.values())
+    return all(isinstance(value, list) for value in values) and any(values)
+
+
+class ResponseCache:
+    """
+    Caché de respuestas de agentes con un nivel LRU en memoria y un nivel opcional
+    en SQLite, ambos con TTL, más contadores de aciertos, fallos y expulsiones.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        sqlite_path: Optional[str] = RESPONSE_CACHE_SQLITE_PATH,
+        enabled: bool = RESPONSE_CACHE_ENABLED,
+    ):
+        """
+        Args:
+            namespace (str): Nombre del agente; separa sus entradas en el fichero SQLite compartido.
+            max_entries (int): Entradas máximas del nivel en memoria.
+            ttl_seconds (float): Tiempo de vida de cada entrada.
+            sqlite_path (Optional[str]): Ruta del fichero SQLite. Vacío o None desactiva el nivel en disco.
+            enabled (bool): Si es False, la caché no guarda ni devuelve nada.
+        """
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "stores": 0,
+        }
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        # Los fallos simultáneos con la misma clave comparten una sola ejecución del agente.
+        self._in_flight = SingleFlight()
+        if enabled and sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            self._db.commit()
+
+    async def get(self, key: str) -> Optional[dict]:
+        """
+        Busca una respuesta primero en memoria y después en disco.
+
+        Returns:
+            Optional[dict]: Una copia de la respuesta guardada, o None si no existe o expiró.
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return copy.deepcopy(value)
+            del self._memory[key]
+            self._counters["expirations"] += 1
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._db_get, key, now)
+            if row is not None:
+                expires_at, value = row
+                self._store_in_memory(key, value, expires_at)
+                self._counters["disk_hits"] += 1
+                return copy.deepcopy(value)
+
+        self._counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: dict) -> None:
+        """
+        Guarda una respuesta en memoria y, si está configurado, en disco.
+        """
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        self._store_in_memory(key, copy.deepcopy(value), expires_at)
+        self._counters["stores"] += 1
+        if self._db is not None:
+            await asyncio.to_thread(self._db_set, key, json.dumps(value, ensure_ascii=False), expires_at)
+
+    def cached(
+        self,
+        key_fields: Iterable[str],
+        budget_bucket: Optional[float] = RESPONSE_CACHE_BUDGET_BUCKET,
+    ) -> Callable:
+        """
+        Decorador para la función 'execute' de un agente: devuelve la respuesta guardada
+        si existe y, si no, ejecuta el agente y guarda el resultado cuando es cacheable.
+        Las solicitudes con la misma clave que llegan mientras se ejecuta la primera
+        esperan su resultado en lugar de repetir la llamada al LLM.
+
+        Args:
+            key_fields (Iterable[str]): Campos del TravelRequest que forman la clave.
+            budget_bucket (Optional[float]): Tamaño del tramo de presupuesto de la clave.
+        """
+        key_fields = tuple(key_fields)
+
+        def decorator(execute: Callable[[dict], Awaitable[dict]]) -> Callable[[dict], Awaitable[dict]]:
+            @functools.wraps(execute)
+            async def wrapper(request: dict) -> dict:
+                try:
+                    key = canonical_request_key(request, key_fields, budget_bucket)
+                except (KeyError, TypeError, ValueError):
+                    # Solicitud incompleta o inválida: la validación del agente devolverá el error.
+                    return await execute(request)
+
+                cached_response = await self.get(key)
+                annotate(**{"cache.hit": cached_response is not None})
+                if cached_response is not None:
+                    return cached_response
+
+                async def execute_and_store() -> dict:
+                    result = await execute(request)
+                    if is_cacheable(result):
+                        await self.set(key, result)
+                    return result
+
+                # Las solicitudes agrupadas comparten el resultado: cada una recibe su propia
+                # copia, como en los aciertos de get(), para que modificarla no afecte a las demás.
+                return copy.deepcopy(await self._in_flight.do(key, execute_and_store))
+
+            return wrapper
+
+        return decorator
+
+    def cached_stream(
+        self,
+        key_fields: Iterable[str],
+        budget_bucket: Optional[float] = RESPONSE_CACHE_BUDGET_BUCKET,
+    ) -> Callable:
+        """
+        Versión de 'cached' para 'execute_stream': los eventos se emiten tal cual y la
+        respuesta final (evento {"type": "result", "data": ...}) se guarda en la caché.
+        Si ya hay una respuesta guardada, se emite directamente como evento "result".
+        """
+        key_fields = tuple(key_fields)
+
+        def decorator(execute_stream: Callable[[dict], AsyncIterator[dict]]) -> Callable[[dict], AsyncIterator[dict]]:
+            @functools.wraps(execute_stream)
+            async def wrapper(request: dict) -> AsyncIterator[dict]:
+                try:
+                    key = canonical_request_key(request, key_fields, budget_bucket)
+                except (KeyError, TypeError, ValueError):
+                    async for event in execute_stream(request):
+                        yield event
+                    return
+
+                cached_response = await self.get(key)
+                annotate(**{"cache.hit": cached_response is not None})
+                if cached_response is not None:
+                    yield {"type": "result", "data": cached_response}
+                    return
+
+                async for event in execute_stream(request):
+                    if event.get("type") == "result" and is_cacheable(event.get("data")):
+                        await self.set(key, event["data"])
+                    yield event
+
+            return wrapper
+
+        return decorator
+
+    def stats(self) -> dict:
+        """
+        Devuelve los contadores de la caché y el número de entradas en memoria.
+        """
+        return {
+            **self._counters,
+            "coalesced": self._in_flight.stats()["coalesced"],
+            "memory_entries": len(self._memory),
+            "disk_enabled": self._db is not None,
+        }
+
+    def _store_in_memory(self, key: str, value: dict, expires_at: float) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _db_get(self, key: str, now: float) -> Optional[tuple[float, dict]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM response_cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._db.execute(
+                    "DELETE FROM response_cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+                )
+                self._db.commit()
+                self._counters["expirations"] += 1
+                return None
+        return row[1], json.loads(row[0])
+
+    def _db_set(self, key: str, value_json: str, expires_at: float) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO response_cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, value_json, expires_at),
+            )
+            self._db.commit()
@@ -0,0 +1,111 @@
+# common/serialization.py
+import copy
+import json
+from typing import TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+try:
+    import orjson
+except ImportError: # orjson es opcional: sin él se usa el módulo json estándar
+    orjson = None
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
+
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Tipo no serializable a JSON: {type(value).__name__}")
+
+
+def dumps(value) -> bytes:
+    """
+    Serializa a JSON (UTF-8) con orjson si está instalado, o con json si no.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(value, ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def loads(data):
+    """
+    Interpreta JSON (bytes o str). Los errores son json.JSONDecodeError en ambos casos
+    (orjson.JSONDecodeError es una subclase).
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class ValidatedPayload(dict):
+    """
+    Una solicitud (el diccionario tal como llegó) que ya se validó con un modelo Pydantic.
+    Guarda la instancia del modelo para que los agentes la reutilicen (ver as_model) en
+    lugar de validar de nuevo.
+
+    El modelo se trata como de sólo lectura: al copiar la solicitud con deepcopy (como hace
+    call_agent en el modo en proceso) se copia el diccionario pero se comparte el modelo, de
+    modo que el salto al subagente no paga ni la copia del modelo ni una nueva validación.
+    """
+
+    def __init__(self, data: dict, model: BaseModel):
+        super().__init__(data)
+        self.model = model
+
+    @classmethod
+    def from_model(cls, model: BaseModel) -> "ValidatedPayload":
+        """
+        Solicitud construida por el propio agente (ej. cada fecha de un barrido).
+        """
+        return cls(model.model_dump(), model)
+
+    def __deepcopy__(self, memo: dict) -> "ValidatedPayload":
+        return ValidatedPayload(copy.deepcopy(dict(self), memo), self.model)
+
+
+def validate_payload(data, model_class: type[ModelT]) -> ValidatedPayload:
+    """
+    Valida una solicitud ya interpretada (diccionario) con 'model_class'. El diccionario se
+    conserva tal cual, con los campos que no son del modelo.
+
+    Raises:
+        pydantic.ValidationError: Si la solicitud no cumple el modelo.
+    """
+    model = model_class.model_validate(data) # Si 'data' no es un diccionario, falla con model_type
+    return ValidatedPayload(data, model)
+
+
+def as_model(payload: dict, model_class: type[ModelT]) -> ModelT:
+    """
+    Devuelve la solicitud como instancia de 'model_class': la ya validada si 'payload' es un
+    ValidatedPayload de ese modelo y, si no, validándola ahora.
+
+    Raises:
+        pydantic.ValidationError: Si hay que validar y la solicitud no cumple el modelo.
+    """
+    if isinstance(payload, ValidatedPayload) and isinstance(payload.model, model_class):
+        return payload.model
+    return model_class.model_validate(payload)
+
+
+def validate_json(model_class: type[ModelT], text) -> ModelT:
+    """
+    Valida directamente el texto JSON (ej. la respuesta del LLM) con 'model_class':
+    Pydantic lo interpreta y lo valida en una sola pasada, sin construir antes un
+    diccionario con json.loads.
+
+    Raises:
+        json.JSONDecodeError: Si el texto no es JSON válido, como json.loads, para que los
+                              llamantes distingan este caso de un JSON que no cumple el modelo.
+        pydantic.ValidationError: Si el JSON no cumple el modelo.
+    """
+    try:
+        return model_class.model_validate_json(text)
+    except ValidationError as e:
+        json_errors = [detail for detail in e.errors(include_url=False) if detail["type"] == "json_invalid"]
+        if json_errors:
+            raise json.JSONDecodeError(json_errors[0]["msg"], text if isinstance(text, str) else "", 0) from e
+        raise
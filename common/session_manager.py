@@ -0,0 +1,74 @@
+# common/session_manager.py
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from common.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class SessionManager:
+    """
+    Gestiona las sesiones ADK de un agente para que cada solicitud tenga su propio contexto.
+
+    Cada solicitud recibe una sesión nueva que se elimina al terminar, así el historial no
+    se acumula entre solicitudes ni se mezcla entre solicitudes concurrentes.
+    """
+
+    def __init__(self, session_service, app_name: str, user_id: str):
+        """
+        Args:
+            session_service: El servicio de sesiones ADK (ej. InMemorySessionService).
+            app_name (str): Nombre de la aplicación usado por el Runner.
+            user_id (str): Identificador de usuario de las sesiones.
+        """
+        self.session_service = session_service
+        self.app_name = app_name
+        self.user_id = user_id
+        self._active = 0
+        self._created = 0
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[str]:
+        """
+        Proporciona un session_id exclusivo para una solicitud y elimina la sesión al terminar.
+
+        Yields:
+            str: El session_id que debe pasarse a runner.run_async.
+        """
+        session_id = self._create()
+        self._active += 1
+        try:
+            yield session_id
+        finally:
+            self._active -= 1
+            self._delete(session_id)
+
+    def stats(self) -> dict:
+        """
+        Devuelve el número de sesiones gestionadas.
+
+        Returns:
+            dict: Sesiones activas (solicitudes en curso) y el contador de sesiones creadas.
+        """
+        return {
+            "active_sessions": self._active,
+            "created": self._created,
+        }
+
+    def _create(self) -> str:
+        session_id = f"{self.app_name}-{uuid.uuid4().hex}"
+        self.session_service.create_session(
+            app_name=self.app_name, user_id=self.user_id, session_id=session_id
+        )
+        self._created += 1
+        return session_id
+
+    def _delete(self, session_id: str) -> None:
+        try:
+            self.session_service.delete_session(
+                app_name=self.app_name, user_id=self.user_id, session_id=session_id
+            )
+        except Exception as e:
+            logger.warning("No se pudo eliminar la sesión %s: %s", session_id, e)
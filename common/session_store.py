@@ -0,0 +1,545 @@
+# common/session_store.py
+import atexit
+import copy
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session, State
+from google.adk.sessions.base_session_service import GetSessionConfig, ListEventsResponse, ListSessionsResponse
+
+from common.log import get_logger
+from common.serialization import dumps, loads
+
+logger = get_logger(__name__)
+
+# Servicio de sesiones ADK de los agentes: "memory" (InMemorySessionService) o "sqlite"
+# (SqliteSessionService: sesiones en un fichero SQLite local que sobreviven a los reinicios).
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+# Escrituras por lotes: el hilo de escritura agrupa en una transacción todo lo pendiente
+# cada SESSION_SQLITE_FLUSH_INTERVAL_SECONDS o en cuanto hay SESSION_SQLITE_BATCH_EVENTS eventos.
+SESSION_SQLITE_BATCH_EVENTS = int(os.getenv("SESSION_SQLITE_BATCH_EVENTS", "64"))
+SESSION_SQLITE_FLUSH_INTERVAL_SECONDS = float(os.getenv("SESSION_SQLITE_FLUSH_INTERVAL_SECONDS", "0.2"))
+# Segundos que una sesión nueva se queda sólo en memoria antes de escribirse: la sesión
+# efímera de cada solicitud se elimina antes y no llega al disco (0 = en el siguiente lote).
+SESSION_SQLITE_WRITE_DELAY_SECONDS = float(os.getenv("SESSION_SQLITE_WRITE_DELAY_SECONDS", "30"))
+# Sesiones que se mantienen en memoria (LRU) para no leerlas de disco en cada turno.
+SESSION_SQLITE_CACHE_SIZE = int(os.getenv("SESSION_SQLITE_CACHE_SIZE", "128"))
+# Eventos más recientes que se conservan por sesión (0 = todos).
+SESSION_SQLITE_MAX_EVENTS = int(os.getenv("SESSION_SQLITE_MAX_EVENTS", "100"))
+# Segundos sin actividad tras los que una sesión se elimina (0 = nunca).
+SESSION_SQLITE_RETENTION_SECONDS = float(os.getenv("SESSION_SQLITE_RETENTION_SECONDS", "86400"))
+# Cada cuánto se eliminan las sesiones expiradas y los eventos sobrantes (0 = nunca).
+SESSION_SQLITE_COMPACTION_INTERVAL_SECONDS = float(os.getenv("SESSION_SQLITE_COMPACTION_INTERVAL_SECONDS", "300"))
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sessions ("
+    "app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL, state TEXT NOT NULL, "
+    "last_update_time REAL NOT NULL, PRIMARY KEY (app_name, user_id, session_id))",
+    "CREATE INDEX IF NOT EXISTS sessions_last_update ON sessions (last_update_time)",
+    "CREATE TABLE IF NOT EXISTS session_events ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, app_name TEXT NOT NULL, user_id TEXT NOT NULL, "
+    "session_id TEXT NOT NULL, data TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS session_events_session ON session_events (app_name, user_id, session_id, id)",
+    "CREATE TABLE IF NOT EXISTS app_state ("
+    "app_name TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (app_name, key))",
+    "CREATE TABLE IF NOT EXISTS user_state ("
+    "app_name TEXT NOT NULL, user_id TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+    "PRIMARY KEY (app_name, user_id, key))",
+)
+
+# Servicios SQLite creados en este proceso, para cerrarlos al apagar el agente.
+_services: list["SqliteSessionService"] = []
+
+SessionKey = tuple[str, str, str] # (app_name, user_id, session_id)
+
+
+def _json(value) -> str:
+    return dumps(value).decode("utf-8")
+
+
+class SqliteSessionService(BaseSessionService):
+    """
+    Servicio de sesiones ADK persistido en un fichero SQLite local (modo WAL), compatible
+    con InMemorySessionService: se pasa igual al Runner.
+
+    Las escrituras no bloquean el bucle de eventos: create_session y append_event actualizan
+    la caché en memoria y dejan la escritura pendiente; un hilo aparte las agrupa en una
+    transacción por lote. Las sesiones nuevas no se escriben hasta pasados 'write_delay_seconds'
+    desde su creación, así que una sesión que se elimina antes (la sesión efímera de una
+    solicitud, ver SessionManager) no llega a tocar el disco.
+
+    Las sesiones usadas recientemente se sirven desde una caché LRU de 'cache_size'
+    sesiones; el resto se leen de SQLite. De cada sesión se conservan los 'max_events'
+    eventos más recientes, y la compactación periódica elimina las sesiones sin actividad
+    durante 'retention_seconds' y recorta el WAL, así que la memoria y el fichero no crecen
+    con el tiempo de funcionamiento del agente.
+
+    La caché supone que cada sesión la usa un solo proceso (las réplicas de un agente pueden
+    compartir el fichero, pero no las sesiones).
+    """
+
+    def __init__(
+        self,
+        path: str = SESSION_SQLITE_PATH,
+        batch_events: int = SESSION_SQLITE_BATCH_EVENTS,
+        flush_interval_seconds: float = SESSION_SQLITE_FLUSH_INTERVAL_SECONDS,
+        write_delay_seconds: float = SESSION_SQLITE_WRITE_DELAY_SECONDS,
+        cache_size: int = SESSION_SQLITE_CACHE_SIZE,
+        max_events: int = SESSION_SQLITE_MAX_EVENTS,
+        retention_seconds: float = SESSION_SQLITE_RETENTION_SECONDS,
+        compaction_interval_seconds: float = SESSION_SQLITE_COMPACTION_INTERVAL_SECONDS,
+    ):
+        """
+        Args:
+            path (str): Ruta del fichero SQLite (puede compartirse entre agentes).
+            batch_events (int): Eventos pendientes que provocan una escritura inmediata.
+            flush_interval_seconds (float): Espera máxima de una escritura pendiente.
+            write_delay_seconds (float): Tiempo que una sesión nueva se queda sólo en memoria.
+            cache_size (int): Sesiones que se mantienen en memoria.
+            max_events (int): Eventos más recientes que se conservan por sesión (0 = todos).
+            retention_seconds (float): Inactividad tras la que se elimina una sesión (0 = nunca).
+            compaction_interval_seconds (float): Cada cuánto se compacta el fichero (0 = nunca).
+        """
+        self.path = path
+        self.batch_events = batch_events
+        self.flush_interval_seconds = flush_interval_seconds
+        self.write_delay_seconds = write_delay_seconds
+        self.cache_size = cache_size
+        self.max_events = max_events
+        self.retention_seconds = retention_seconds
+        self.compaction_interval_seconds = compaction_interval_seconds
+
+        # Estado en memoria, compartido con el hilo de escritura (protegido por _lock).
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[SessionKey, Session]" = OrderedDict()
+        self._pending: list[tuple] = [] # Operaciones en orden: ("event", clave, Event), ("delete", clave), ("app_state"|"user_state", ...)
+        self._pending_events = 0 # Eventos pendientes que cuentan para 'batch_events'
+        self._dirty: dict[SessionKey, Session] = {} # Sesiones cuya fila (estado, última actualización) hay que escribir
+        self._unflushed: dict[SessionKey, float] = {} # Sesiones aún no escritas -> instante de creación (monotonic)
+        self._app_state: dict[str, dict[str, Any]] = {}
+        self._user_state: dict[tuple[str, str], dict[str, Any]] = {}
+        self._counters = {
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "flushes": 0,
+            "events_written": 0,
+            "sessions_never_written": 0,
+            "compactions": 0,
+            "sessions_expired": 0,
+            "events_trimmed": 0,
+        }
+
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5.0, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL") # Con WAL, seguro ante caídas del proceso
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._load_shared_state()
+
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer: Optional[threading.Thread] = None
+        _services.append(self)
+        atexit.register(self.close)
+
+    # --- API de BaseSessionService ---
+
+    def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        session = Session(
+            app_name=app_name, user_id=user_id, id=session_id, state=state or {}, last_update_time=time.time()
+        )
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            self._remember(key, session)
+            self._dirty[key] = session
+            self._unflushed[key] = time.monotonic()
+            copied_session = copy.deepcopy(session)
+        self._ensure_writer()
+        return self._merge_state(copied_session)
+
+    def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            session = self._cache.get(key)
+            if session is not None:
+                self._cache.move_to_end(key)
+                self._counters["cache_hits"] += 1
+                copied_session = copy.deepcopy(session)
+        if session is None:
+            self._counters["cache_misses"] += 1
+            session = self._load_session(key)
+            if session is None:
+                return None
+            with self._lock:
+                # Otra llamada pudo cargarla mientras tanto: se conserva la que ya está en caché.
+                session = self._cache.get(key) or session
+                self._remember(key, session)
+                copied_session = copy.deepcopy(session)
+
+        if config:
+            if config.num_recent_events:
+                copied_session.events = copied_session.events[-config.num_recent_events:]
+            if config.after_timestamp:
+                copied_session.events = [
+                    event for event in copied_session.events if event.timestamp >= config.after_timestamp
+                ]
+        return self._merge_state(copied_session)
+
+    def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        self.flush(force=True) # Incluye las sesiones nuevas que aún no se han escrito
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT session_id, last_update_time FROM sessions WHERE app_name = ? AND user_id = ?",
+                (app_name, user_id),
+            ).fetchall()
+        return ListSessionsResponse(sessions=[
+            Session(app_name=app_name, user_id=user_id, id=session_id, last_update_time=last_update_time)
+            for session_id, last_update_time in rows
+        ])
+
+    def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            self._cache.pop(key, None)
+            self._dirty.pop(key, None)
+            if key in self._unflushed:
+                # Nunca se escribió: basta con descartar sus operaciones pendientes.
+                del self._unflushed[key]
+                kept = [operation for operation in self._pending if operation[0] != "event" or operation[1] != key]
+                if not self.write_delay_seconds:
+                    self._pending_events -= len(self._pending) - len(kept)
+                self._pending = kept
+                self._counters["sessions_never_written"] += 1
+                return
+            self._pending.append(("delete", key))
+        self._ensure_writer()
+
+    def list_events(self, *, app_name: str, user_id: str, session_id: str) -> ListEventsResponse:
+        session = self.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        return ListEventsResponse(events=session.events if session is not None else [])
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        # Actualiza la sesión del llamante (igual que InMemorySessionService).
+        super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        if event.partial:
+            return event
+
+        key = (session.app_name, session.user_id, session.id)
+        with self._lock:
+            storage_session = self._cache.get(key) or self._dirty.get(key)
+        if storage_session is None: # Expulsada de la caché: se lee de SQLite
+            storage_session = self._load_session(key)
+        if storage_session is None:
+            return event # Sesión eliminada o inexistente
+
+        with self._lock:
+            state_delta = event.actions.state_delta if event.actions else None
+            for state_key, value in (state_delta or {}).items():
+                if state_key.startswith(State.APP_PREFIX):
+                    name = state_key.removeprefix(State.APP_PREFIX)
+                    self._app_state.setdefault(session.app_name, {})[name] = value
+                    self._pending.append(("app_state", key, session.app_name, name, value))
+                elif state_key.startswith(State.USER_PREFIX):
+                    name = state_key.removeprefix(State.USER_PREFIX)
+                    self._user_state.setdefault((session.app_name, session.user_id), {})[name] = value
+                    self._pending.append(("user_state", key, session.app_name, session.user_id, name, value))
+
+            super().append_event(session=storage_session, event=event)
+            storage_session.last_update_time = event.timestamp
+            if self.max_events and len(storage_session.events) > self.max_events:
+                del storage_session.events[:-self.max_events]
+            self._remember(key, storage_session)
+            self._dirty[key] = storage_session
+            self._pending.append(("event", key, event))
+            # Los eventos de una sesión nueva esperan a write_delay_seconds: no adelantan la escritura.
+            if not (self.write_delay_seconds and key in self._unflushed):
+                self._pending_events += 1
+            flush_now = self._pending_events >= self.batch_events
+        self._ensure_writer()
+        if flush_now:
+            self._wake.set()
+        return event
+
+    # --- Escritura por lotes y compactación ---
+
+    def flush(self, force: bool = False) -> None:
+        """
+        Escribe ahora, en una transacción, las operaciones pendientes. Las de las sesiones
+        creadas hace menos de 'write_delay_seconds' siguen en memoria, salvo con force=True.
+        """
+        # Se toma _db_lock antes de recoger lo pendiente: así una lectura de SQLite (que
+        # también toma _db_lock) nunca ve un estado anterior a operaciones ya recogidas.
+        # Orden de los cerrojos en todo el módulo: _db_lock y después _lock.
+        events_written = 0
+        with self._db_lock:
+            with self._lock:
+                deferred = set() if force else self._deferred_keys()
+                pending = [operation for operation in self._pending if operation[0] != "event" or operation[1] not in deferred]
+                self._pending = [operation for operation in self._pending if operation[0] == "event" and operation[1] in deferred]
+                self._pending_events = 0
+                dirty = {key: session for key, session in self._dirty.items() if key not in deferred}
+                self._dirty = {key: session for key, session in self._dirty.items() if key in deferred}
+                self._unflushed = {key: created_at for key, created_at in self._unflushed.items() if key in deferred}
+                # El estado se serializa aquí porque el bucle de eventos puede seguir modificándolo.
+                rows = [
+                    (app_name, user_id, session_id, _json(session.state), session.last_update_time)
+                    for (app_name, user_id, session_id), session in dirty.items()
+                ]
+            if not pending and not rows:
+                return
+            try:
+                self._db.execute("BEGIN")
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO sessions (app_name, user_id, session_id, state, last_update_time) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                for operation in pending:
+                    kind, key = operation[0], operation[1]
+                    if kind == "event":
+                        self._db.execute(
+                            "INSERT INTO session_events (app_name, user_id, session_id, data) VALUES (?, ?, ?, ?)",
+                            (*key, operation[2].model_dump_json(exclude_none=True)),
+                        )
+                        events_written += 1
+                    elif kind == "delete":
+                        self._db.execute(
+                            "DELETE FROM session_events WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+                        )
+                        self._db.execute(
+                            "DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+                        )
+                    elif kind == "app_state":
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO app_state (app_name, key, value) VALUES (?, ?, ?)",
+                            (operation[2], operation[3], _json(operation[4])),
+                        )
+                    elif kind == "user_state":
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO user_state (app_name, user_id, key, value) VALUES (?, ?, ?, ?)",
+                            (operation[2], operation[3], operation[4], _json(operation[5])),
+                        )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        self._counters["flushes"] += 1
+        self._counters["events_written"] += events_written
+
+    def compact(self) -> None:
+        """
+        Elimina las sesiones sin actividad durante 'retention_seconds', recorta cada sesión a
+        sus 'max_events' eventos más recientes y vacía el WAL en el fichero principal.
+        """
+        self.flush()
+        expired_keys = []
+        trimmed = 0
+        with self._db_lock:
+            self._db.execute("BEGIN")
+            if self.retention_seconds:
+                cutoff = time.time() - self.retention_seconds
+                expired_keys = self._db.execute(
+                    "SELECT app_name, user_id, session_id FROM sessions WHERE last_update_time < ?", (cutoff,)
+                ).fetchall()
+                for key in expired_keys:
+                    self._db.execute(
+                        "DELETE FROM session_events WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+                    )
+                self._db.execute("DELETE FROM sessions WHERE last_update_time < ?", (cutoff,))
+            if self.max_events:
+                oversized = self._db.execute(
+                    "SELECT app_name, user_id, session_id FROM session_events "
+                    "GROUP BY app_name, user_id, session_id HAVING COUNT(*) > ?",
+                    (self.max_events,),
+                ).fetchall()
+                for key in oversized:
+                    # Se borran los eventos anteriores al max_events-ésimo más reciente.
+                    trimmed += self._db.execute(
+                        "DELETE FROM session_events WHERE app_name = ? AND user_id = ? AND session_id = ? AND id <= ("
+                        "SELECT id FROM session_events WHERE app_name = ? AND user_id = ? AND session_id = ? "
+                        "ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                        (*key, *key, self.max_events),
+                    ).rowcount
+            self._db.execute("COMMIT")
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        with self._lock:
+            for key in expired_keys:
+                key = tuple(key)
+                if key not in self._dirty: # Si tiene escrituras pendientes, volvió a usarse
+                    self._cache.pop(key, None)
+        self._counters["compactions"] += 1
+        self._counters["sessions_expired"] += len(expired_keys)
+        self._counters["events_trimmed"] += trimmed
+
+    def close(self) -> None:
+        """
+        Detiene el hilo de escritura, escribe lo pendiente y cierra el fichero.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._writer is not None:
+            self._writer.join(timeout=10.0)
+        try:
+            self.flush(force=True)
+        finally:
+            with self._db_lock:
+                self._db.close()
+        if self in _services:
+            _services.remove(self)
+
+    def stats(self) -> dict:
+        """
+        Devuelve el tamaño de la caché, las escrituras pendientes (incluidas las sesiones
+        nuevas que aún no se han escrito) y los contadores de escritura y compactación.
+        """
+        with self._lock:
+            cached_sessions = len(self._cache)
+            pending_events = sum(1 for operation in self._pending if operation[0] == "event")
+            unwritten_sessions = len(self._unflushed)
+        flushes = self._counters["flushes"]
+        return {
+            "path": self.path,
+            "cached_sessions": cached_sessions,
+            "pending_events": pending_events,
+            "unwritten_sessions": unwritten_sessions,
+            "avg_events_per_flush": round(self._counters["events_written"] / flushes, 1) if flushes else 0.0,
+            **self._counters,
+        }
+
+    # --- Auxiliares ---
+
+    def _ensure_writer(self) -> None:
+        if self._writer is None and not self._closed:
+            self._writer = threading.Thread(target=self._write_loop, name="session-store-writer", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self) -> None:
+        last_compaction = time.monotonic()
+        while not self._closed:
+            self._wake.wait(self.flush_interval_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+                if self.compaction_interval_seconds and time.monotonic() - last_compaction >= self.compaction_interval_seconds:
+                    last_compaction = time.monotonic()
+                    self.compact()
+            except Exception as e: # Las operaciones no escritas se pierden, pero el hilo sigue
+                logger.error("Error escribiendo sesiones en %s: %s - %s", self.path, type(e).__name__, e)
+
+    def _deferred_keys(self) -> set[SessionKey]:
+        # Llamar con _lock tomado. Sesiones nuevas que todavía no deben escribirse.
+        if not self.write_delay_seconds:
+            return set()
+        now = time.monotonic()
+        return {key for key, created_at in self._unflushed.items() if now - created_at < self.write_delay_seconds}
+
+    def _remember(self, key: SessionKey, session: Session) -> None:
+        # Llamar con _lock tomado.
+        self._cache[key] = session
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _load_session(self, key: SessionKey) -> Optional[Session]:
+        # Llamar sin _lock tomado. Una sesión expulsada de la caché con escrituras pendientes
+        # sigue en _dirty; si no, se lee de SQLite, después de escribir lo pendiente (por
+        # ejemplo, su eliminación).
+        with self._lock:
+            session = self._dirty.get(key)
+            has_pending = bool(self._pending)
+        if session is not None:
+            return session
+        if has_pending:
+            self.flush()
+        return self._read_session(key)
+
+    def _read_session(self, key: SessionKey) -> Optional[Session]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT state, last_update_time FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            query = "SELECT data FROM session_events WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY id"
+            params: tuple = key
+            if self.max_events:
+                query = (
+                    "SELECT data FROM (SELECT id, data FROM session_events WHERE app_name = ? AND user_id = ? "
+                    "AND session_id = ? ORDER BY id DESC LIMIT ?) ORDER BY id"
+                )
+                params = (*key, self.max_events)
+            event_rows = self._db.execute(query, params).fetchall()
+        app_name, user_id, session_id = key
+        return Session(
+            app_name=app_name, user_id=user_id, id=session_id, state=loads(row[0]), last_update_time=row[1],
+            events=[Event.model_validate_json(data) for (data,) in event_rows],
+        )
+
+    def _load_shared_state(self) -> None:
+        with self._db_lock:
+            for app_name, name, value in self._db.execute("SELECT app_name, key, value FROM app_state"):
+                self._app_state.setdefault(app_name, {})[name] = loads(value)
+            for app_name, user_id, name, value in self._db.execute("SELECT app_name, user_id, key, value FROM user_state"):
+                self._user_state.setdefault((app_name, user_id), {})[name] = loads(value)
+
+    def _merge_state(self, session: Session) -> Session:
+        # Añade el estado de la aplicación y del usuario, como InMemorySessionService.
+        with self._lock:
+            for name, value in self._app_state.get(session.app_name, {}).items():
+                session.state[State.APP_PREFIX + name] = value
+            for name, value in self._user_state.get((session.app_name, session.user_id), {}).items():
+                session.state[State.USER_PREFIX + name] = value
+        return session
+
+
+def create_session_service() -> BaseSessionService:
+    """
+    Servicio de sesiones de un agente según SESSION_BACKEND: InMemorySessionService
+    ("memory", por defecto) o SqliteSessionService ("sqlite", en SESSION_SQLITE_PATH).
+    """
+    if SESSION_BACKEND == "sqlite":
+        return SqliteSessionService()
+    if SESSION_BACKEND != "memory":
+        logger.warning("SESSION_BACKEND=%r desconocido. Se usarán sesiones en memoria.", SESSION_BACKEND)
+    return InMemorySessionService()
+
+
+def close_session_services() -> None:
+    """
+    Hook de apagado: escribe las sesiones pendientes y cierra los ficheros SQLite.
+    """
+    for service in list(_services):
+        service.close()
+
+
+def session_store_stats() -> dict:
+    """
+    Estadísticas de los servicios SQLite de este proceso para /stats (vacío con sesiones en memoria).
+    """
+    return {f"store_{index}": service.stats() for index, service in enumerate(_services)}
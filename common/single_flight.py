@@ -0,0 +1,75 @@
+# common/single_flight.py
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class _InFlightCall:
+    """
+    Trabajo compartido en curso para una clave y número de solicitudes que lo esperan.
+    """
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes idénticas para que compartan un único trabajo.
+
+    La primera llamada con una clave lanza el trabajo como tarea independiente; las
+    llamadas que llegan mientras sigue en curso esperan ese mismo resultado. Cancelar
+    a una de las solicitudes que esperan no cancela el trabajo compartido.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, _InFlightCall] = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Ejecuta 'func' una sola vez por clave entre todas las llamadas concurrentes.
+
+        Args:
+            key (str): Clave que identifica solicitudes equivalentes.
+            func (Callable): Función sin argumentos que devuelve el trabajo a compartir.
+
+        Returns:
+            El resultado del trabajo compartido (o relanza su excepción).
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _InFlightCall(asyncio.create_task(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+            self._leaders += 1
+        else:
+            self._coalesced += 1
+
+        call.waiters += 1
+        try:
+            # shield: si esta solicitud se cancela, la tarea compartida sigue en marcha.
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+
+    def stats(self) -> dict:
+        """
+        Devuelve el número de trabajos en curso, las solicitudes que esperan y los
+        contadores de trabajos lanzados y solicitudes agrupadas.
+        """
+        return {
+            "in_flight": len(self._calls),
+            "waiters": sum(call.waiters for call in self._calls.values()),
+            "leaders": self._leaders,
+            "coalesced": self._coalesced,
+        }
+
+    def _finish(self, key: str, call: _InFlightCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Consumir la excepción por si todas las solicitudes en espera se cancelaron.
+        if not call.task.cancelled():
+            call.task.exception()
@@ -0,0 +1,144 @@
+# common/startup.py
+import importlib.abc
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+from common.log import get_logger
+
+logger = get_logger(__name__)
+
+# Informe de arranque: coste de las importaciones por paquete y tiempo hasta estar listo.
+AGENT_STARTUP_REPORT = os.getenv("AGENT_STARTUP_REPORT", "true").lower() in ("1", "true", "yes")
+AGENT_STARTUP_REPORT_TOP = int(os.getenv("AGENT_STARTUP_REPORT_TOP", "12")) # Paquetes mostrados
+
+# Instante de referencia del arranque: la importación de este módulo, que los __main__
+# de los agentes hacen antes que cualquier otra.
+_process_started_at = time.perf_counter()
+
+# Paquetes de espacio de nombres que se desglosan por su segundo nivel (google.adk, google.genai...).
+_NAMESPACE_PACKAGES = ("google", "opentelemetry")
+
+
+class _ImportTimingFinder(importlib.abc.MetaPathFinder):
+    """
+    Buscador de módulos que no carga nada por sí mismo: delega en los demás buscadores de
+    sys.meta_path y mide cuánto tarda en ejecutarse cada módulo importado.
+
+    El tiempo de cada módulo se cuenta sin el de los módulos que importa a su vez (tiempo
+    propio), así la suma por paquete no cuenta dos veces las importaciones anidadas.
+    """
+
+    def __init__(self):
+        self.self_seconds: dict[str, float] = {}
+        self.modules: dict[str, int] = {}
+        # [inicio, tiempo de los hijos] por módulo en curso. Una pila por hilo: el
+        # calentamiento importa ADK desde un hilo (asyncio.to_thread).
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                self._wrap_loader(spec)
+                return spec
+        return None
+
+    def _wrap_loader(self, spec) -> None:
+        loader = spec.loader
+        # Los cargadores de módulos integrados y congelados son clases compartidas: no se tocan.
+        if loader is None or isinstance(loader, type) or not hasattr(loader, "exec_module"):
+            return
+        exec_module = loader.exec_module
+        package = _package_of(spec.name)
+
+        def timed_exec_module(module):
+            stack = self._local.__dict__.setdefault("stack", [])
+            stack.append([time.perf_counter(), 0.0])
+            try:
+                return exec_module(module)
+            finally:
+                started_at, children = stack.pop()
+                elapsed = time.perf_counter() - started_at
+                self.self_seconds[package] = self.self_seconds.get(package, 0.0) + elapsed - children
+                self.modules[package] = self.modules.get(package, 0) + 1
+                if stack:
+                    stack[-1][1] += elapsed
+
+        try:
+            loader.exec_module = timed_exec_module # Atributo de la instancia: sólo afecta a este módulo
+        except AttributeError:
+            pass
+
+
+_finder: Optional[_ImportTimingFinder] = None
+_ready_at: Optional[float] = None
+_warmup_seconds: Optional[float] = None
+
+
+def start_import_profiling() -> None:
+    """
+    Empieza a medir las importaciones. Debe llamarse al principio del __main__ del agente,
+    antes de importar FastAPI, ADK, etc.
+    """
+    global _finder
+    if AGENT_STARTUP_REPORT and _finder is None:
+        _finder = _ImportTimingFinder()
+        sys.meta_path.insert(0, _finder)
+
+
+def mark_ready(warmup_seconds: float) -> None:
+    """
+    Registra el fin del arranque (calentamiento incluido), deja de medir importaciones e
+    imprime el informe de arranque.
+    """
+    global _ready_at, _warmup_seconds
+    _ready_at = time.perf_counter()
+    _warmup_seconds = warmup_seconds
+    if _finder is not None and _finder in sys.meta_path:
+        sys.meta_path.remove(_finder) # Las importaciones posteriores ya no pasan por el buscador
+    if AGENT_STARTUP_REPORT:
+        logger.info("%s", format_startup_report())
+
+
+def startup_report() -> dict:
+    """
+    Informe de arranque: segundos hasta estar listo, duración del calentamiento y tiempo de
+    importación propio por paquete (de mayor a menor).
+    """
+    imports = {}
+    if _finder is not None:
+        ranked = sorted(_finder.self_seconds.items(), key=lambda item: item[1], reverse=True)
+        imports = {
+            package: {"ms": round(seconds * 1000, 1), "modules": _finder.modules[package]}
+            for package, seconds in ranked
+        }
+    return {
+        "ready": _ready_at is not None,
+        "seconds_to_ready": round(_ready_at - _process_started_at, 3) if _ready_at is not None else None,
+        "warmup_seconds": round(_warmup_seconds, 3) if _warmup_seconds is not None else None,
+        "import_ms_total": round(sum(item["ms"] for item in imports.values()), 1),
+        "imports": imports,
+    }
+
+
+def format_startup_report(top: int = AGENT_STARTUP_REPORT_TOP) -> str:
+    report = startup_report()
+    lines = [
+        f"Informe de arranque: listo en {report['seconds_to_ready']}s "
+        f"(calentamiento {report['warmup_seconds']}s, importaciones {report['import_ms_total']} ms)."
+    ]
+    for package, item in list(report["imports"].items())[:top]:
+        lines.append(f"  {package:<28} {item['ms']:>9.1f} ms  ({item['modules']} módulos)")
+    return "\n".join(lines)
+
+
+def _package_of(module_name: str) -> str:
+    parts = module_name.split(".")
+    if parts[0] in _NAMESPACE_PACKAGES and len(parts) > 1:
+        return ".".join(parts[:2])
+    return parts[0]
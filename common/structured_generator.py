@@ -0,0 +1,174 @@
+# common/structured_generator.py
+import json
+import time
+from typing import AsyncIterator, Callable, Optional, Sequence
+
+from google.genai import types # Usado para construir el mensaje al LLM
+from pydantic import BaseModel, ValidationError
+
+from common.incremental_json import IncrementalItemParser
+from common.lazy import Lazy
+from common.log import get_logger, log_payload
+from common.metrics import JSON_PARSE_FAILURES, LLM_CALL_SECONDS, LLM_ERRORS
+from common.prompts import (
+    OUTCOME_EMPTY, OUTCOME_ERROR, OUTCOME_JSON_INVALID, OUTCOME_OK, OUTCOME_SCHEMA_MISMATCH, PromptUsage,
+)
+from common.serialization import as_model, validate_json
+from common.session_manager import SessionManager
+from common.tracing import span
+
+logger = get_logger(__name__)
+
+# Resultado de una solicitud que no pasa la validación (no llega al modelo).
+INVALID_REQUEST = "invalid_request"
+
+# error_result(resultado, mensaje, texto de la respuesta del modelo) -> datos del evento "result".
+ErrorResult = Callable[[str, str, str], dict]
+
+
+class StructuredGenerator:
+    """
+    Llamada a un agente ADK con output_schema, compartida por los agentes: valida la
+    solicitud con su modelo (TravelRequest), construye el prompt, ejecuta el Runner en modo
+    streaming (SSE) dentro de una sesión efímera y emite cada elemento de las listas de la
+    respuesta en cuanto el modelo lo completa. Al final valida la respuesta con el esquema y registra métricas, spans y
+    el tamaño de la llamada (PromptUsage).
+
+    Eventos emitidos por generate():
+        {"type": "item", "item": {...}}  por cada elemento completado (con "list": <clave>
+                                          si la respuesta tiene varias listas);
+        {"type": "result", "data": {...}} al final, una sola vez: la respuesta validada
+                                          (model_dump) o el resultado de error.
+    """
+
+    def __init__(
+        self,
+        agent_name: str,
+        runner: Lazy,
+        session_manager: SessionManager,
+        user_id: str,
+        request_model: type[BaseModel],
+        response_model: type[BaseModel],
+        lists: Sequence[tuple[str, type[BaseModel]]],
+        build_user_prompt: Callable[[BaseModel], str],
+        profile: str,
+        system_instruction: str,
+        run_config,
+        error_result: Optional[ErrorResult] = None,
+    ):
+        """
+        Args:
+            agent_name (str): Nombre del agente en métricas, spans y registros.
+            runner (Lazy): El Runner del agente (ver common/lazy.py).
+            session_manager (SessionManager): Sesiones ADK por solicitud.
+            user_id (str): Usuario de las sesiones ADK.
+            request_model (type[BaseModel]): Modelo de la solicitud (ej. TravelRequest).
+            response_model (type[BaseModel]): El output_schema del agente.
+            lists (Sequence[tuple]): (clave, modelo del elemento) de cada lista de la
+                                     respuesta que se emite elemento a elemento.
+            build_user_prompt (Callable): Construye el mensaje del usuario a partir de la solicitud validada.
+            profile (str): Perfil de instrucciones ("full" o "compact", ver common/prompts.py).
+            system_instruction (str): Instrucción del sistema del agente (para PromptUsage).
+            run_config: RunConfig del Runner (SSE).
+            error_result (Optional[ErrorResult]): Datos del evento "result" cuando algo falla.
+                                                   Por defecto, listas vacías con la clave "error".
+        """
+        self.agent_name = agent_name
+        self.runner = runner
+        self.session_manager = session_manager
+        self.user_id = user_id
+        self.request_model = request_model
+        self.response_model = response_model
+        self.lists = tuple(lists)
+        self.build_user_prompt = build_user_prompt
+        self.profile = profile
+        self.system_instruction = system_instruction
+        self.run_config = run_config
+        self.error_result = error_result or self._default_error_result
+
+    def _default_error_result(self, outcome: str, message: str, response_text: str) -> dict:
+        data = {key: [] for key, _ in self.lists}
+        if outcome != OUTCOME_EMPTY: # Sin respuesta del modelo: listas vacías, como si no hubiera opciones
+            data["error"] = message
+        return data
+
+    async def generate(self, request: dict) -> AsyncIterator[dict]:
+        """
+        Ejecuta la llamada al modelo para una solicitud y emite sus eventos (ver la clase).
+        """
+        name = self.agent_name
+        try:
+            # Validar la solicitud (o reutilizar la validación de /run, ver common/serialization.py).
+            request_data = as_model(request, self.request_model)
+        except Exception as e: # pydantic.ValidationError
+            logger.warning("Error de validación de la solicitud para %s: %s", name, e)
+            yield {"type": "result", "data": self.error_result(INVALID_REQUEST, f"Solicitud inválida: {e}", "")}
+            return
+
+        user_prompt = self.build_user_prompt(request_data)
+        message_content = types.Content(parts=[types.Part(text=user_prompt)], role="user")
+        response_text = ""
+        # Un parser por lista: todos leen el mismo texto y cada uno extrae los elementos de su clave.
+        item_parsers = [(key, IncrementalItemParser(key, item_model=model)) for key, model in self.lists]
+        tag_list = len(item_parsers) > 1
+        usage = PromptUsage(name, self.profile, self.system_instruction, user_prompt) # Ver common/prompts.py
+        outcome = OUTCOME_ERROR
+
+        try:
+            llm_started_at = time.perf_counter()
+            # El span adk.session incluye crear y eliminar la sesión; llm.run_async, sólo la llamada al modelo.
+            with span("adk.session", agent=name):
+                async with self.session_manager.session() as session_id: # Sesión ADK exclusiva de esta solicitud.
+                    with span("llm.run_async", agent=name) as llm_span, usage.measuring():
+                        async for event in self.runner.get().run_async(
+                            user_id=self.user_id, session_id=session_id, new_message=message_content,
+                            run_config=self.run_config,
+                        ):
+                            if event.partial: # Fragmento de la respuesta: se emiten los elementos ya completos.
+                                if event.content and event.content.parts:
+                                    chunk = event.content.parts[0].text or ""
+                                    for key, parser in item_parsers:
+                                        for item in parser.feed(chunk):
+                                            yield {"type": "item", "list": key, "item": item} if tag_list \
+                                                else {"type": "item", "item": item}
+                                continue
+                            if event.is_final_response():
+                                if event.content and event.content.parts:
+                                    response_text = event.content.parts[0].text or ""
+                                break # Salir del bucle una vez obtenida la respuesta final.
+                        llm_span.set_attribute("llm.response_chars", len(response_text))
+                        llm_span.set_attribute("llm.streamed_items", sum(parser.items_emitted for _, parser in item_parsers))
+
+            LLM_CALL_SECONDS.labels(name).observe(time.perf_counter() - llm_started_at)
+            if not response_text:
+                logger.warning("%s no recibió respuesta de texto del modelo.", name)
+                LLM_ERRORS.labels(name, "empty_response").inc()
+                outcome = OUTCOME_EMPTY
+                yield {"type": "result", "data": self.error_result(OUTCOME_EMPTY, "No se recibió respuesta del modelo.", "")}
+                return
+
+            log_payload(logger, "Respuesta de texto crudo del LLM: %s", response_text)
+
+            # Parsear y validar la respuesta con el output_schema en una sola pasada.
+            with span("pydantic.validate_json", agent=name, model=self.response_model.__name__):
+                validated_response = validate_json(self.response_model, response_text)
+            outcome = OUTCOME_OK
+            yield {"type": "result", "data": validated_response.model_dump()}
+
+        except json.JSONDecodeError as e:
+            outcome = OUTCOME_JSON_INVALID
+            JSON_PARSE_FAILURES.labels(name).inc()
+            logger.error("FALLO AL PARSEAR JSON en %s: %s. Respuesta recibida:\n%s", name, e, response_text)
+            yield {"type": "result", "data": self.error_result(
+                OUTCOME_JSON_INVALID, f"Respuesta inválida del modelo (no es JSON válido): {response_text}", response_text
+            )}
+        except Exception as e: # Errores de validación Pydantic y otros errores inesperados.
+            outcome = OUTCOME_SCHEMA_MISMATCH if isinstance(e, ValidationError) else OUTCOME_ERROR
+            LLM_ERRORS.labels(name, type(e).__name__).inc()
+            logger.error("OCURRIÓ UN ERROR INESPERADO en %s: %s - %s. Respuesta recibida:\n%s",
+                         name, type(e).__name__, e, response_text)
+            yield {"type": "result", "data": self.error_result(
+                outcome, f"Error procesando la respuesta: {e}. Texto original: {response_text}", response_text
+            )}
+        finally:
+            usage.finish(response_text, outcome)
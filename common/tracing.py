@@ -0,0 +1,153 @@
+# common/tracing.py
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional, Sequence
+
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from common.log import get_logger
+
+logger = get_logger(__name__)
+
+# Archivo JSONL donde se exportan las trazas (una línea por span). Vacío = trazas desactivadas:
+# los spans siguen propagando el contexto entre agentes pero no se registran.
+A2A_TRACE_FILE = os.getenv("A2A_TRACE_FILE", "")
+
+# Tracer de los agentes. ADK crea sus propios spans (ej. llamadas al LLM) con el mismo
+# TracerProvider global, así que aparecen como hijos de los spans de execute.
+tracer = trace.get_tracer("a2a")
+
+_configured = False
+
+
+class JsonlSpanExporter(SpanExporter):
+    """
+    Exportador que escribe cada span como una línea JSON con los campos de OTLP
+    (traceId, spanId, parentSpanId, tiempos en nanosegundos, atributos y estado),
+    para analizar el camino crítico sin necesitar un colector.
+
+    Lo invoca el hilo de BatchSpanProcessor, así que la escritura no bloquea el bucle
+    de eventos. Varios agentes pueden compartir el mismo archivo: cada lote se escribe
+    con una sola llamada en modo append.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(json.dumps(_span_to_dict(span), ensure_ascii=False, default=str) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as trace_file:
+                trace_file.write(lines)
+        except OSError as e:
+            logger.warning("No se pudieron exportar %s spans a %s: %s", len(spans), self.path, e)
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _span_to_dict(span: ReadableSpan) -> dict:
+    parent = span.parent
+    return {
+        "traceId": format(span.context.trace_id, "032x"),
+        "spanId": format(span.context.span_id, "016x"),
+        "parentSpanId": format(parent.span_id, "016x") if parent else "",
+        "name": span.name,
+        "kind": span.kind.name,
+        "startTimeUnixNano": span.start_time,
+        "endTimeUnixNano": span.end_time,
+        "durationMs": round((span.end_time - span.start_time) / 1e6, 3) if span.end_time else None,
+        "service": span.resource.attributes.get("service.name", ""),
+        "attributes": dict(span.attributes or {}),
+        "status": {"code": span.status.status_code.name, "message": span.status.description or ""},
+        "events": [
+            {"name": event.name, "timeUnixNano": event.timestamp, "attributes": dict(event.attributes or {})}
+            for event in span.events
+        ],
+    }
+
+
+def configure_tracing(service_name: str, trace_file: str = A2A_TRACE_FILE) -> bool:
+    """
+    Instala el TracerProvider global que exporta los spans de este proceso a 'trace_file'.
+
+    Args:
+        service_name (str): Nombre del agente, publicado en cada span como "service".
+        trace_file (str): Ruta del archivo JSONL. Si está vacía, no se registra nada.
+
+    Returns:
+        bool: True si las trazas quedaron activadas.
+    """
+    global _configured
+    if _configured or not trace_file:
+        return _configured
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(JsonlSpanExporter(trace_file)))
+    trace.set_tracer_provider(provider)
+    _configured = True
+    logger.info("Trazas de %s activadas: se exportan a %s", service_name, trace_file)
+    return True
+
+
+def shutdown_tracing() -> None:
+    """
+    Exporta los spans pendientes antes de apagar el agente.
+    """
+    provider = trace.get_tracer_provider()
+    if _configured and isinstance(provider, TracerProvider):
+        provider.force_flush()
+
+
+@contextmanager
+def span(name: str, kind: SpanKind = SpanKind.INTERNAL, **attributes) -> Iterator[trace.Span]:
+    """
+    Context manager que abre un span hijo del span actual. Si el bloque lanza una
+    excepción, el span la registra y queda con estado ERROR.
+    """
+    with tracer.start_as_current_span(name, kind=kind, attributes=attributes) as current_span:
+        yield current_span
+
+
+@contextmanager
+def server_span(name: str, headers: dict, **attributes) -> Iterator[trace.Span]:
+    """
+    Abre el span de una solicitud entrante, continuando la traza del llamante si sus
+    cabeceras traen 'traceparent' (W3C Trace Context).
+    """
+    parent_context = propagate.extract(headers)
+    with tracer.start_as_current_span(
+        name, context=parent_context, kind=SpanKind.SERVER, attributes=attributes
+    ) as current_span:
+        yield current_span
+
+
+def trace_headers() -> dict:
+    """
+    Cabeceras (traceparent/tracestate) que propagan el span actual a un agente llamado.
+    """
+    carrier: dict = {}
+    propagate.inject(carrier)
+    return carrier
+
+
+def annotate(**attributes) -> None:
+    """
+    Añade atributos al span actual (ej. si la respuesta salió de la caché).
+    """
+    trace.get_current_span().set_attributes(attributes)
+
+
+def mark_error(current_span: trace.Span, message: Optional[str]) -> None:
+    """
+    Marca un span como fallido sin excepción (ej. el agente devolvió un error estructurado).
+    """
+    current_span.set_status(Status(StatusCode.ERROR, message or ""))
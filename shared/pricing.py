@@ -0,0 +1,239 @@
+# shared/pricing.py
+import re
+from functools import lru_cache
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+
+# Tabla de cambio offline: unidades de cada moneda por 1 USD (valores aproximados).
+# Basta para comparar opciones y sumar el coste de un viaje sin depender de un servicio
+# externo; actualízala junto con FX_RATES_DATE cuando cambien mucho los tipos.
+FX_RATES_DATE = "2025-05"
+USD_RATES = {
+    "USD": 1.0,
+    "EUR": 0.89,
+    "GBP": 0.75,
+    "CHF": 0.83,
+    "CAD": 1.39,
+    "AUD": 1.56,
+    "NZD": 1.69,
+    "JPY": 146.0,
+    "CNY": 7.21,
+    "KRW": 1390.0,
+    "INR": 85.3,
+    "THB": 33.0,
+    "SGD": 1.30,
+    "AED": 3.67,
+    "TRY": 38.7,
+    "ZAR": 18.0,
+    "MXN": 19.4,
+    "BRL": 5.65,
+    "ARS": 1140.0,
+    "CLP": 940.0,
+    "COP": 4200.0,
+    "PEN": 3.68,
+    "UYU": 41.8,
+    "DOP": 59.0,
+    "CRC": 508.0,
+    "GTQ": 7.68,
+}
+
+# Símbolos y nombres de moneda frecuentes en las respuestas del modelo. Los símbolos
+# compuestos van antes que "$" para que "R$ 120" no se lea como dólares.
+_CURRENCY_SYMBOLS = (
+    ("US$", "USD"), ("R$", "BRL"), ("MX$", "MXN"), ("C$", "CAD"), ("A$", "AUD"),
+    ("S/.", "PEN"), ("S/", "PEN"), ("€", "EUR"), ("£", "GBP"), ("₹", "INR"),
+    ("¥", "JPY"), ("₩", "KRW"), ("฿", "THB"), ("$", "USD"),
+)
+# "peso" sin país es ambiguo (México, Colombia, Argentina, Chile...): con importes tan
+# distintos, es mejor no convertirlo que suponer una moneda.
+_AMBIGUOUS = "?"
+_CURRENCY_WORDS = {
+    "dollar": "USD", "dollars": "USD", "dólar": "USD", "dólares": "USD", "dolares": "USD",
+    "euro": "EUR", "euros": "EUR",
+    "pound": "GBP", "pounds": "GBP", "libras": "GBP",
+    "rupee": "INR", "rupees": "INR", "rupias": "INR",
+    "yen": "JPY", "yenes": "JPY",
+    "peso mexicano": "MXN", "pesos mexicanos": "MXN",
+    "peso colombiano": "COP", "pesos colombianos": "COP",
+    "peso argentino": "ARS", "pesos argentinos": "ARS",
+    "peso chileno": "CLP", "pesos chilenos": "CLP",
+    "peso uruguayo": "UYU", "pesos uruguayos": "UYU",
+    "peso dominicano": "DOP", "pesos dominicanos": "DOP",
+    "peso": _AMBIGUOUS, "pesos": _AMBIGUOUS,
+    "soles": "PEN", "reais": "BRL", "reales": "BRL",
+}
+_FREE_WORDS = ("free", "gratis", "gratuito", "gratuita", "sin costo", "sin coste")
+
+_CODE_PATTERN = re.compile(r"\b(" + "|".join(USD_RATES) + r")\b") # En mayúsculas: "try" no es TRY
+# Los nombres más largos primero, para que "pesos colombianos" no se quede en "pesos".
+_WORD_PATTERN = re.compile(
+    r"\b(" + "|".join(word.replace(" ", r"\s+") for word in sorted(_CURRENCY_WORDS, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+# Un número con separadores de miles o decimales. Los espacios (normales, duros o finos)
+# sólo cuentan como separador de miles delante de grupos de tres cifras ("1 500 €").
+_NUMBER = r"\d{1,3}(?:[ \u00a0\u202f]\d{3})+(?:[.,]\d+)?(?!\d)|\d[\d.,\u00a0\u202f]*\d|\d"
+_AMOUNT_PATTERN = re.compile(
+    rf"({_NUMBER})(?:\s*(?:-|–|to|a|hasta)\s*(?:[$€£₹¥]\s*)?({_NUMBER}))?", re.IGNORECASE
+)
+
+
+class ParsedPrice(NamedTuple):
+    """
+    Resultado de parse_price. 'amount' es None si el texto no contiene un importe y
+    'currency' es None si no se reconoce la moneda. 'ambiguous' indica una moneda que no
+    se puede determinar ("pesos" sin país): to_usd no la convierte.
+    """
+    amount: Optional[float]
+    currency: Optional[str]
+    ambiguous: bool = False
+
+
+@lru_cache(maxsize=4096)
+def parse_price(text: Optional[str]) -> ParsedPrice:
+    """
+    Extrae el importe y la moneda (código ISO 4217) de un precio en texto libre.
+
+    Acepta separadores de miles y decimales en formato inglés o europeo, símbolos
+    ("$", "€", "R$"...), códigos ("USD", "INR") y nombres ("euros", "pesos chilenos"). Un
+    rango ("$20-30", "20 a 30 EUR") se resume en su punto medio y "Gratis"/"Free" vale 0.
+    "pesos" sin país es una moneda ambigua: se devuelve sin moneda y con ambiguous=True.
+    Los resultados se memorizan: el modelo repite muchas veces los mismos precios.
+
+    Ejemplos:
+        "$1,450 USD"          -> ParsedPrice(1450.0, "USD")
+        "INR 1800 per night"  -> ParsedPrice(1800.0, "INR")
+        "1.234,50 €"          -> ParsedPrice(1234.5, "EUR")
+        "Aprox. 20-30 euros"  -> ParsedPrice(25.0, "EUR")
+        "120.000 pesos"       -> ParsedPrice(120000.0, None, ambiguous=True)
+
+    Args:
+        text (Optional[str]): El precio tal como lo devolvió el modelo.
+
+    Returns:
+        ParsedPrice: El importe y la moneda reconocidos.
+    """
+    if not text:
+        return ParsedPrice(None, None)
+    currency, marker_at = _detect_currency(text)
+    ambiguous = currency == _AMBIGUOUS
+    if ambiguous:
+        currency = None
+    # Si hay varias cifras ("2 noches por $90"), el importe es la más cercana a la moneda.
+    matches = list(_AMOUNT_PATTERN.finditer(text))
+    match = min(matches, key=lambda m: _distance(m, marker_at), default=None)
+    if match is None:
+        if any(word in text.casefold() for word in _FREE_WORDS):
+            return ParsedPrice(0.0, currency, ambiguous)
+        return ParsedPrice(None, currency, ambiguous)
+    amount = _parse_number(match.group(1))
+    if match.group(2):
+        upper = _parse_number(match.group(2))
+        if amount is not None and upper is not None and upper >= amount:
+            amount = (amount + upper) / 2
+    return ParsedPrice(amount, currency, ambiguous)
+
+
+def to_usd(amount: Optional[float], currency: Optional[str], ambiguous: bool = False) -> Optional[float]:
+    """
+    Convierte un importe a USD con la tabla USD_RATES. Sin moneda se asume USD, que es
+    la moneda del presupuesto del TravelRequest, salvo que la moneda sea ambigua.
+
+    Returns:
+        Optional[float]: El importe en USD, o None si falta el importe, la moneda es ambigua
+                         o no está en la tabla.
+    """
+    if amount is None or ambiguous:
+        return None
+    rate = USD_RATES.get(currency or "USD")
+    if rate is None:
+        return None
+    return round(amount / rate, 2)
+
+
+def to_usd_array(amounts: Iterable[Optional[float]], currencies: Iterable[Optional[str]]) -> np.ndarray:
+    """
+    Versión vectorizada de to_usd para listas largas de opciones.
+
+    Args:
+        amounts (Iterable[Optional[float]]): Importes; None cuenta como desconocido.
+        currencies (Iterable[Optional[str]]): Monedas de cada importe; None se trata como USD.
+
+    Returns:
+        np.ndarray: Importes en USD (float64), con NaN donde el importe o la moneda son desconocidos.
+    """
+    amount_array = np.array([np.nan if amount is None else amount for amount in amounts], dtype=np.float64)
+    codes, inverse = np.unique(np.array([currency or "USD" for currency in currencies], dtype=object), return_inverse=True)
+    rates = np.array([USD_RATES.get(code, np.nan) for code in codes], dtype=np.float64)
+    if amount_array.shape != inverse.shape:
+        raise ValueError("amounts y currencies deben tener la misma longitud.")
+    return np.round(amount_array / rates[inverse], 2)
+
+
+def prices_to_usd(texts: Iterable[Optional[str]]) -> np.ndarray:
+    """
+    Analiza una lista de precios en texto y los convierte a USD en un solo paso.
+
+    Returns:
+        np.ndarray: Importes en USD, con NaN para los precios que no se pudieron interpretar
+                    o cuya moneda es ambigua.
+    """
+    parsed = [parse_price(text) for text in texts]
+    if not parsed:
+        return np.empty(0, dtype=np.float64)
+    return to_usd_array(
+        [None if price.ambiguous else price.amount for price in parsed], [price.currency for price in parsed]
+    )
+
+
+def _detect_currency(text: str) -> tuple[Optional[str], int]:
+    # Devuelve la moneda (o _AMBIGUOUS) y la posición donde aparece (0 si no se reconoce ninguna).
+    code = _CODE_PATTERN.search(text)
+    if code:
+        return code.group(1), code.start()
+    word = _WORD_PATTERN.search(text)
+    if word and "peso" in word.group(1).lower():
+        # En los países del peso, "$" también denota pesos: "$120.000 pesos" no son dólares.
+        return _currency_for_word(word.group(1)), word.start()
+    for symbol, currency in _CURRENCY_SYMBOLS:
+        position = text.find(symbol)
+        if position >= 0:
+            return currency, position
+    if word:
+        return _currency_for_word(word.group(1)), word.start()
+    return None, 0
+
+
+def _currency_for_word(word: str) -> str:
+    return _CURRENCY_WORDS[" ".join(word.lower().split())]
+
+
+def _distance(match: re.Match, position: int) -> int:
+    if match.start() <= position < match.end():
+        return 0
+    return min(abs(match.start() - position), abs(match.end() - position))
+
+
+def _parse_number(token: str) -> Optional[float]:
+    # "1,450" y "1.450" son miles; "12.50" y "12,5" son decimales; con ambos separadores,
+    # el último es el decimal ("1.234,50" o "1,234.50").
+    token = re.sub(r"[ \u00a0\u202f]", "", token).strip(".,")
+    if not token:
+        return None
+    last_dot, last_comma = token.rfind("."), token.rfind(",")
+    if last_dot >= 0 and last_comma >= 0:
+        decimal = "." if last_dot > last_comma else ","
+        thousands = "," if decimal == "." else "."
+        token = token.replace(thousands, "").replace(decimal, ".")
+    elif last_dot >= 0 or last_comma >= 0:
+        separator = "." if last_dot >= 0 else ","
+        parts = token.split(separator)
+        if len(parts) == 2 and len(parts[1]) != 3:
+            token = parts[0] + "." + parts[1] # Un único separador sin tres cifras detrás: decimal
+        else:
+            token = "".join(parts)
+    try:
+        return float(token)
+    except ValueError:
+        return None
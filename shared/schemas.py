@@ -1,6 +1,31 @@
 # shared/schemas.py
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, computed_field
+from typing import ClassVar, List, Literal, Optional
+from shared.pricing import parse_price, to_usd
+
+class PricedOption(BaseModel):
+    """
+    Base de las opciones con precio en texto libre. Añade el importe, la moneda y el
+    equivalente en USD como campos calculados: aparecen en model_dump() y en las
+    respuestas de los agentes, pero no en el esquema que se envía al LLM.
+    Las subclases indican en _price_field qué campo contiene el precio.
+    """
+    _price_field: ClassVar[str] = "price"
+
+    @computed_field(description="Importe numérico extraído del precio (None si no se pudo interpretar).")
+    @property
+    def price_amount(self) -> Optional[float]:
+        return parse_price(getattr(self, self._price_field)).amount
+
+    @computed_field(description="Código ISO 4217 de la moneda del precio (None si no se reconoce).")
+    @property
+    def price_currency(self) -> Optional[str]:
+        return parse_price(getattr(self, self._price_field)).currency
+
+    @computed_field(description="Precio convertido a USD con la tabla offline de shared/pricing.py.")
+    @property
+    def price_usd(self) -> Optional[float]:
+        return to_usd(*parse_price(getattr(self, self._price_field)))
 
 class TravelRequest(BaseModel):
     """
@@ -11,11 +36,30 @@ class TravelRequest(BaseModel):
     end_date: str
     budget: float
     origin: str = Field(description="El origen del vuelo.") # 'origin' es importante para vuelos
+    # Modo de planificación del host_agent: "fanout" (una llamada al LLM por subagente) o
+    # "single" (todo el plan en una sola llamada). None usa HOST_PLANNING_MODE.
+    planning_mode: Optional[Literal["fanout", "single"]] = Field(
+        default=None, description="Modo de planificación del host_agent ('fanout' o 'single')."
+    )
+
+class FlexibleDatesRequest(BaseModel):
+    """
+    Define la estructura para una búsqueda de fechas flexibles: todos los viajes de
+    'trip_nights' noches que caben entre 'window_start' y 'window_end'.
+    """
+    origin: str = Field(description="El origen del vuelo.")
+    destination: str
+    window_start: str = Field(description="Primer día posible del viaje (YYYY-MM-DD).")
+    window_end: str = Field(description="Último día posible del viaje, el de regreso (YYYY-MM-DD).")
+    trip_nights: int = Field(ge=1, description="Duración del viaje en noches.")
+    budget: float
+    concurrency: Optional[int] = Field(default=None, ge=1, description="Fechas consultadas a la vez.")
 
-class Activity(BaseModel):
+class Activity(PricedOption):
     """
     Define la estructura para una única actividad turística.
     """
+    _price_field: ClassVar[str] = "price_estimate"
     name: str = Field(description="El nombre de la actividad turística.")
     description: str = Field(description="Una breve descripción de la actividad.")
     price_estimate: str = Field(description="Estimación del precio de la actividad en la moneda local aproximada.")
@@ -28,7 +72,7 @@ class ActivitiesResponse(BaseModel):
     activities: List[Activity] = Field(description="Una lista de actividades turísticas sugeridas.")
 
 # --- INICIO: Nuevos modelos para la respuesta de vuelos ---
-class FlightOption(BaseModel):
+class FlightOption(PricedOption):
     """
     Define la estructura para una opción de vuelo.
     """
@@ -46,10 +90,11 @@ class FlightsResponse(BaseModel):
 # --- FIN: Nuevos modelos para la respuesta de vuelos ---
 
 # --- INICIO: Nuevos modelos para la respuesta de alojamiento ---
-class StayOption(BaseModel):
+class StayOption(PricedOption):
     """
     Define la estructura para una opción de alojamiento.
     """
+    _price_field: ClassVar[str] = "price_per_night" # price_amount y price_usd son por noche
     hotel_name: str = Field(description="Nombre del hotel o alojamiento.")
     price_per_night: str = Field(description="Precio estimado por noche, incluyendo moneda (ej. 'INR 1800 per night').")
     location: str = Field(description="Ubicación o área general del hotel.")
@@ -60,4 +105,14 @@ class StaysResponse(BaseModel):
     Define la estructura para la respuesta del agente de alojamiento.
     """
     stays: List[StayOption] = Field(description="Una lista de opciones de alojamiento sugeridas.") # El PDF usa "stays" para la clave en la UI, así que lo usaré aquí también.
-# --- FIN: Nuevos modelos para la respuesta de alojamiento ---
\ No newline at end of file
+# --- FIN: Nuevos modelos para la respuesta de alojamiento ---
+
+class TripPlanResponse(BaseModel):
+    """
+    Define la estructura del plan completo (vuelos, alojamiento y actividades) que el
+    host_agent obtiene en una sola llamada al LLM en el modo de planificación "single".
+    Reúne los campos de FlightsResponse, StaysResponse y ActivitiesResponse.
+    """
+    flights: List[FlightOption] = Field(description="Una lista de opciones de vuelo sugeridas.")
+    stays: List[StayOption] = Field(description="Una lista de opciones de alojamiento sugeridas.")
+    activities: List[Activity] = Field(description="Una lista de actividades turísticas sugeridas.")
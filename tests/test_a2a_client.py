@@ -0,0 +1,131 @@
+# tests/test_a2a_client.py
+import asyncio
+
+import httpx
+import pytest
+
+from common import a2a_client, resilience
+from common.deadline import reset_deadline, set_deadline
+from common.registry import AgentRegistry
+
+AGENT_URL = "http://agent-a:8001/run"
+
+
+class _Agent:
+    """
+    Transporte HTTP simulado: responde a cada llamada con la siguiente respuesta de la
+    lista (un código de estado, un par (código, cabeceras) o una excepción de httpx).
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.hosts = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.hosts.append(request.url.host)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        status_code, headers = response if isinstance(response, tuple) else (response, {})
+        content = b'{"flights": []}' if status_code == 200 else b'{"error": "fallo"}'
+        return httpx.Response(status_code, content=content, headers=headers)
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    """
+    Instala el agente simulado como cliente HTTP compartido, con circuit breakers y
+    registro vacíos y esperas registradas en lugar de dormir.
+    """
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args, **kwargs):
+        sleeps.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(a2a_client, "registry", AgentRegistry())
+    monkeypatch.setattr(a2a_client, "backoff_delay", lambda attempt: 0.0)
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+
+    def install(*responses) -> _Agent:
+        fake = _Agent(*responses)
+        monkeypatch.setattr(
+            a2a_client, "_shared_client", httpx.AsyncClient(transport=httpx.MockTransport(fake.handle))
+        )
+        fake.sleeps = sleeps
+        return fake
+
+    return install
+
+
+def _call(url: str = AGENT_URL, timeout_seconds: float = None) -> dict:
+    async def call():
+        token = set_deadline(timeout_seconds) if timeout_seconds is not None else None
+        try:
+            return await a2a_client.call_agent(url, {"destination": "Lima"})
+        finally:
+            if token is not None:
+                reset_deadline(token)
+    return asyncio.run(call())
+
+
+@pytest.mark.parametrize("failure", [
+    503, 502, 429, httpx.ConnectError("conexión rechazada"),
+])
+def test_retries_when_the_agent_did_not_process_the_request(agent, failure):
+    fake = agent(failure, 200)
+    assert _call() == {"flights": []}
+    assert len(fake.hosts) == 2
+
+
+@pytest.mark.parametrize("failure, timed_out", [
+    (500, False), (400, False), (504, True), (httpx.ReadTimeout("sin respuesta"), True),
+])
+def test_does_not_retry_when_the_agent_may_have_processed_it(agent, failure, timed_out):
+    fake = agent(failure, 200)
+    result = _call()
+    assert "error" in result
+    assert bool(result.get("timed_out")) == timed_out
+    assert len(fake.hosts) == 1
+
+
+def test_gives_up_after_the_configured_attempts(agent):
+    fake = agent(503)
+    assert "error" in _call()
+    assert len(fake.hosts) == a2a_client.A2A_RETRY_ATTEMPTS
+
+
+def test_honours_retry_after(agent):
+    fake = agent((429, {"Retry-After": "1.5"}), 200)
+    assert _call() == {"flights": []}
+    assert fake.sleeps == [1.5]
+
+
+def test_no_retry_when_retry_after_exceeds_the_deadline(agent):
+    fake = agent((429, {"Retry-After": "30"}), 200)
+    result = _call(timeout_seconds=5.0)
+    assert "error" in result
+    assert len(fake.hosts) == 1
+    assert fake.sleeps == []
+
+
+def test_retries_prefer_another_replica(agent):
+    a2a_client.registry.register("flight_agent", ["http://agent-a:8001", "http://agent-b:8001"])
+    for _ in range(10): # La primera réplica es aleatoria: la segunda debe ser siempre la otra.
+        resilience._breakers.clear()
+        fake = agent(503, 200)
+        assert _call() == {"flights": []}
+        assert len(fake.hosts) == 2
+        assert fake.hosts[0] != fake.hosts[1]
+
+
+def test_open_breaker_skips_the_call(agent):
+    fake = agent(500)
+    for _ in range(resilience.A2A_BREAKER_FAILURE_THRESHOLD):
+        _call()
+    calls = len(fake.hosts)
+    result = _call()
+    assert result.get("circuit_open") is True
+    assert len(fake.hosts) == calls
@@ -0,0 +1,74 @@
+# tests/test_a2a_server.py
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import Request # noqa: E402
+from fastapi.testclient import TestClient # noqa: E402
+
+from common.a2a_server import create_app # noqa: E402
+from common.concurrency import AdaptiveLimiter # noqa: E402
+
+
+class _RecordingLimiter(AdaptiveLimiter):
+    """
+    Limitador que registra el resultado (succeeded) de cada hueco liberado.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.outcomes = []
+
+    def release(self, latency: float, succeeded: bool = True) -> None:
+        self.outcomes.append(succeeded)
+        super().release(latency, succeeded)
+
+
+class _Executor:
+    def __init__(self, result: dict):
+        self.result = result
+
+    async def execute(self, payload: dict) -> dict:
+        return self.result
+
+
+@pytest.mark.parametrize("result, succeeded", [
+    ({"status": "ok"}, True),
+    ({"error": "Plazo agotado", "timed_out": True}, False),
+])
+def test_run_reports_timed_out_results_as_failures(result, succeeded):
+    limiter = _RecordingLimiter()
+    with TestClient(create_app(_Executor(result), concurrency_limiter=limiter)) as client:
+        response = client.post("/run", json={"destination": "Lima"})
+        assert response.status_code == 200
+        assert response.json() == result
+        client.post("/run/batch", json=[{"destination": "Lima"}]).read()
+    # /run y el elemento del lote aplican el mismo criterio.
+    assert limiter.outcomes == [succeeded, succeeded]
+
+
+def test_limited_routes_share_the_run_limiter():
+    async def sweep(body: dict, request: Request):
+        return {"dates": body["dates"], "timed_out": body.get("timed_out", False)}
+
+    limiter = _RecordingLimiter(initial_limit=1, min_limit=1, max_limit=1, max_queue=0)
+    app = create_app(_Executor({"status": "ok"}), concurrency_limiter=limiter, limited_routes={"/run/sweep": sweep})
+    with TestClient(app) as client:
+        assert client.post("/run/sweep", json={"dates": 3}).json() == {"dates": 3, "timed_out": False}
+        assert client.post("/run/sweep", json={"dates": 3, "timed_out": True}).status_code == 200
+        assert limiter.outcomes == [True, False]
+
+        # Con el único hueco ocupado, /run/sweep responde 429 como /run.
+        limiter._in_flight = 1
+        response = client.post("/run/sweep", json={"dates": 3})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == str(response.json()["retry_after"])
+        limiter._in_flight = 0
+
+
+def test_limited_routes_need_the_request():
+    async def sweep(body: dict):
+        return body
+
+    with pytest.raises(TypeError):
+        create_app(_Executor({}), limited_routes={"/run/sweep": sweep})
@@ -0,0 +1,68 @@
+# tests/test_host_task_manager.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from agents.host_agent import task_manager # noqa: E402
+from common.deadline import remaining, reset_deadline, set_deadline # noqa: E402
+
+TRIP = {"origin": "Madrid", "destination": "Lima", "start_date": "2025-06-01", "end_date": "2025-06-08", "budget": 2000}
+PLAN_SECONDS = 0.3
+
+
+@pytest.fixture
+def fake_fan_out(monkeypatch):
+    """
+    Sustituye la ronda de llamadas a los subagentes: tarda PLAN_SECONDS o, si el plazo de
+    la solicitud vence antes, devuelve los tres agentes con estado "timed_out".
+    """
+    calls = []
+
+    async def fan_out(payload: dict) -> dict:
+        calls.append(remaining())
+        budget = remaining()
+        if budget is not None and budget < PLAN_SECONDS:
+            await asyncio.sleep(budget)
+            status = task_manager.STATUS_TIMED_OUT
+        else:
+            await asyncio.sleep(PLAN_SECONDS)
+            status = task_manager.STATUS_OK
+        return {"status": {subagent.ui_key: status for subagent in task_manager.SUBAGENTS}}
+
+    monkeypatch.setattr(task_manager, "_fan_out", fan_out)
+    return calls
+
+
+async def _run_with_deadline(timeout_seconds: float, delay: float = 0.0) -> dict:
+    await asyncio.sleep(delay)
+    token = set_deadline(timeout_seconds)
+    try:
+        return await task_manager.run(dict(TRIP, planning_mode="fanout"))
+    finally:
+        reset_deadline(token)
+
+
+def _statuses(response: dict) -> set:
+    return set(response["status"].values())
+
+
+def test_follower_does_not_inherit_the_leader_timeout(fake_fan_out):
+    async def run():
+        # La primera solicitud tiene un plazo corto; la segunda, el mismo viaje con plazo largo.
+        return await asyncio.gather(_run_with_deadline(0.6), _run_with_deadline(30.0, delay=0.02))
+
+    short, long = asyncio.run(run())
+    assert _statuses(short) == {task_manager.STATUS_TIMED_OUT}
+    assert _statuses(long) == {task_manager.STATUS_OK}
+    assert len(fake_fan_out) == 2 # La segunda repite la planificación con su propio plazo
+
+
+def test_followers_share_a_successful_result(fake_fan_out):
+    async def run():
+        return await asyncio.gather(_run_with_deadline(30.0), _run_with_deadline(0.6, delay=0.02))
+
+    first, second = asyncio.run(run())
+    assert _statuses(first) == _statuses(second) == {task_manager.STATUS_OK}
+    assert len(fake_fan_out) == 1
@@ -0,0 +1,129 @@
+# tests/test_optimizer.py
+import itertools
+import math
+import random
+
+import pytest
+
+from agents.host_agent.optimizer import optimize_bundles
+
+
+def _options(prices: list, price_field: str) -> list:
+    # Opciones con price_usd ya calculado; None deja un precio sin interpretar (NaN).
+    return [
+        {"id": index, "price_usd": price, price_field: "Consultar" if price is None else f"${price} USD"}
+        for index, price in enumerate(prices)
+    ]
+
+
+def _random_prices(rng: random.Random, count: int, low: float, high: float, nan_rate: float) -> list:
+    return [None if rng.random() < nan_rate else round(rng.uniform(low, high), 2) for _ in range(count)]
+
+
+def _brute_force_scores(flights: list, stays: list, activities: list, budget: float, nights: int) -> list:
+    """
+    Puntuaciones de todos los paquetes que caben en el presupuesto, de mejor a peor,
+    enumerando vuelo × alojamiento × subconjunto de actividades.
+    """
+    priced_activities = [activity for activity in activities if activity["price_usd"] is not None]
+    subsets = [
+        subset
+        for size in range(len(priced_activities) + 1)
+        for subset in itertools.combinations(priced_activities, size)
+    ]
+    scores = []
+    for flight, stay, subset in itertools.product(flights, stays, subsets):
+        if flight["price_usd"] is None or stay["price_usd"] is None:
+            continue
+        total = flight["price_usd"] + stay["price_usd"] * nights + sum(activity["price_usd"] for activity in subset)
+        if total <= budget:
+            scores.append(len(subset) - total / budget)
+    return sorted(scores, reverse=True)
+
+
+def _check_bundle(bundle: dict, budget: float, nights: int) -> None:
+    # Cada paquete es coherente: su total es la suma de sus partes y cabe en el presupuesto.
+    flight_cost = bundle["flight"]["price_usd"]
+    stay_cost = bundle["stay"]["price_usd"] * nights
+    activities_cost = sum(activity["price_usd"] for activity in bundle["activities"])
+    total = flight_cost + stay_cost + activities_cost
+    assert bundle["total_usd"] == pytest.approx(total, abs=0.01)
+    assert bundle["total_usd"] <= budget + 0.01
+    assert bundle["remaining_budget_usd"] == pytest.approx(budget - total, abs=0.01)
+    assert bundle["score"] == pytest.approx(len(bundle["activities"]) - total / budget, abs=1e-4)
+    assert len({activity["id"] for activity in bundle["activities"]}) == len(bundle["activities"])
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_brute_force_on_random_inputs(seed):
+    rng = random.Random(seed)
+    nights = rng.randint(1, 7)
+    flights = _options(_random_prices(rng, rng.randint(1, 12), 100, 1500, nan_rate=0.15), "price")
+    stays = _options(_random_prices(rng, rng.randint(1, 12), 30, 300, nan_rate=0.15), "price_per_night")
+    activities = _options(_random_prices(rng, rng.randint(0, 7), 0, 150, nan_rate=0.2), "price_estimate")
+    budget = rng.uniform(300, 4000)
+    top_k = rng.randint(1, 8)
+
+    bundles = optimize_bundles(flights, stays, activities, budget, nights, top_k=top_k, max_activities=12)
+    expected = _brute_force_scores(flights, stays, activities, budget, nights)[:top_k]
+
+    assert [bundle["score"] for bundle in bundles] == pytest.approx(expected, abs=1e-4)
+    for bundle in bundles:
+        _check_bundle(bundle, budget, nights)
+
+
+def test_nan_prices_are_skipped():
+    flights = _options([None, 500.0, None], "price")
+    stays = _options([None, 100.0], "price_per_night")
+    activities = _options([None, 20.0], "price_estimate")
+    bundles = optimize_bundles(flights, stays, activities, budget=2000, nights=3, top_k=5)
+    assert bundles
+    for bundle in bundles:
+        assert bundle["flight"]["id"] == 1
+        assert bundle["stay"]["id"] == 1
+        assert all(activity["id"] == 1 for activity in bundle["activities"])
+    assert [bundle["score"] for bundle in bundles] == pytest.approx(
+        _brute_force_scores(flights, stays, activities, 2000, 3)[:5], abs=1e-4
+    )
+
+
+def test_all_prices_unknown_returns_nothing():
+    assert optimize_bundles(_options([None], "price"), _options([80.0], "price_per_night"), [], 5000, 2) == []
+
+
+def test_empty_activities_gives_flight_and_stay_bundles():
+    flights = _options([400.0, 300.0], "price")
+    stays = _options([50.0, 90.0], "price_per_night")
+    bundles = optimize_bundles(flights, stays, [], budget=1000, nights=4, top_k=10)
+    assert [bundle["activities"] for bundle in bundles] == [[]] * len(bundles)
+    assert [bundle["score"] for bundle in bundles] == pytest.approx(
+        _brute_force_scores(flights, stays, [], 1000, 4), abs=1e-4
+    )
+    assert bundles[0]["flight"]["id"] == 1 and bundles[0]["stay"]["id"] == 0
+
+
+@pytest.mark.parametrize("flights, stays", [([], [80.0]), ([300.0], [])])
+def test_empty_flights_or_stays_returns_nothing(flights, stays):
+    bundles = optimize_bundles(
+        _options(flights, "price"), _options(stays, "price_per_night"), _options([10.0], "price_estimate"), 5000, 2
+    )
+    assert bundles == []
+
+
+def test_nothing_fits_the_budget():
+    flights = _options([900.0, 1200.0], "price")
+    stays = _options([150.0], "price_per_night")
+    activities = _options([10.0, 25.0], "price_estimate")
+    assert optimize_bundles(flights, stays, activities, budget=1000, nights=2) == []
+    assert optimize_bundles(flights, stays, activities, budget=0, nights=2) == []
+
+
+def test_prefers_more_activities_then_lower_cost():
+    flights = _options([300.0], "price")
+    stays = _options([100.0], "price_per_night")
+    activities = _options([50.0, 10.0, 200.0], "price_estimate")
+    bundles = optimize_bundles(flights, stays, activities, budget=700, nights=2, top_k=3)
+    # Caben vuelo + alojamiento (500) con {10, 50} (560): dos actividades es lo mejor.
+    assert sorted(activity["id"] for activity in bundles[0]["activities"]) == [0, 1]
+    assert bundles[0]["total_usd"] == 560.0
+    assert not math.isinf(bundles[-1]["score"])
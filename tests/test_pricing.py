@@ -0,0 +1,109 @@
+# tests/test_pricing.py
+import math
+
+import numpy as np
+import pytest
+
+from shared.pricing import ParsedPrice, parse_price, prices_to_usd, to_usd, to_usd_array
+
+
+@pytest.mark.parametrize("text, amount, currency", [
+    # Símbolos
+    ("$1,450", 1450.0, "USD"),
+    ("R$ 120", 120.0, "BRL"),
+    ("S/. 45", 45.0, "PEN"),
+    ("S/ 45", 45.0, "PEN"),
+    ("€30", 30.0, "EUR"),
+    ("US$ 99.90", 99.9, "USD"),
+    # Códigos ISO 4217
+    ("INR 1800 per night", 1800.0, "INR"),
+    ("$1,450 USD", 1450.0, "USD"),
+    ("COP 120.000", 120000.0, "COP"),
+    ("Approx 150 USD per night", 150.0, "USD"),
+    # Nombres de moneda
+    ("45 euros", 45.0, "EUR"),
+    ("3000 rupias", 3000.0, "INR"),
+    ("150.000 pesos colombianos", 150000.0, "COP"),
+    ("25.000 Pesos Chilenos", 25000.0, "CLP"),
+])
+def test_parse_price_currency_markers(text, amount, currency):
+    assert parse_price(text) == ParsedPrice(amount, currency)
+
+
+@pytest.mark.parametrize("text, amount", [
+    ("1,450 USD", 1450.0), # Miles en formato inglés
+    ("1,234.50 USD", 1234.5),
+    ("1.234,50 €", 1234.5), # Formato europeo
+    ("12,5 €", 12.5),
+    ("12.50 USD", 12.5),
+    ("1 500 €", 1500.0), # Espacio como separador de miles
+    ("1\u00a0500 €", 1500.0), # Espacio duro
+    ("1\u202f234,50 €", 1234.5), # Espacio fino
+    ("2 noches por $90", 90.0), # La cifra más cercana a la moneda
+])
+def test_parse_price_separators(text, amount):
+    assert parse_price(text).amount == amount
+
+
+@pytest.mark.parametrize("text, amount, currency", [
+    ("$25 - $40", 32.5, "USD"),
+    ("20 a 30 euros", 25.0, "EUR"),
+    ("Aprox. 20-30 EUR", 25.0, "EUR"),
+    ("1 500 - 2 000 €", 1750.0, "EUR"),
+])
+def test_parse_price_ranges_use_midpoint(text, amount, currency):
+    assert parse_price(text) == ParsedPrice(amount, currency)
+
+
+@pytest.mark.parametrize("text", ["Gratis", "Free", "Entrada gratuita", "Sin costo"])
+def test_parse_price_free(text):
+    assert parse_price(text).amount == 0.0
+    assert to_usd(*parse_price(text)) == 0.0
+
+
+@pytest.mark.parametrize("text", ["Consultar en taquilla", "", None])
+def test_parse_price_without_amount(text):
+    assert parse_price(text).amount is None
+    assert to_usd(*parse_price(text)) is None
+
+
+@pytest.mark.parametrize("text", ["120.000 pesos", "$120.000 pesos", "Aprox. 5000 pesos por persona"])
+def test_bare_pesos_are_ambiguous(text):
+    parsed = parse_price(text)
+    assert parsed.currency is None
+    assert parsed.ambiguous
+    assert to_usd(*parsed) is None # Ni MXN ni USD por defecto
+
+
+def test_to_usd_assumes_usd_without_currency():
+    assert to_usd(100.0, None) == 100.0
+    assert to_usd(100.0, "XYZ") is None
+
+
+def test_to_usd_array_nan_for_unknown_amount_or_currency():
+    result = to_usd_array([100.0, None, 50.0, 10.0], ["EUR", "USD", "XYZ", None])
+    assert result[0] == pytest.approx(to_usd(100.0, "EUR"))
+    assert math.isnan(result[1])
+    assert math.isnan(result[2])
+    assert result[3] == 10.0
+
+
+def test_to_usd_array_rejects_mismatched_lengths():
+    with pytest.raises(ValueError):
+        to_usd_array([1.0, 2.0], ["USD"])
+
+
+def test_prices_to_usd_matches_scalar_conversion():
+    texts = ["$1,450 USD", "INR 1800 per night", "1.234,50 €", "Consultar", "120.000 pesos", "Gratis", None]
+    expected = [to_usd(*parse_price(text)) for text in texts]
+    result = prices_to_usd(texts)
+    assert result.dtype == np.float64
+    for value, scalar in zip(result, expected):
+        if scalar is None:
+            assert math.isnan(value)
+        else:
+            assert value == pytest.approx(scalar)
+
+
+def test_prices_to_usd_empty():
+    assert prices_to_usd([]).shape == (0,)
@@ -0,0 +1,78 @@
+# tests/test_resilience.py
+import time
+
+from common.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, backoff_delay
+
+RESET_SECONDS = 0.05
+
+
+def _open_breaker(**kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker("http://agent:8001", failure_threshold=2, reset_seconds=RESET_SECONDS, **kwargs)
+    for _ in range(2):
+        assert breaker.allow_request() == (True, False)
+        breaker.record(False)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_opens_after_consecutive_failures_and_rejects():
+    breaker = CircuitBreaker("http://agent:8001", failure_threshold=3, reset_seconds=60)
+    for succeeded in (False, False, True, False, False):
+        breaker.allow_request()
+        breaker.record(succeeded)
+    assert breaker.state == CLOSED # El éxito reinicia la cuenta de fallos consecutivos
+    breaker.allow_request()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.allow_request() == (False, False)
+    assert breaker.stats()["rejected"] == 1
+    assert breaker.stats()["times_opened"] == 1
+
+
+def test_half_open_admits_probes_and_closes_on_success():
+    breaker = _open_breaker(half_open_probes=1)
+    time.sleep(RESET_SECONDS)
+    assert breaker.allow_request() == (True, True)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request() == (False, False) # Sólo una prueba a la vez
+    breaker.record(True, probe=True)
+    assert breaker.state == CLOSED
+    assert breaker.allow_request() == (True, False)
+
+
+def test_failed_probe_reopens():
+    breaker = _open_breaker(half_open_probes=1)
+    time.sleep(RESET_SECONDS)
+    assert breaker.allow_request() == (True, True)
+    breaker.record(False, probe=True)
+    assert breaker.state == OPEN
+    assert breaker.allow_request() == (False, False)
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_late_closed_era_calls_do_not_affect_probes():
+    breaker = CircuitBreaker("http://agent:8001", failure_threshold=2, reset_seconds=RESET_SECONDS, half_open_probes=1)
+    stragglers = [breaker.allow_request() for _ in range(3)] # Admitidas con el circuito cerrado
+    assert stragglers == [(True, False)] * 3
+    for _ in range(2):
+        breaker.allow_request()
+        breaker.record(False)
+    assert breaker.state == OPEN
+
+    time.sleep(RESET_SECONDS)
+    assert breaker.allow_request() == (True, True)
+    breaker.record(None) # Una llamada antigua cancelada no libera el hueco de la prueba...
+    assert breaker.allow_request() == (False, False)
+    breaker.record(True) # ...ni su éxito cierra el circuito...
+    assert breaker.state == HALF_OPEN
+    breaker.record(False) # ...ni su fallo lo vuelve a abrir.
+    assert breaker.state == HALF_OPEN
+
+    breaker.record(True, probe=True)
+    assert breaker.state == CLOSED
+
+
+def test_backoff_delay_is_bounded():
+    for attempt in range(6):
+        delay = backoff_delay(attempt, base_delay=0.1, max_delay=0.5)
+        assert 0.0 <= delay <= min(0.5, 0.1 * 2 ** attempt)
@@ -0,0 +1,50 @@
+# tests/test_response_cache.py
+import asyncio
+
+from common.response_cache import ResponseCache, canonical_request_key
+
+REQUEST = {"destination": "Lima", "start_date": "2025-06-01", "budget": 1500}
+KEY_FIELDS = ("destination", "start_date", "budget")
+
+
+def test_coalesced_callers_get_independent_copies():
+    cache = ResponseCache("test", sqlite_path=None)
+    calls = 0
+
+    @cache.cached(key_fields=KEY_FIELDS)
+    async def execute(request: dict) -> dict:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01) # Las demás solicitudes llegan mientras se ejecuta la primera.
+        return {"flights": [{"airline": "LATAM"}]}
+
+    async def run():
+        return await asyncio.gather(*(execute(dict(REQUEST)) for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert calls == 1
+    assert cache.stats()["coalesced"] == 2
+    assert len({id(result) for result in results}) == 3
+    assert len({id(result["flights"][0]) for result in results}) == 3
+
+    # Modificar una respuesta no afecta a las demás ni a la entrada guardada.
+    results[0]["flights"][0]["airline"] = "Iberia"
+    results[1]["flights"].clear()
+    assert results[2] == {"flights": [{"airline": "LATAM"}]}
+    assert asyncio.run(cache.get(canonical_request_key(REQUEST, KEY_FIELDS))) == {"flights": [{"airline": "LATAM"}]}
+
+
+def test_uncacheable_results_are_not_stored():
+    cache = ResponseCache("test", sqlite_path=None)
+    calls = 0
+
+    @cache.cached(key_fields=KEY_FIELDS)
+    async def execute(request: dict) -> dict:
+        nonlocal calls
+        calls += 1
+        return {"flights": [], "error": "Respuesta inválida del modelo"}
+
+    for _ in range(2):
+        assert asyncio.run(execute(dict(REQUEST)))["error"]
+    assert calls == 2
+    assert cache.stats()["stores"] == 0
@@ -0,0 +1,54 @@
+# tests/test_session_manager.py
+import asyncio
+
+import pytest
+
+from common.session_manager import SessionManager
+
+
+class _StubSessionService:
+    def __init__(self):
+        self.sessions = set()
+
+    def create_session(self, app_name: str, user_id: str, session_id: str) -> None:
+        self.sessions.add(session_id)
+
+    def delete_session(self, app_name: str, user_id: str, session_id: str) -> None:
+        self.sessions.remove(session_id)
+
+
+def test_each_request_gets_its_own_session():
+    service = _StubSessionService()
+    manager = SessionManager(service, app_name="test_app", user_id="user")
+
+    async def request(seen: list):
+        async with manager.session() as session_id:
+            seen.append(session_id)
+            assert session_id in service.sessions
+            await asyncio.sleep(0.01)
+
+    async def run():
+        seen = []
+        await asyncio.gather(*(request(seen) for _ in range(3)))
+        return seen
+
+    seen = asyncio.run(run())
+    assert len(set(seen)) == 3
+    assert all(session_id.startswith("test_app-") for session_id in seen)
+    assert service.sessions == set() # Las sesiones se eliminan al terminar
+    assert manager.stats() == {"active_sessions": 0, "created": 3}
+
+
+def test_session_is_deleted_when_the_request_fails():
+    service = _StubSessionService()
+    manager = SessionManager(service, app_name="test_app", user_id="user")
+
+    async def failing_request():
+        async with manager.session():
+            assert manager.stats()["active_sessions"] == 1
+            raise RuntimeError("cuota agotada")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(failing_request())
+    assert service.sessions == set()
+    assert manager.stats()["active_sessions"] == 0
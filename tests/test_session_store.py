@@ -0,0 +1,163 @@
+# tests/test_session_store.py
+import sqlite3
+import time
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.events import Event, EventActions # noqa: E402
+from google.genai import types # noqa: E402
+
+from common.session_store import SqliteSessionService # noqa: E402
+
+APP, USER = "test_app", "user"
+
+
+def _service(tmp_path, **kwargs) -> SqliteSessionService:
+    # Sin escrituras en segundo plano salvo las que pida cada prueba con flush().
+    options = {"flush_interval_seconds": 3600, "write_delay_seconds": 0, "compaction_interval_seconds": 0}
+    options.update(kwargs)
+    return SqliteSessionService(path=str(tmp_path / "sessions.db"), **options)
+
+
+def _event(text: str, state_delta: dict = None) -> Event:
+    return Event(
+        author="user",
+        content=types.Content(parts=[types.Part(text=text)], role="user"),
+        actions=EventActions(state_delta=state_delta or {}),
+    )
+
+
+def _append(service: SqliteSessionService, session_id: str, *texts: str) -> None:
+    session = service.get_session(app_name=APP, user_id=USER, session_id=session_id)
+    for text in texts:
+        service.append_event(session, _event(text))
+
+
+def _texts(session) -> list:
+    return [event.content.parts[0].text for event in session.events]
+
+
+def _count_rows(tmp_path, table: str) -> int:
+    with sqlite3.connect(tmp_path / "sessions.db") as db:
+        return db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_sessions_survive_a_restart(tmp_path):
+    service = _service(tmp_path)
+    service.create_session(app_name=APP, user_id=USER, session_id="s1", state={"step": 1})
+    _append(service, "s1", "hola", "adiós")
+    service.close()
+
+    reopened = _service(tmp_path)
+    session = reopened.get_session(app_name=APP, user_id=USER, session_id="s1")
+    assert _texts(session) == ["hola", "adiós"]
+    assert session.state["step"] == 1
+    assert reopened.stats()["cache_misses"] == 1
+    reopened.close()
+
+
+def test_delete_before_flush_writes_nothing(tmp_path):
+    service = _service(tmp_path)
+    service.create_session(app_name=APP, user_id=USER, session_id="s1")
+    _append(service, "s1", "hola")
+    service.delete_session(app_name=APP, user_id=USER, session_id="s1")
+    service.close()
+    assert _count_rows(tmp_path, "sessions") == 0
+    assert _count_rows(tmp_path, "session_events") == 0
+    assert service.stats()["sessions_never_written"] == 1
+
+
+def test_delete_after_flush_removes_the_rows(tmp_path):
+    service = _service(tmp_path)
+    service.create_session(app_name=APP, user_id=USER, session_id="s1")
+    _append(service, "s1", "hola")
+    service.flush()
+    assert _count_rows(tmp_path, "session_events") == 1
+    service.delete_session(app_name=APP, user_id=USER, session_id="s1")
+    service.flush()
+    assert _count_rows(tmp_path, "sessions") == 0
+    assert _count_rows(tmp_path, "session_events") == 0
+    assert service.get_session(app_name=APP, user_id=USER, session_id="s1") is None
+    service.close()
+
+
+def test_new_sessions_wait_for_the_write_delay(tmp_path):
+    service = _service(tmp_path, write_delay_seconds=0.2)
+    service.create_session(app_name=APP, user_id=USER, session_id="ephemeral")
+    _append(service, "ephemeral", "hola")
+    service.flush()
+    assert _count_rows(tmp_path, "sessions") == 0 # Sigue sólo en memoria
+    assert service.stats()["unwritten_sessions"] == 1
+    service.delete_session(app_name=APP, user_id=USER, session_id="ephemeral")
+
+    service.create_session(app_name=APP, user_id=USER, session_id="long_lived")
+    _append(service, "long_lived", "hola")
+    time.sleep(0.25)
+    service.flush()
+    assert _count_rows(tmp_path, "sessions") == 1
+    assert _count_rows(tmp_path, "session_events") == 1
+    stats = service.stats()
+    assert stats["sessions_never_written"] == 1
+    assert stats["events_written"] == 1
+    assert stats["unwritten_sessions"] == 0
+    service.close()
+
+
+def test_cache_miss_reloads_from_sqlite(tmp_path):
+    service = _service(tmp_path, cache_size=1)
+    for session_id in ("s1", "s2"):
+        service.create_session(app_name=APP, user_id=USER, session_id=session_id)
+        _append(service, session_id, f"mensaje de {session_id}")
+    service.flush()
+
+    # "s1" salió de la caché (cache_size=1) al crear "s2": se lee de SQLite.
+    misses = service.stats()["cache_misses"]
+    session = service.get_session(app_name=APP, user_id=USER, session_id="s1")
+    assert _texts(session) == ["mensaje de s1"]
+    assert service.stats()["cache_misses"] == misses + 1
+    service.close()
+
+
+def test_app_and_user_state_survive_a_restart(tmp_path):
+    service = _service(tmp_path)
+    session = service.create_session(app_name=APP, user_id=USER, session_id="s1")
+    service.append_event(session, _event("hola", {"app:currency": "EUR", "user:name": "Ana", "step": 2}))
+    service.delete_session(app_name=APP, user_id=USER, session_id="s1")
+    service.close()
+
+    reopened = _service(tmp_path)
+    session = reopened.create_session(app_name=APP, user_id=USER, session_id="s2")
+    assert session.state["app:currency"] == "EUR"
+    assert session.state["user:name"] == "Ana"
+    assert "step" not in session.state # El estado propio de la sesión no se comparte
+    other_user = reopened.create_session(app_name=APP, user_id="other", session_id="s3")
+    assert "user:name" not in other_user.state
+    reopened.close()
+
+
+def test_compact_trims_events_and_expires_idle_sessions(tmp_path):
+    service = _service(tmp_path, max_events=0, retention_seconds=3600)
+    service.create_session(app_name=APP, user_id=USER, session_id="active")
+    _append(service, "active", *(f"evento {index}" for index in range(5)))
+    service.create_session(app_name=APP, user_id=USER, session_id="idle")
+    _append(service, "idle", "hola")
+    service.flush()
+    with sqlite3.connect(tmp_path / "sessions.db") as db:
+        db.execute("UPDATE sessions SET last_update_time = ? WHERE session_id = 'idle'", (time.time() - 7200,))
+
+    service.max_events = 3
+    service.compact()
+    stats = service.stats()
+    assert stats["sessions_expired"] == 1
+    assert stats["events_trimmed"] == 2
+    service.close()
+
+    reopened = _service(tmp_path)
+    assert _texts(reopened.get_session(app_name=APP, user_id=USER, session_id="active")) == [
+        "evento 2", "evento 3", "evento 4",
+    ]
+    assert reopened.get_session(app_name=APP, user_id=USER, session_id="idle") is None
+    assert _count_rows(tmp_path, "session_events") == 3
+    reopened.close()
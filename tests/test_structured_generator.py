@@ -0,0 +1,152 @@
+# tests/test_structured_generator.py
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+pytest.importorskip("google.genai")
+
+from common.prompts import OUTCOME_EMPTY # noqa: E402
+from common.structured_generator import INVALID_REQUEST, StructuredGenerator # noqa: E402
+
+
+class Request(BaseModel):
+    destination: str
+
+
+class Flight(BaseModel):
+    airline: str
+
+
+class Stay(BaseModel):
+    hotel_name: str
+
+
+class FlightsResponse(BaseModel):
+    flights: List[Flight]
+
+
+class PlanResponse(BaseModel):
+    flights: List[Flight]
+    stays: List[Stay]
+
+
+def _event(text: str, partial: bool) -> SimpleNamespace:
+    return SimpleNamespace(
+        partial=partial,
+        content=SimpleNamespace(parts=[SimpleNamespace(text=text)]),
+        is_final_response=lambda: not partial,
+    )
+
+
+class _StubRunner:
+    """
+    Sustituye al Runner de ADK: emite la respuesta en fragmentos parciales y al final la
+    respuesta completa, como con StreamingMode.SSE.
+    """
+
+    def __init__(self, response_text: str, chunk_size: int = 7, error: Exception = None):
+        self.response_text = response_text
+        self.chunk_size = chunk_size
+        self.error = error
+        self.calls = 0
+
+    def get(self) -> "_StubRunner":
+        return self
+
+    async def run_async(self, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        for start in range(0, len(self.response_text), self.chunk_size):
+            yield _event(self.response_text[start:start + self.chunk_size], partial=True)
+        yield _event(self.response_text, partial=False)
+
+
+class _StubSessions:
+    @asynccontextmanager
+    async def session(self):
+        yield "session-1"
+
+
+def _generator(runner, response_model=FlightsResponse, lists=(("flights", Flight),), **kwargs) -> StructuredGenerator:
+    return StructuredGenerator(
+        "test_agent", runner, _StubSessions(), "user",
+        request_model=Request,
+        response_model=response_model,
+        lists=lists,
+        build_user_prompt=lambda request: f"Viaje a {request.destination}",
+        profile="compact",
+        system_instruction="Sugiere vuelos.",
+        run_config=None,
+        **kwargs,
+    )
+
+
+def _collect(generator: StructuredGenerator, request: dict) -> list:
+    async def collect():
+        return [event async for event in generator.generate(request)]
+    return asyncio.run(collect())
+
+
+def test_streams_items_then_validated_result():
+    response = {"flights": [{"airline": "Iberia"}, {"airline": "LATAM"}]}
+    events = _collect(_generator(_StubRunner(json.dumps(response))), {"destination": "Lima"})
+    assert events[:-1] == [{"type": "item", "item": flight} for flight in response["flights"]]
+    assert events[-1] == {"type": "result", "data": response}
+
+
+def test_multiple_lists_tag_each_item():
+    response = {"flights": [{"airline": "Iberia"}], "stays": [{"hotel_name": "Hotel Lima"}]}
+    generator = _generator(
+        _StubRunner(json.dumps(response)), response_model=PlanResponse, lists=(("flights", Flight), ("stays", Stay))
+    )
+    events = _collect(generator, {"destination": "Lima"})
+    assert events[:-1] == [
+        {"type": "item", "list": "flights", "item": {"airline": "Iberia"}},
+        {"type": "item", "list": "stays", "item": {"hotel_name": "Hotel Lima"}},
+    ]
+    assert events[-1] == {"type": "result", "data": response}
+
+
+def test_invalid_request_does_not_call_the_model():
+    runner = _StubRunner("{}")
+    events = _collect(_generator(runner), {"origin": "Madrid"})
+    assert runner.calls == 0
+    assert len(events) == 1
+    assert events[0]["data"]["flights"] == []
+    assert events[0]["data"]["error"].startswith("Solicitud inválida")
+
+
+@pytest.mark.parametrize("response_text, has_error", [
+    ("", False), # Sin respuesta: lista vacía, sin error
+    ('{"flights": [{"airline": "Iberia"}', True), # JSON truncado
+    ('{"flights": [{"price": 10}]}', True), # No cumple el esquema
+])
+def test_failures_return_empty_lists(response_text, has_error):
+    events = _collect(_generator(_StubRunner(response_text)), {"destination": "Lima"})
+    data = events[-1]["data"]
+    assert data["flights"] == []
+    assert ("error" in data) == has_error
+
+
+def test_model_errors_are_reported():
+    events = _collect(_generator(_StubRunner("", error=RuntimeError("cuota agotada"))), {"destination": "Lima"})
+    assert "cuota agotada" in events[-1]["data"]["error"]
+
+
+def test_custom_error_result():
+    outcomes = []
+
+    def error_result(outcome, message, response_text):
+        outcomes.append(outcome)
+        return {"flights": f"{outcome}: {response_text}"}
+
+    generator = _generator(_StubRunner(""), error_result=error_result)
+    assert _collect(generator, {"destination": "Lima"})[-1]["data"] == {"flights": f"{OUTCOME_EMPTY}: "}
+    assert _collect(generator, {})[-1]["data"] == {"flights": f"{INVALID_REQUEST}: "}
+    assert outcomes == [OUTCOME_EMPTY, INVALID_REQUEST]
@@ -11,6 +11,83 @@ st.set_page_config(page_title="Planificador de Viajes ADK", page_icon="✈️",
 st.title("✈️ Planificador de Viajes Potenciado por ADK")
 st.markdown("Ingresa los detalles de tu viaje y nuestros agentes inteligentes te ayudarán a planificarlo.")
 
+# URL del endpoint progresivo del host_agent: devuelve una línea JSON (NDJSON) por cada
+# resultado parcial (evento "item") y por cada agente en cuanto termina (evento "result"),
+# así cada sección se va rellenando sin esperar al agente más lento.
+HOST_AGENT_STREAM_URL = "http://localhost:8000/run/stream"
+
+# Plazo total de la solicitud. Se envía al host_agent en la cabecera X-Request-Timeout-Ms
+# para que él y los subagentes ajusten sus tiempos y devuelvan resultados parciales
+# antes de que la UI deje de esperar.
+REQUEST_TIMEOUT_SECONDS = 180
+DEADLINE_HEADERS = {"X-Request-Timeout-Ms": str((REQUEST_TIMEOUT_SECONDS - 10) * 1000)}
+
+def format_price(option, price_field):
+    # Precio tal como lo dio el modelo y, si está en otra moneda, su equivalente en USD (price_usd).
+    price = option.get(price_field, 'N/D')
+    if option.get('price_usd') is not None and option.get('price_currency') not in (None, 'USD'):
+        return f"{price} (≈ ${option['price_usd']:,.0f} USD)"
+    return price
+
+# --- Funciones de Visualización de cada Sección ---
+# Cada función recibe un st.empty() y reemplaza su contenido con los resultados del agente.
+# El host_agent devuelve bajo cada clave una lista de resultados o un mensaje de texto (error o "no encontrado").
+
+def render_flights(placeholder, flights):
+    with placeholder.container():
+        if isinstance(flights, list) and flights:
+            for flight in flights:
+                st.markdown(f"- **Aerolínea:** {flight.get('airline', 'N/D')}")
+                st.markdown(f"  - **Precio:** {format_price(flight, 'price')}")
+                st.markdown(f"  - **Salida:** {flight.get('departure_time', 'N/D')}")
+                st.markdown(f"  - **Detalles:** {flight.get('flight_details', 'N/D')}")
+        elif isinstance(flights, str): # Si es un mensaje de error o "no encontrado"
+            st.info(flights)
+        else:
+            st.info("No se encontraron opciones de vuelo o hubo un error al consultarlas.")
+
+def render_stays(placeholder, stays):
+    with placeholder.container():
+        if isinstance(stays, list) and stays:
+            for stay_option in stays:
+                st.markdown(f"- **Hotel:** {stay_option.get('hotel_name', 'N/D')}")
+                st.markdown(f"  - **Precio/Noche:** {format_price(stay_option, 'price_per_night')}")
+                st.markdown(f"  - **Ubicación:** {stay_option.get('location', 'N/D')}")
+                st.markdown(f"  - **Detalles:** {stay_option.get('details', 'N/D')}")
+        elif isinstance(stays, str):
+            st.info(stays)
+        else:
+            st.info("No se encontraron opciones de alojamiento o hubo un error al consultarlas.")
+
+def render_activities(placeholder, activities):
+    with placeholder.container():
+        if isinstance(activities, list) and activities:
+            for activity in activities:
+                st.markdown(f"- **Actividad:** {activity.get('name', 'N/D')}")
+                st.markdown(f"  - **Descripción:** {activity.get('description', 'N/D')}")
+                st.markdown(f"  - **Precio Estimado:** {format_price(activity, 'price_estimate')}")
+        elif isinstance(activities, str):
+            st.info(activities)
+        else:
+            st.info("No se encontraron actividades o hubo un error al consultarlas.")
+
+def render_bundles(placeholder, bundles):
+    # Paquetes vuelo + alojamiento + actividades que caben en el presupuesto (ver host_agent/optimizer.py).
+    with placeholder.container():
+        if isinstance(bundles, list) and bundles:
+            for position, bundle in enumerate(bundles, start=1):
+                breakdown = bundle.get('breakdown_usd', {})
+                st.markdown(f"**Opción {position}: ${bundle.get('total_usd', 0):,.0f} USD** "
+                            f"(quedan ${bundle.get('remaining_budget_usd', 0):,.0f} del presupuesto)")
+                st.markdown(f"  - **Vuelo:** {bundle.get('flight', {}).get('airline', 'N/D')} (${breakdown.get('flight', 0):,.0f})")
+                st.markdown(f"  - **Alojamiento:** {bundle.get('stay', {}).get('hotel_name', 'N/D')} "
+                            f"({bundle.get('nights', 0)} noches, ${breakdown.get('stay', 0):,.0f})")
+                activity_names = ", ".join(activity.get('name', 'N/D') for activity in bundle.get('activities', []))
+                st.markdown(f"  - **Actividades:** {activity_names or 'Ninguna'} (${breakdown.get('activities', 0):,.0f})")
+        else:
+            st.info("Ninguna combinación de vuelo y alojamiento cabe en el presupuesto indicado.")
+
+
 # --- Formulario de Entrada del Usuario ---
 with st.form("travel_form"):
     st.header("Ingresa los Detalles de tu Viaje")
@@ -53,76 +130,84 @@ if submit_button:
     elif start_date_input > end_date_input: 
          st.warning("⚠️ La fecha de fin no puede ser anterior a la fecha de inicio. (Este error no debería ocurrir con la lógica actual).")
     else:
+        # Construir el payload para el host_agent
+        payload = {
+            "origin": origin,
+            "destination": destination,
+            "start_date": str(start_date_input), # Usar el valor del widget
+            "end_date": str(end_date_input),   # Usar el valor del widget
+            "budget": budget
+        }
+
+        # Reservar un espacio para cada sección; se rellenan a medida que llegan los resultados.
+        # El PDF usa data["flights"], data["stay"], data["activities"] [cite: 118]
+        status_placeholder = st.empty()
+        st.subheader("✈️ Vuelos Sugeridos")
+        flights_placeholder = st.empty()
+        st.subheader("🏨 Opciones de Alojamiento")
+        stays_placeholder = st.empty()
+        st.subheader("🏞️ Actividades Recomendadas")
+        activities_placeholder = st.empty()
+        st.subheader("💼 Paquetes Dentro del Presupuesto")
+        bundles_placeholder = st.empty()
+        bundles_placeholder.info("⏳ Se calcularán cuando respondan todos los agentes...")
+
+        sections = {
+            "flights": (flights_placeholder, render_flights),
+            "stay": (stays_placeholder, render_stays), # El PDF usa 'stay' para la clave en la UI
+            "activities": (activities_placeholder, render_activities),
+        }
+        for placeholder, _ in sections.values():
+            placeholder.info("⏳ Consultando al agente...")
+        pending_sections = set(sections)
+        partial_items = {section: [] for section in sections} # Resultados parciales por sección
+
         with st.spinner("🌍 Contactando a nuestros agentes especializados... ¡Esto puede tardar un momento!"):
-            # Construir el payload para el host_agent
-            payload = {
-                "origin": origin,
-                "destination": destination,
-                "start_date": str(start_date_input), # Usar el valor del widget
-                "end_date": str(end_date_input),   # Usar el valor del widget
-                "budget": budget
-            }
-            
-            # URL del host_agent
-            host_agent_url = "http://localhost:8000/run"
-            
             try:
-                # Enviar la solicitud POST al host_agent
-                response = requests.post(host_agent_url, json=payload, timeout=180) # Timeout generoso
+                # Enviar la solicitud POST al host_agent y leer los resultados a medida que llegan
+                response = requests.post(
+                    HOST_AGENT_STREAM_URL,
+                    json=payload,
+                    headers=DEADLINE_HEADERS,
+                    stream=True,
+                    timeout=REQUEST_TIMEOUT_SECONDS, # Timeout generoso
+                )
                 response.raise_for_status() # Lanza una excepción para respuestas HTTP 4xx/5xx
-                
-                data = response.json()
-                
-                st.success("🎉 ¡Hemos recibido tu plan de viaje!")
-                
-                # Mostrar los resultados
-                # El PDF usa data["flights"], data["stay"], data["activities"] [cite: 118]
-                # Nuestro host_agent.task_manager está diseñado para devolver strings (listas como string, o mensajes de error)
-                # bajo estas claves. Streamlit st.markdown puede manejar bien esto.
-
-                st.subheader("✈️ Vuelos Sugeridos")
-                if isinstance(data.get("flights"), list) and data.get("flights"):
-                    for flight in data["flights"]:
-                        st.markdown(f"- **Aerolínea:** {flight.get('airline', 'N/D')}")
-                        st.markdown(f"  - **Precio:** {flight.get('price', 'N/D')}")
-                        st.markdown(f"  - **Salida:** {flight.get('departure_time', 'N/D')}")
-                        st.markdown(f"  - **Detalles:** {flight.get('flight_details', 'N/D')}")
-                elif isinstance(data.get("flights"), str): # Si es un mensaje de error o "no encontrado"
-                     st.info(data.get("flights"))
-                else:
-                    st.info("No se encontraron opciones de vuelo o hubo un error al consultarlas.")
-
-                st.subheader("🏨 Opciones de Alojamiento")
-                if isinstance(data.get("stay"), list) and data.get("stay"): # El PDF usa 'stay' para la clave en la UI
-                    for stay_option in data["stay"]:
-                        st.markdown(f"- **Hotel:** {stay_option.get('hotel_name', 'N/D')}")
-                        st.markdown(f"  - **Precio/Noche:** {stay_option.get('price_per_night', 'N/D')}")
-                        st.markdown(f"  - **Ubicación:** {stay_option.get('location', 'N/D')}")
-                        st.markdown(f"  - **Detalles:** {stay_option.get('details', 'N/D')}")
-                elif isinstance(data.get("stay"), str):
-                     st.info(data.get("stay"))
-                else:
-                    st.info("No se encontraron opciones de alojamiento o hubo un error al consultarlas.")
-                
-                st.subheader("🏞️ Actividades Recomendadas")
-                if isinstance(data.get("activities"), list) and data.get("activities"):
-                    for activity in data["activities"]:
-                        st.markdown(f"- **Actividad:** {activity.get('name', 'N/D')}")
-                        st.markdown(f"  - **Descripción:** {activity.get('description', 'N/D')}")
-                        st.markdown(f"  - **Precio Estimado:** {activity.get('price_estimate', 'N/D')}")
-                elif isinstance(data.get("activities"), str):
-                     st.info(data.get("activities"))
-                else:
-                    st.info("No se encontraron actividades o hubo un error al consultarlas.")
+
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if event.get("type") == "item" and event.get("agent") in pending_sections:
+                        # Resultado parcial: se añade a la sección hasta que llegue la respuesta final.
+                        placeholder, render = sections[event["agent"]]
+                        partial_items[event["agent"]].append(event.get("item") or {})
+                        render(placeholder, partial_items[event["agent"]])
+                    elif event.get("type") == "result" and event.get("agent") in sections:
+                        placeholder, render = sections[event["agent"]]
+                        if event.get("status") == "timed_out": # El agente no respondió antes del plazo
+                            placeholder.warning(f"⏱️ {event.get('data')}")
+                        else:
+                            render(placeholder, event.get("data"))
+                        pending_sections.discard(event["agent"])
+                    elif event.get("type") == "bundles":
+                        render_bundles(bundles_placeholder, event.get("data"))
+
+                # Secciones sin resultado (ej. el stream terminó antes de tiempo)
+                for section in pending_sections:
+                    placeholder, render = sections[section]
+                    render(placeholder, None)
+
+                status_placeholder.success("🎉 ¡Hemos recibido tu plan de viaje!")
 
             except requests.exceptions.HTTPError as http_err:
                 st.error(f"😕 Error HTTP al contactar al planificador: {http_err}")
                 st.error(f"Detalles: {response.text if 'response' in locals() else 'No hay respuesta detallada.'}")
             except requests.exceptions.ConnectionError as conn_err:
-                st.error(f"🔌 Error de conexión: No se pudo conectar al servidor del planificador en {host_agent_url}. ¿Está el host_agent en ejecución?")
+                st.error(f"🔌 Error de conexión: No se pudo conectar al servidor del planificador en {HOST_AGENT_STREAM_URL}. ¿Está el host_agent en ejecución?")
             except requests.exceptions.Timeout as timeout_err:
                 st.error(f"⏱️ Error: La solicitud al planificador tardó demasiado en responder (timeout).")
             except json.JSONDecodeError:
                 st.error("😕 Error: La respuesta del planificador no estaba en formato JSON válido.")
             except Exception as e:
-                st.error(f" Ocurrió un error inesperado: {e}")
\ No newline at end of file
+                st.error(f" Ocurrió un error inesperado: {e}")